@@ -0,0 +1,201 @@
+"""Compact MemoryNode digests for Gemini search prompts.
+
+A digest is a short, bounded text block per node holding the fields that
+matter for relevance, in priority order: header (id, type, timestamp),
+title, detected objects, a truncated summary and a few key transcript
+sentences. File paths and raw JSON are never included.
+
+Digests are cached per node and rebuilt only when the node changes (its
+`revision`, or a checksum of its metadata when no revision is available).
+`pack_digests` then fits as many digests as a token budget allows.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DIGEST_MAX_CHARS = int(os.getenv("DIGEST_MAX_CHARS", "600"))
+DIGEST_SUMMARY_CHARS = int(os.getenv("DIGEST_SUMMARY_CHARS", "320"))
+DIGEST_TRANSCRIPT_CHARS = int(os.getenv("DIGEST_TRANSCRIPT_CHARS", "200"))
+DIGEST_CACHE_SIZE = int(os.getenv("DIGEST_CACHE_SIZE", "4096"))
+# Rough characters-per-token ratio for English text with Gemini tokenizers.
+CHARS_PER_TOKEN = 4
+# Separator cost between digests in the prompt ("\n\n").
+_SEPARATOR_CHARS = 2
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_FILLER_WORDS = frozenset(
+    "a an and are but do for i is it just like oh okay so that the this to uh um um-hmm "
+    "was we yeah yes you".split()
+)
+
+_cache: "OrderedDict[int, Tuple[object, str]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the prompt tokens used by `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rfind(" ")
+    return text[:cut if cut > limit // 2 else limit] + "..."
+
+
+def key_sentences(text: Optional[str], limit: int = DIGEST_TRANSCRIPT_CHARS) -> str:
+    """Pick the most informative transcript sentences that fit in `limit` chars.
+
+    The opening sentence is always kept for context; the rest are ranked by
+    how many distinct non-filler words they contain and emitted in their
+    original order.
+    """
+    text = " ".join((text or "").split())
+    if len(text) <= limit:
+        return text
+    sentences = [s for s in _SENTENCE_RE.split(text) if s]
+    if len(sentences) <= 1:
+        return _truncate(text, limit)
+
+    def informativeness(index):
+        words = set(_WORD_RE.findall(sentences[index].lower())) - _FILLER_WORDS
+        return len(words)
+
+    chosen, used = [], 0
+    for index in [0] + sorted(range(1, len(sentences)), key=informativeness, reverse=True):
+        sentence = sentences[index]
+        if index and not informativeness(index):
+            continue
+        if used + len(sentence) + 1 > limit:
+            if not chosen:
+                return _truncate(sentence, limit)
+            continue
+        chosen.append(index)
+        used += len(sentence) + 1
+
+    parts, previous = [], -1
+    for index in sorted(chosen):
+        if index != previous + 1:
+            parts.append("...")
+        parts.append(sentences[index])
+        previous = index
+    if previous != len(sentences) - 1:
+        parts.append("...")
+    return " ".join(parts)
+
+
+def _node_fields(node: Dict) -> Dict:
+    """Return the digest fields of a node row or a full node with metadata JSON."""
+    if "metadata" not in node:
+        return node
+    metadata = node.get("metadata") or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except (TypeError, ValueError):
+            metadata = {"description": metadata}
+    if not isinstance(metadata, dict):
+        metadata = {}
+    return {**metadata, **{k: v for k, v in node.items() if k != "metadata"}}
+
+
+def _version(node: Dict) -> object:
+    if node.get("revision") is not None:
+        return ("revision", node["revision"])
+    metadata = node.get("metadata")
+    if not isinstance(metadata, str):
+        metadata = json.dumps(metadata, sort_keys=True, default=str)
+    return ("crc32", zlib.crc32(f"{node.get('timestamp')}|{metadata}".encode("utf-8", "replace")))
+
+
+def _format_digest(fields: Dict) -> str:
+    header = f"Node {fields['id']}"
+    if fields.get("file_type"):
+        header += f" | {fields['file_type']}"
+    if fields.get("timestamp"):
+        header += f" | {fields['timestamp']}"
+    lines = [header]
+    if fields.get("title"):
+        lines.append(f"Title: {_truncate(fields['title'], 120)}")
+    objects = fields.get("objects_detected")
+    if isinstance(objects, str) and objects.startswith("["):
+        try:
+            objects = json.loads(objects)
+        except ValueError:
+            pass
+    if objects:
+        if isinstance(objects, (list, tuple)):
+            objects = ", ".join(str(o) for o in objects)
+        lines.append(f"Objects: {_truncate(str(objects), 160)}")
+    summary = fields.get("summary") or fields.get("description")
+    if summary:
+        lines.append(f"Summary: {_truncate(summary, DIGEST_SUMMARY_CHARS)}")
+    if fields.get("transcript"):
+        lines.append(f"Transcript: {key_sentences(fields['transcript'], DIGEST_TRANSCRIPT_CHARS)}")
+    digest = "\n".join(lines)
+    return digest if len(digest) <= DIGEST_MAX_CHARS else digest[:DIGEST_MAX_CHARS - 3] + "..."
+
+
+def build_digest(node: Dict) -> str:
+    """Return the cached digest for a node, rebuilding it if the node changed.
+
+    Args:
+        node: Either a full MemoryNode (with `metadata`) or a row from
+            db.database.get_memory_node_search_fields
+
+    Returns:
+        Digest text of at most DIGEST_MAX_CHARS characters
+    """
+    node_id = node["id"]
+    version = _version(node)
+    with _cache_lock:
+        entry = _cache.get(node_id)
+        if entry is not None and entry[0] == version:
+            _cache.move_to_end(node_id)
+            return entry[1]
+
+    digest = _format_digest(_node_fields(node))
+    with _cache_lock:
+        _cache[node_id] = (version, digest)
+        _cache.move_to_end(node_id)
+        while len(_cache) > DIGEST_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return digest
+
+
+def pack_digests(nodes: Iterable[Dict], budget_tokens: int) -> List[Tuple[int, str]]:
+    """Fit as many node digests as possible into a prompt token budget.
+
+    Nodes are taken in the given (rank) order; a digest that does not fit is
+    skipped so shorter, lower-ranked ones can still use the remaining space.
+    The first digest is always included so a prompt is never empty.
+
+    Returns:
+        List of (node_id, digest) tuples
+    """
+    packed, remaining = [], budget_tokens * CHARS_PER_TOKEN
+    for node in nodes:
+        digest = build_digest(node)
+        cost = len(digest) + _SEPARATOR_CHARS
+        if packed and cost > remaining:
+            continue
+        packed.append((node["id"], digest))
+        remaining -= cost
+        if remaining <= _SEPARATOR_CHARS:
+            break
+    return packed
+
+
+def cache_info() -> Dict[str, int]:
+    with _cache_lock:
+        return {"entries": len(_cache), "max_entries": DIGEST_CACHE_SIZE}
@@ -0,0 +1,419 @@
+"""Local semantic index over MemoryNode text for fast retrieval.
+
+Each MemoryNode's title, summary, transcript and detected objects are embedded
+once, when they are written, and stored on disk as a dense float32 (or float16)
+matrix that is memory-mapped for search. A query is a single vectorized cosine
+top-k over the mapped matrix, so search cost does not involve any network call
+or prompt building.
+
+The embedding backend is pluggable:
+- "hashing" (default): deterministic feature-hashing embedder, fully offline.
+- "gemini": Gemini text embeddings via google-generativeai.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_DIR = Path(os.getenv("EMBEDDING_INDEX_DIR", Path(__file__).resolve().parents[1] / "data" / "index"))
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+# float32 rows are scored straight from the memory map; float16 halves disk and
+# page-cache use but pays a conversion per search (several times slower).
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
+
+# Text fields embedded per node, with how many times each is repeated to
+# weight it (titles and objects are short but highly descriptive).
+_FIELD_WEIGHTS = (("title", 2), ("summary", 1), ("transcript", 1), ("objects_detected", 2))
+
+_SEARCH_CHUNK_ROWS = 65536
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+    a an and are as at be been but by did do does for from had has have he her
+    his i in is it its me my of on or our she so that the their them there they
+    this to was we were what when where which who why will with you your
+""".split())
+
+__all__ = [
+    "Embedder",
+    "HashingEmbedder",
+    "GeminiEmbedder",
+    "VectorIndex",
+    "get_embedder",
+    "get_index",
+    "node_text",
+    "sync_index",
+    "semantic_search",
+    "remove_deleted",
+]
+
+
+class Embedder:
+    """Base class for text embedders producing L2-normalized float32 vectors."""
+
+    name = "base"
+    dim = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+@lru_cache(maxsize=200_000)
+def _hash_feature(feature: str) -> int:
+    # blake2b instead of hash(): Python's str hash is salted per process.
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic offline embedder using signed feature hashing.
+
+    Features are word unigrams, word bigrams and character trigrams (which let
+    "cooking" match "cook"), hashed into `dim` buckets with a hash-derived sign.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [w for w in _TOKEN_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+        features = [(f"w:{w}", 1.0) for w in words]
+        features.extend((f"b:{a}_{b}", 0.5) for a, b in zip(words, words[1:]))
+        for w in words:
+            padded = f"^{w}$"
+            features.extend((f"c:{padded[i:i + 3]}", 0.2) for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.fromiter((_hash_feature(f) for f, _ in features), dtype=np.uint64, count=len(features))
+            weights = np.fromiter((w for _, w in features), dtype=np.float32, count=len(features))
+            buckets = (hashes % np.uint64(self.dim)).astype(np.intp)
+            signs = np.where((hashes >> np.uint64(63)) & np.uint64(1), 1.0, -1.0).astype(np.float32)
+            np.add.at(out[row], buckets, signs * weights)
+        return _normalize(out)
+
+
+class GeminiEmbedder(Embedder):
+    """Gemini text-embedding backend (requires network and an API key)."""
+
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_EMBEDDING_MODEL, dim: int = 768):
+        self.model = model
+        self.dim = dim
+
+    def _embed(self, texts: Sequence[str], task_type: str) -> np.ndarray:
+        from ai.gemini_client import _get_model, genai
+
+        _get_model()  # configures the API key
+        result = genai.embed_content(model=self.model, content=list(texts), task_type=task_type)
+        vectors = np.asarray(result["embedding"], dtype=np.float32)
+        return _normalize(vectors.reshape(len(texts), -1))
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self._embed(texts, "retrieval_document")
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed([text], "retrieval_query")[0]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def get_embedder(backend: Optional[str] = None) -> Embedder:
+    """Return the configured embedder ("hashing" or "gemini")."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend == "gemini":
+        return GeminiEmbedder()
+    if backend != "hashing":
+        LOGGER.warning("Unknown embedding backend %r, using hashing embedder", backend)
+    return HashingEmbedder()
+
+
+def node_text(node: Dict) -> str:
+    """Build the text embedded for a node from its typed metadata columns."""
+    parts = []
+    for field, repeat in _FIELD_WEIGHTS:
+        value = node.get(field)
+        if not value:
+            continue
+        if field == "objects_detected" and isinstance(value, str):
+            try:
+                value = " ".join(json.loads(value))
+            except (ValueError, TypeError):
+                pass
+        parts.extend([str(value)] * repeat)
+    return "\n".join(parts)
+
+
+class VectorIndex:
+    """Append-only, memory-mapped store of one vector per MemoryNode.
+
+    Two parallel files are appended in lockstep: `keys.bin` holds (id, revision)
+    pairs and `vectors.bin` a dense row-major matrix of vectors, so the matrix
+    can be memory-mapped and scored in contiguous chunks. Re-embedding a node
+    appends a newer row; the latest row per id wins and a negative revision
+    marks a deletion. The files are compacted once more than half of the rows
+    are superseded.
+    """
+
+    def __init__(self, directory: Path, dim: int, embedder_name: str, dtype: str = EMBEDDING_DTYPE):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.embedder_name = embedder_name
+        self.dtype = np.dtype(dtype)
+        self.key_dtype = np.dtype([("id", "<i8"), ("revision", "<i8")])
+        self.keys_path = self.directory / "keys.bin"
+        self.vectors_path = self.directory / "vectors.bin"
+        self.meta_path = self.directory / "index.json"
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.memmap] = None
+        self._mapped_rows = 0
+        self._live_rows = np.zeros(0, dtype=np.int64)
+        self._live_ids = np.zeros(0, dtype=np.int64)
+        self.meta = self._load_meta()
+
+    def _load_meta(self) -> Dict:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        expected = {"dim": self.dim, "dtype": self.dtype.name, "embedder": self.embedder_name}
+        meta = {}
+        if self.meta_path.exists():
+            try:
+                meta = json.loads(self.meta_path.read_text())
+            except ValueError:
+                meta = {}
+        if any(meta.get(k) != v for k, v in expected.items()):
+            LOGGER.info("Embedding configuration changed; rebuilding semantic index")
+            for path in (self.keys_path, self.vectors_path):
+                if path.exists():
+                    path.unlink()
+            meta = dict(expected, synced_revision=0)
+            self._write_meta(meta)
+        return meta
+
+    def _write_meta(self, meta: Dict):
+        tmp = self.meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.meta_path)
+
+    @property
+    def synced_revision(self) -> int:
+        return int(self.meta.get("synced_revision", 0))
+
+    def set_synced_revision(self, revision: int):
+        with self._lock:
+            self.meta["synced_revision"] = int(revision)
+            self._write_meta(self.meta)
+
+    def _append(self, keys: np.ndarray, vectors: np.ndarray):
+        with self._lock:
+            with open(self.vectors_path, "ab") as fh:
+                fh.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+            # Keys last: a row only becomes visible once its vector is on disk.
+            with open(self.keys_path, "ab") as fh:
+                fh.write(keys.tobytes())
+
+    def upsert(self, ids: Sequence[int], revisions: Sequence[int], vectors: np.ndarray):
+        """Store vectors for the given node ids (replacing older ones)."""
+        if len(ids) == 0:
+            return
+        keys = np.zeros(len(ids), dtype=self.key_dtype)
+        keys["id"] = ids
+        keys["revision"] = revisions
+        self._append(keys, vectors)
+
+    def delete(self, ids: Iterable[int]):
+        """Mark node ids as deleted."""
+        ids = list(ids)
+        if not ids:
+            return
+        keys = np.zeros(len(ids), dtype=self.key_dtype)
+        keys["id"] = ids
+        keys["revision"] = -1
+        self._append(keys, np.zeros((len(ids), self.dim), dtype=self.dtype))
+
+    def _refresh(self):
+        """Remap the files if they grew and recompute the live row set."""
+        key_rows = self.keys_path.stat().st_size // self.key_dtype.itemsize if self.keys_path.exists() else 0
+        row_bytes = self.dim * self.dtype.itemsize
+        vector_rows = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        rows = min(key_rows, vector_rows)
+        if rows == self._mapped_rows and (self._vectors is not None or rows == 0):
+            return
+        if rows == 0:
+            self._vectors = None
+            self._mapped_rows = 0
+            self._live_rows = np.zeros(0, dtype=np.int64)
+            self._live_ids = np.zeros(0, dtype=np.int64)
+            return
+        keys = np.fromfile(self.keys_path, dtype=self.key_dtype, count=rows)
+        # Last occurrence of every id: unique over the reversed array.
+        _, first_in_reversed = np.unique(keys["id"][::-1], return_index=True)
+        last_rows = rows - 1 - first_in_reversed
+        alive = keys["revision"][last_rows] >= 0
+        self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        self._mapped_rows = rows
+        self._live_rows = np.sort(last_rows[alive])
+        self._live_ids = keys["id"][self._live_rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._live_rows)
+
+    def ids(self) -> np.ndarray:
+        with self._lock:
+            self._refresh()
+            return self._live_ids.copy()
+
+    def search(self, query: np.ndarray, k: int = 20, candidate_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Return up to k (node_id, cosine score) pairs, best first."""
+        with self._lock:
+            self._refresh()
+            vectors, rows, live_rows, live_ids = self._vectors, self._mapped_rows, self._live_rows, self._live_ids
+        if vectors is None or len(live_rows) == 0 or k <= 0:
+            return []
+
+        if candidate_ids is not None:
+            keep = np.isin(live_ids, np.fromiter(candidate_ids, dtype=np.int64))
+            live_rows, live_ids = live_rows[keep], live_ids[keep]
+            if len(live_rows) == 0:
+                return []
+
+        # Score every mapped row in contiguous chunks (one BLAS call each, with
+        # bounded float16 -> float32 conversion), then keep only the live rows.
+        query = np.asarray(query, dtype=np.float32)
+        all_scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, _SEARCH_CHUNK_ROWS):
+            chunk = vectors[start:start + _SEARCH_CHUNK_ROWS]
+            np.dot(np.asarray(chunk, dtype=np.float32), query, out=all_scores[start:start + len(chunk)])
+        scores = all_scores[live_rows]
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(live_ids[i]), float(scores[i])) for i in top]
+
+    def compact(self, force: bool = False) -> bool:
+        """Rewrite the files with only live rows if they are mostly garbage."""
+        with self._lock:
+            self._refresh()
+            if self._vectors is None:
+                return False
+            if not force and len(self._live_rows) * 2 >= self._mapped_rows:
+                return False
+            keys = np.fromfile(self.keys_path, dtype=self.key_dtype, count=self._mapped_rows)[self._live_rows]
+            vectors = np.array(self._vectors[self._live_rows])
+            self._vectors = None
+            for path, data in ((self.vectors_path, vectors), (self.keys_path, keys)):
+                tmp = path.with_suffix(".tmp")
+                data.tofile(tmp)
+                os.replace(tmp, path)
+            self._mapped_rows = 0
+            self._refresh()
+            LOGGER.info("Compacted semantic index to %d vectors", len(keys))
+            return True
+
+
+_index: Optional[VectorIndex] = None
+_embedder: Optional[Embedder] = None
+_index_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+
+def get_index() -> Tuple[VectorIndex, Embedder]:
+    """Return the process-wide (index, embedder) pair."""
+    global _index, _embedder
+    with _index_lock:
+        if _index is None:
+            _embedder = get_embedder()
+            _index = VectorIndex(INDEX_DIR, _embedder.dim, _embedder.name)
+        return _index, _embedder
+
+
+def sync_index(batch_size: int = 256) -> int:
+    """Embed every MemoryNode written since the last sync.
+
+    Uses the memory_nodes revision sequence, so only new or changed nodes are
+    read and embedded. Called after the camera pipeline writes a summary or
+    transcript, and before each search as a cheap catch-up.
+
+    Returns:
+        Number of nodes embedded
+    """
+    from db.database import get_memory_node_revision, get_memory_nodes_changed_since
+
+    index, embedder = get_index()
+    embedded = 0
+    with _sync_lock:
+        if get_memory_node_revision() <= index.synced_revision:
+            return 0
+        while True:
+            changed = get_memory_nodes_changed_since(index.synced_revision, limit=batch_size)
+            if not changed:
+                break
+            vectors = embedder.embed([node_text(node) for node in changed])
+            index.upsert([n["id"] for n in changed], [n["revision"] for n in changed], vectors)
+            index.set_synced_revision(changed[-1]["revision"])
+            embedded += len(changed)
+        index.compact()
+    if embedded:
+        LOGGER.info("Semantic index synced %d MemoryNodes", embedded)
+    return embedded
+
+
+def remove_deleted(existing_ids: Optional[Iterable[int]] = None) -> int:
+    """Drop index entries for nodes that no longer exist in the database.
+
+    Args:
+        existing_ids: IDs of the nodes that exist (read from the database if omitted)
+    """
+    if existing_ids is None:
+        from db.database import get_memory_node_ids
+
+        existing_ids = get_memory_node_ids()
+    index, _ = get_index()
+    stale = np.setdiff1d(index.ids(), np.fromiter(existing_ids, dtype=np.int64))
+    index.delete(stale.tolist())
+    if len(stale):
+        LOGGER.info("Removed %d deleted MemoryNodes from the semantic index", len(stale))
+    return len(stale)
+
+
+def semantic_search(query: str, k: int = 20, candidate_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+    """Return up to k MemoryNode ids most similar to the query, with cosine scores.
+
+    Only nodes that share something with the query (score > 0) are returned.
+    """
+    if not query or not query.strip():
+        return []
+    index, embedder = get_index()
+    hits = index.search(embedder.embed_query(query), k=k, candidate_ids=candidate_ids)
+    return [(node_id, score) for node_id, score in hits if score > 0]
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
 import mimetypes
 import os
+import threading
 import time
 import re
 import json
+from concurrent.futures import ALL_COMPLETED, FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+
+from ai.upload_cache import UploadCache, remote_ttl
 
 try:
     from dotenv import load_dotenv
@@ -34,18 +40,54 @@ DEFAULT_PROMPT = (
 if load_dotenv:
     load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env", override=False)
 
-_MODEL = None
-
-__all__ = ["describe_image", "summarize_video", "search_memory_nodes", "generate_title", "generate_short_answer"]
+# Uploaded files are polled until processed, starting at UPLOAD_POLL_INITIAL seconds
+# and doubling up to UPLOAD_POLL_MAX; UPLOAD_DEADLINE bounds the whole upload.
+UPLOAD_POLL_INITIAL = float(os.getenv("GEMINI_UPLOAD_POLL_INITIAL", "0.3"))
+UPLOAD_POLL_MAX = float(os.getenv("GEMINI_UPLOAD_POLL_MAX", "5.0"))
+UPLOAD_DEADLINE = float(os.getenv("GEMINI_UPLOAD_DEADLINE", "120"))
+UPLOAD_CONCURRENCY = int(os.getenv("GEMINI_UPLOAD_CONCURRENCY", "4"))
+# Processed uploads are kept for reuse (see ai.upload_cache) up to these limits.
+UPLOAD_CACHE_MAX_FILES = int(os.getenv("GEMINI_UPLOAD_CACHE_FILES", "64"))
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv("GEMINI_UPLOAD_CACHE_BYTES", str(2 * 1024 ** 3)))
+
+# Gemini expects these MIME types; mimetypes guesses audio/x-wav, or nothing on some systems.
+MEDIA_MIME_TYPES = {
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".mp4": "video/mp4",
+}
 
+_MODEL = None
 
-def _get_api_key() -> str:
+__all__ = [
+    "describe_image",
+    "summarize_video",
+    "summarize_keyframes",
+    "search_memory_nodes",
+    "rerank_memory_nodes",
+    "generate_title",
+    "generate_short_answer",
+    "UploadManager",
+    "get_upload_manager",
+    "get_api_key",
+]
+
+
+def get_api_key() -> str:
+    """Gemini API key shared by every client (this module's SDK and audio's google.genai client)."""
     api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("Set GEMINI_API_KEY or GOOGLE_API_KEY environment variable.")
     return api_key
 
 
+def media_mime_type(path: str) -> Optional[str]:
+    """MIME type a media file is uploaded with."""
+    return MEDIA_MIME_TYPES.get(Path(path).suffix.lower()) or mimetypes.guess_type(path)[0]
+
+
 def _get_model():
     global _MODEL
 
@@ -55,7 +97,7 @@ def _get_model():
         ) from _IMPORT_ERROR
 
     if _MODEL is None:
-        api_key = _get_api_key()
+        api_key = get_api_key()
         genai.configure(api_key=api_key)
         model_name = DEFAULT_MODEL_NAME
         _MODEL = genai.GenerativeModel(model_name)
@@ -64,6 +106,222 @@ def _get_model():
     return _MODEL
 
 
+class UploadManager:
+    """Uploads media to the Gemini File API concurrently and cleans up after it.
+
+    `uploaded(paths)` uploads every file at once on a small thread pool, polls
+    each until Gemini has processed it (exponential backoff from
+    `poll_initial` to `poll_max` seconds) and gives up at an overall deadline.
+
+    Processed uploads are kept in an UploadCache keyed by content hash, so the
+    same recording is uploaded once for its summary, transcript and every
+    follow-up question; the cache deletes remote files it evicts. Uploads
+    that are not cached are deleted when the block exits, and remote files are
+    deleted on failure and on timeout, including uploads that only finish
+    after the caller stopped waiting.
+    """
+
+    def __init__(self, max_workers: int = UPLOAD_CONCURRENCY, poll_initial: float = UPLOAD_POLL_INITIAL,
+                 poll_max: float = UPLOAD_POLL_MAX, cache: Optional[UploadCache] = None):
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.cache = cache if cache is not None else UploadCache(
+            max_files=UPLOAD_CACHE_MAX_FILES,
+            max_bytes=UPLOAD_CACHE_MAX_BYTES,
+            on_evict=lambda remote: self.delete(remote.name),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="GeminiUpload")
+        self._lock = threading.Lock()
+        self._stats = {"uploaded": 0, "failed": 0, "timed_out": 0, "deleted": 0, "delete_failed": 0,
+                       "wait_seconds": 0.0}
+
+    @contextmanager
+    def uploaded(self, paths: List[str], deadline: float = UPLOAD_DEADLINE, required: bool = True,
+                 reuse: bool = True):
+        """Upload `paths` (or reuse cached uploads) and yield the processed remote files in the same order.
+
+        Args:
+            paths: Local files to upload.
+            deadline: Seconds to wait for all uploads to be processed.
+            required: If False, a file that fails or times out is yielded as None
+                instead of failing the whole batch.
+            reuse: Look up and keep uploads in the cache; if False, files are
+                always uploaded and deleted afterwards.
+
+        Raises:
+            RuntimeError: if configuration fails, a required upload fails or the deadline passes.
+        """
+        _get_model()
+        keys = [self.cache.file_key(path) if reuse else None for path in paths]
+        files: List[Optional[object]] = [self._cached(key) if key else None for key in keys]
+        acquired = [key for key, remote in zip(keys, files) if remote is not None]
+        temporary = []
+        try:
+            missing = [index for index, remote in enumerate(files) if remote is None]
+            uploaded = self._upload_all([paths[index] for index in missing], deadline, required) if missing else []
+            for index, remote in zip(missing, uploaded):
+                files[index] = remote
+                if remote is None:
+                    continue
+                if keys[index] and self.cache.put(keys[index], remote, os.path.getsize(paths[index]), remote_ttl(remote)):
+                    acquired.append(keys[index])
+                else:
+                    temporary.append(remote)
+            yield files
+        finally:
+            for key in acquired:
+                self.cache.release(key)
+            for remote in temporary:
+                self.delete(remote.name)
+
+    def _cached(self, key: str):
+        """Return a cached upload that is still usable on Gemini's side, else None."""
+        remote = self.cache.acquire(key)
+        if remote is None:
+            return None
+        try:
+            state = genai.get_file(remote.name).state.name
+        except Exception as exc:
+            state = f"unavailable ({exc})"
+        if state == "ACTIVE":
+            LOGGER.info(f"Reusing uploaded file {remote.name}")
+            return remote
+        LOGGER.info(f"Cached upload {remote.name} is {state}; uploading again")
+        self.cache.invalidate(key)
+        return None
+
+    def delete(self, name: str):
+        """Delete a remote file (errors are logged, never raised)."""
+        try:
+            genai.delete_file(name)
+            LOGGER.info(f"Cleaned up uploaded file: {name}")
+            self._count("deleted")
+        except Exception as exc:
+            LOGGER.warning(f"Failed to delete uploaded file {name}: {exc}")
+            self._count("delete_failed")
+
+    def stats(self) -> Dict[str, object]:
+        """Upload counters plus the reuse cache's hit rate and bytes saved."""
+        with self._lock:
+            stats = dict(self._stats, wait_seconds=round(self._stats["wait_seconds"], 2))
+        stats["cache"] = self.cache.stats()
+        return stats
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _upload_all(self, paths: List[str], deadline: float, required: bool) -> List[Optional[object]]:
+        started = time.monotonic()
+        ends_at = started + deadline
+        cancelled = threading.Event()
+        futures = [self._executor.submit(self._upload_one, path, ends_at, cancelled) for path in paths]
+        # A required batch is abandoned as soon as one upload fails.
+        wait(futures, timeout=deadline, return_when=FIRST_EXCEPTION if required else ALL_COMPLETED)
+        cancelled.set()
+
+        files: List[Optional[object]] = []
+        errors = []
+        for path, future in zip(paths, futures):
+            if not future.done():
+                # Still uploading: delete the remote file whenever the upload returns.
+                future.add_done_callback(self._delete_late_result)
+                if time.monotonic() >= ends_at:
+                    self._count("timed_out")
+                    errors.append(f"{Path(path).name}: not processed within {deadline:g}s")
+                else:
+                    errors.append(f"{Path(path).name}: abandoned")
+                files.append(None)
+            elif future.exception() is not None:
+                self._count("failed")
+                errors.append(f"{Path(path).name}: {future.exception()}")
+                files.append(None)
+            else:
+                self._count("uploaded")
+                files.append(future.result())
+        self._count("wait_seconds", time.monotonic() - started)
+
+        if errors:
+            LOGGER.warning(f"Gemini upload problems: {'; '.join(errors)}")
+            if required:
+                for remote in files:
+                    if remote is not None:
+                        self.delete(remote.name)
+                raise RuntimeError(f"Gemini upload failed: {'; '.join(errors)}")
+        return files
+
+    def _upload_one(self, path: str, ends_at: float, cancelled: threading.Event):
+        LOGGER.info(f"Uploading {Path(path).name} to Gemini")
+        remote = genai.upload_file(path=path, mime_type=media_mime_type(path))
+        try:
+            delay = self.poll_initial
+            while remote.state.name == "PROCESSING":
+                remaining = ends_at - time.monotonic()
+                if cancelled.is_set() or remaining <= 0:
+                    raise RuntimeError("processing deadline passed")
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, self.poll_max)
+                remote = genai.get_file(remote.name)
+            if remote.state.name == "FAILED":
+                raise RuntimeError(f"processing failed for {Path(path).name}")
+            if cancelled.is_set():
+                raise RuntimeError("caller stopped waiting")
+        except Exception:
+            self.delete(remote.name)
+            raise
+        return remote
+
+    def _delete_late_result(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.delete(future.result().name)
+
+
+_upload_manager: Optional[UploadManager] = None
+_upload_manager_lock = threading.Lock()
+
+
+def get_upload_manager() -> UploadManager:
+    """Get or create the shared upload manager"""
+    global _upload_manager
+    with _upload_manager_lock:
+        if _upload_manager is None:
+            _upload_manager = UploadManager()
+            # Cached uploads would otherwise stay on Gemini's side until they expire.
+            atexit.register(_upload_manager.cache.clear)
+        return _upload_manager
+
+
+def _response_text(response) -> Optional[str]:
+    """Return the text of a generate_content response, checking candidate parts as a fallback."""
+    text = getattr(response, "text", None)
+    if text:
+        return text
+    if hasattr(response, "candidates"):
+        for candidate in response.candidates or []:
+            if not candidate.content or not getattr(candidate.content, "parts", None):
+                continue
+            for part in candidate.content.parts:
+                text = getattr(part, "text", None)
+                if text:
+                    return text
+    return None
+
+
+def _parse_node_ids(response_text: str) -> List[int]:
+    """Extract the JSON array of node IDs from a model response (tolerates code fences)."""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        lines = response_text.split("\n")
+        response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
+    elif response_text.startswith("`"):
+        response_text = response_text.strip("`")
+
+    json_match = re.search(r'\[[\d\s,]+\]', response_text)
+    if json_match:
+        return json.loads(json_match.group())
+    return json.loads(response_text)
+
+
 def describe_image(image_path: str, prompt: Optional[str] = None, timeout: int = 60) -> str:
     """Return a natural-language caption produced by Gemini 2.5 Flash.
 
@@ -115,13 +373,15 @@ def describe_image(image_path: str, prompt: Optional[str] = None, timeout: int =
     return "No caption returned"
 
 
-def summarize_video(video_path: str, prompt: Optional[str] = None, timeout: int = 300) -> str:
+def summarize_video(video_path: str, prompt: Optional[str] = None, timeout: int = 300,
+                    upload_deadline: float = UPLOAD_DEADLINE) -> str:
     """Return a natural-language summary of a video file using the Gemini API.
 
     Args:
         video_path: Path to a local video file.
         prompt: Optional custom instruction.
         timeout: Seconds to wait for Gemini response.
+        upload_deadline: Seconds to wait for the upload to be processed.
 
     Raises:
         FileNotFoundError: if the video path does not exist.
@@ -138,45 +398,104 @@ def summarize_video(video_path: str, prompt: Optional[str] = None, timeout: int
     instruction = prompt or "Summarize this video. Describe the key objects, people, and actions."
 
     LOGGER.info(f"Uploading video for analysis: {path.name}")
-    video_file = genai.upload_file(path=path)
+    with get_upload_manager().uploaded([str(path)], deadline=upload_deadline) as (video_file,):
+        LOGGER.info(f"Video uploaded successfully. Generating summary for {path.name}...")
+        try:
+            response = model.generate_content(
+                [instruction, video_file],
+                request_options={"timeout": timeout},
+            )
+        except Exception as exc:
+            LOGGER.error(f"Gemini video summary failed: {exc}", exc_info=True)
+            raise RuntimeError(f"Gemini video summary failed: {exc}") from exc
+
+    summary = getattr(response, "text", None)
+    if summary:
+        return summary.strip()
 
-    while video_file.state.name == "PROCESSING":
-        time.sleep(10)
-        video_file = genai.get_file(video_file.name)
+    return "No summary returned"
 
-    if video_file.state.name == "FAILED":
-        raise RuntimeError(f"Video processing failed for {path.name}")
 
-    LOGGER.info(f"Video uploaded successfully. Generating summary for {path.name}...")
+def summarize_keyframes(
+    image_paths: List[str],
+    transcript: Optional[str] = None,
+    timestamps: Optional[List[float]] = None,
+    prompt: Optional[str] = None,
+    timeout: int = 120,
+) -> str:
+    """Summarize a recording from a few of its frames (and its transcript) in one request.
+
+    The images are sent inline, so unlike summarize_video there is no upload
+    or server-side processing to wait for.
+
+    Args:
+        image_paths: Keyframe images in time order.
+        transcript: Optional transcript of the recording's audio.
+        timestamps: Optional offsets (seconds into the recording) of each image.
+        prompt: Optional custom instruction.
+        timeout: Seconds to wait for Gemini response.
+
+    Raises:
+        FileNotFoundError: if an image path does not exist.
+        RuntimeError: if configuration or Gemini API calls fail.
+
+    Returns:
+        Summary text string. Falls back to "No summary returned" if model returns empty content.
+    """
+    if not image_paths:
+        raise ValueError("summarize_keyframes needs at least one image")
+
+    model = _get_model()
+    instruction = prompt or (
+        "These images are keyframes from one security camera recording, in time order. "
+        "Summarize the recording: describe the key objects, people, and actions, and how the scene changes."
+    )
+
+    content_parts = [instruction]
+    for index, image_path in enumerate(image_paths):
+        path = Path(image_path)
+        if not path.exists():
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        label = f"Frame {index + 1}"
+        if timestamps and index < len(timestamps):
+            label += f" ({timestamps[index]:.1f}s)"
+        content_parts.append(label + ":")
+        content_parts.append({
+            "mime_type": mimetypes.guess_type(path.name)[0] or "image/jpeg",
+            "data": path.read_bytes(),
+        })
+    if transcript:
+        content_parts.append(f"Transcript of the audio:\n{transcript}")
 
     try:
         response = model.generate_content(
-            [instruction, video_file],
+            content_parts,
             request_options={"timeout": timeout},
         )
     except Exception as exc:
-        genai.delete_file(video_file.name)
-        LOGGER.error(f"Gemini video summary failed: {exc}", exc_info=True)
-        raise RuntimeError(f"Gemini video summary failed: {exc}") from exc
-
-    genai.delete_file(video_file.name)
-    LOGGER.info(f"Cleaned up uploaded file: {video_file.name}")
+        LOGGER.error(f"Gemini keyframe summary failed: {exc}", exc_info=True)
+        raise RuntimeError(f"Gemini keyframe summary failed: {exc}") from exc
 
-    summary = getattr(response, "text", None)
+    summary = _response_text(response)
     if summary:
         return summary.strip()
 
     return "No summary returned"
 
 
-def search_memory_nodes(query: str, memory_nodes: List[Dict], max_results: int = 5, timeout: int = 60) -> List[Dict]:
+def search_memory_nodes(query: str, memory_nodes: List[Dict], max_results: int = 5, timeout: int = 60,
+                        prompt_budget: int = 8000) -> List[Dict]:
     """Search through MemoryNodes using Gemini to find the most relevant ones based on a query.
     
+    Each node is sent as a compact digest (see ai.digests); nodes that do not
+    fit in `prompt_budget` are left out of the prompt.
+    
     Args:
         query: User's search query
-        memory_nodes: List of MemoryNode dictionaries from the database
+        memory_nodes: List of MemoryNode dictionaries from the database, in priority order
         max_results: Maximum number of results to return
         timeout: Seconds to wait for Gemini response
+        prompt_budget: Maximum estimated tokens of node digests in the prompt
     
     Returns:
         List of the most relevant MemoryNode dictionaries, ordered by relevance
@@ -186,23 +505,10 @@ def search_memory_nodes(query: str, memory_nodes: List[Dict], max_results: int =
     
     model = _get_model()
     
-    nodes_text = "MemoryNodes:\n"
-    for i, node in enumerate(memory_nodes):
-        metadata_str = ""
-        if node.get('metadata'):
-            try:
-                metadata = json.loads(node['metadata']) if isinstance(node['metadata'], str) else node['metadata']
-                metadata_str = f"Metadata: {json.dumps(metadata, indent=2)}\n"
-            except:
-                metadata_str = f"Metadata: {node.get('metadata', '')}\n"
-        
-        nodes_text += f"""
-Node {node['id']}:
-  File Type: {node['file_type']}
-  File Path: {node['file_path']}
-  Timestamp: {node['timestamp']}
-  {metadata_str}
-"""
+    from ai.digests import pack_digests
+    
+    digests = pack_digests(memory_nodes, prompt_budget)
+    nodes_text = "MemoryNodes:\n\n" + "\n\n".join(digest for _, digest in digests)
     
     prompt = f"""You are a search assistant. Given the following MemoryNodes and a user query, identify the most relevant MemoryNodes.
 
@@ -211,13 +517,13 @@ Node {node['id']}:
 User Query: "{query}"
 
 Analyze the query and the MemoryNodes. Pay special attention to:
-- Summary content: Compare the query with the summary field in metadata. The summary describes what happened in the video/event.
-- Transcript content: Compare the query with the transcript field in metadata. The transcript contains the actual spoken words from the audio.
+- Summary content: Compare the query with the Summary line of each node. The summary describes what happened in the video/event.
+- Transcript content: Compare the query with the Transcript line (key sentences). The transcript contains the actual spoken words from the audio.
 - Semantic matching: Look for conceptual matches, not just exact keyword matches. For example, if the query mentions "cooking" and a summary says "preparing a meal", these should be considered relevant.
-- Objects detected: Check if the query mentions objects that appear in the objects_detected field.
+- Objects detected: Check if the query mentions objects that appear in the Objects line.
 - File type relevance (video, audio, transcript)
 - Timestamp relevance (if the query mentions time-related information)
-- Title: Check if the query matches the title field in metadata
+- Title: Check if the query matches the Title line
 
 The summary and transcript are the most important fields for determining relevance. A MemoryNode is relevant if:
 - Its summary describes events, people, or activities related to the query
@@ -236,31 +542,10 @@ Example response: [5, 12, 3]"""
             request_options={"timeout": timeout},
         )
         
-        response_text = getattr(response, "text", None)
-        if not response_text:
-            if hasattr(response, "candidates"):
-                for candidate in response.candidates or []:
-                    if not candidate.content or not getattr(candidate.content, "parts", None):
-                        continue
-                    for part in candidate.content.parts:
-                        text = getattr(part, "text", None)
-                        if text:
-                            response_text = text
-                            break
+        response_text = _response_text(response)
         
         if response_text:
-            response_text = response_text.strip()
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                response_text = "\n".join(lines[1:-1]) if len(lines) > 2 else response_text
-            elif response_text.startswith("`"):
-                response_text = response_text.strip("`")
-            
-            json_match = re.search(r'\[[\d\s,]+\]', response_text)
-            if json_match:
-                node_ids = json.loads(json_match.group())
-            else:
-                node_ids = json.loads(response_text)
+            node_ids = _parse_node_ids(response_text)
             
             node_map = {node['id']: node for node in memory_nodes}
             
@@ -278,6 +563,65 @@ Example response: [5, 12, 3]"""
     return []
 
 
+def rerank_memory_nodes(query: str, digests: List[Tuple[int, str]], max_results: int = 5, timeout: int = 20) -> List[int]:
+    """Ask Gemini to pick the MemoryNodes most relevant to a query from a shortlist.
+    
+    Unlike search_memory_nodes, this takes already packed digests and raises
+    on failure so callers can fall back to their own ranking.
+    
+    Args:
+        query: User's search query
+        digests: (node_id, digest_text) pairs for the shortlisted nodes
+        max_results: Maximum number of node IDs to return
+        timeout: Seconds to wait for Gemini response
+    
+    Raises:
+        RuntimeError: if the Gemini call fails or returns no parsable answer.
+    
+    Returns:
+        Node IDs ordered by relevance (only IDs present in digests)
+    """
+    if not digests:
+        return []
+    
+    model = _get_model()
+    nodes_text = "\n\n".join(digest for _, digest in digests)
+    prompt = f"""You are a search assistant. Below are short digests of recorded events (MemoryNodes), already shortlisted for the user's query. Pick the ones that best answer the query.
+
+{nodes_text}
+
+User Query: "{query}"
+
+Judge relevance by meaning, not just keywords: compare the query with each event's title, summary, transcript and detected objects, and use timestamps when the query refers to a time.
+
+Return ONLY a JSON array of the node IDs (as integers) that are relevant, ordered by relevance (most relevant first).
+Return at most {max_results} node IDs.
+Format: [id1, id2, id3, ...]"""
+
+    try:
+        response = model.generate_content(
+            prompt,
+            request_options={"timeout": timeout},
+        )
+    except Exception as exc:
+        raise RuntimeError(f"Gemini rerank failed: {exc}") from exc
+    
+    response_text = _response_text(response)
+    if not response_text:
+        raise RuntimeError("Gemini rerank returned no content")
+    try:
+        node_ids = _parse_node_ids(response_text)
+    except ValueError as exc:
+        raise RuntimeError(f"Could not parse Gemini rerank response: {response_text[:200]}") from exc
+    
+    allowed = {node_id for node_id, _ in digests}
+    ranked = []
+    for node_id in node_ids:
+        if node_id in allowed and node_id not in ranked:
+            ranked.append(node_id)
+    return ranked[:max_results]
+
+
 def generate_title(summary: str, timeout: int = 30) -> str:
     """Generate a very short title (max 50 characters) from a summary using Gemini.
     
@@ -347,15 +691,19 @@ Title:"""
     return fallback
 
 
-def generate_short_answer(query: str, summary: str, video_path: Optional[str] = None, audio_path: Optional[str] = None, timeout: int = 60) -> str:
+def generate_short_answer(query: str, summary: str, video_path: Optional[str] = None, audio_path: Optional[str] = None, timeout: int = 60,
+                          upload_deadline: float = UPLOAD_DEADLINE) -> str:
     """Generate a short answer to a user query based on an event summary, video, and audio using Gemini.
     
     Args:
         query: User's question/query
         summary: The event summary to base the answer on
         video_path: Optional path to the video file to analyze
-        audio_path: Optional path to the audio file to analyze
+        audio_path: Optional path to the audio file to analyze (WAV, FLAC or Opus; uploaded with
+                    its MIME type, see media_mime_type)
         timeout: Seconds to wait for Gemini response
+        upload_deadline: Seconds to wait for the video and audio uploads, which run in parallel;
+                         media not processed in time is left out of the request
     
     Returns:
         A short answer string
@@ -378,90 +726,24 @@ Provide a brief, natural answer (2-3 sentences maximum) that directly addresses
     
     content_parts.append(prompt)
     
-    video_file = None
-    if video_path and Path(video_path).exists():
-        try:
-            LOGGER.info(f"Uploading video for analysis: {Path(video_path).name}")
-            video_file = genai.upload_file(path=video_path)
-            
-            while video_file.state.name == "PROCESSING":
-                time.sleep(5)
-                video_file = genai.get_file(video_file.name)
-            
-            if video_file.state.name == "FAILED":
-                LOGGER.warning(f"Video processing failed for {Path(video_path).name}")
-                video_file = None
-            else:
-                content_parts.append(video_file)
-                LOGGER.info(f"Video uploaded successfully: {Path(video_path).name}")
-        except Exception as exc:
-            LOGGER.warning(f"Failed to upload video: {exc}")
-            video_file = None
-    
-    audio_file = None
-    if audio_path and Path(audio_path).exists():
-        try:
-            LOGGER.info(f"Uploading audio for analysis: {Path(audio_path).name}")
-            audio_file = genai.upload_file(path=audio_path)
-            
-            while audio_file.state.name == "PROCESSING":
-                time.sleep(5)
-                audio_file = genai.get_file(audio_file.name)
-            
-            if audio_file.state.name == "FAILED":
-                LOGGER.warning(f"Audio processing failed for {Path(audio_path).name}")
-                audio_file = None
-            else:
-                content_parts.append(audio_file)
-                LOGGER.info(f"Audio uploaded successfully: {Path(audio_path).name}")
-        except Exception as exc:
-            LOGGER.warning(f"Failed to upload audio: {exc}")
-            audio_file = None
-
+    media_paths = [path for path in (video_path, audio_path) if path and Path(path).exists()]
     try:
-        response = model.generate_content(
-            content_parts,
-            request_options={"timeout": timeout},
-        )
+        with get_upload_manager().uploaded(media_paths, deadline=upload_deadline, required=False) as media_files:
+            for media_path, media_file in zip(media_paths, media_files):
+                if media_file is None:
+                    LOGGER.warning(f"Answering without {Path(media_path).name} (upload failed)")
+                else:
+                    content_parts.append(media_file)
+            response = model.generate_content(
+                content_parts,
+                request_options={"timeout": timeout},
+            )
         
-        if video_file:
-            try:
-                genai.delete_file(video_file.name)
-                LOGGER.info(f"Cleaned up uploaded video file: {video_file.name}")
-            except:
-                pass
-        
-        if audio_file:
-            try:
-                genai.delete_file(audio_file.name)
-                LOGGER.info(f"Cleaned up uploaded audio file: {audio_file.name}")
-            except:
-                pass
-        
-        answer = getattr(response, "text", None)
+        answer = _response_text(response)
         if answer:
             return answer.strip()
         
-        if hasattr(response, "candidates"):
-            for candidate in response.candidates or []:
-                if not candidate.content or not getattr(candidate.content, "parts", None):
-                    continue
-                for part in candidate.content.parts:
-                    text = getattr(part, "text", None)
-                    if text:
-                        return text.strip()
-        
     except Exception as exc:
-        if video_file:
-            try:
-                genai.delete_file(video_file.name)
-            except:
-                pass
-        if audio_file:
-            try:
-                genai.delete_file(audio_file.name)
-            except:
-                pass
         LOGGER.error(f"Gemini answer generation failed: {exc}", exc_info=True)
     
     return "I'm sorry, I couldn't generate an answer to that question."
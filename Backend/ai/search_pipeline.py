@@ -0,0 +1,253 @@
+"""Two-stage MemoryNode search: fast local retrieval, then a Gemini rerank.
+
+Stage 1 narrows the archive to a fixed-size shortlist using only local
+indexes: time filters parsed from the query, the SQLite FTS5 index and the
+semantic embedding index, fused with reciprocal rank fusion.
+
+Stage 2 sends compact digests of the shortlist (ai.digests, bounded by a
+token budget) to Gemini for the final relevance judgment. If the model fails
+or does not answer within the deadline, the local ranking is returned
+instead, so search cost no longer grows with the archive.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from ai.digests import estimate_tokens, pack_digests
+from ai.search_cache import SearchCache, normalize_query
+from db.database import (
+    get_archive_version,
+    get_memory_node_ids_in_range,
+    get_memory_node_search_fields,
+    get_memory_nodes_by_ids,
+    search_memory_nodes_fts,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "25"))
+# Prompt budget for node digests, in estimated tokens.
+SEARCH_PROMPT_BUDGET = int(os.getenv("SEARCH_PROMPT_BUDGET_TOKENS", "2000"))
+SEARCH_RERANK_TIMEOUT = float(os.getenv("SEARCH_RERANK_TIMEOUT", "15"))
+# Upper bounds for the per-request overrides accepted by the search endpoint.
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_CANDIDATES = 200
+SEARCH_MAX_PROMPT_BUDGET = 16000
+SEARCH_MAX_RERANK_TIMEOUT = 60.0
+# Upper bound on the node IDs a time filter may restrict semantic search to.
+TIME_FILTER_MAX_IDS = 20000
+# Reciprocal rank fusion constant (the usual value from the RRF paper).
+RRF_K = 60
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "few": 3, "couple": 2,
+}
+_UNIT_SECONDS = {"minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+_RELATIVE_RE = re.compile(
+    r"\b(?:last|past|previous)\s+(?:(\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|few|couple)\s+(?:of\s+)?)?"
+    r"(minute|hour|day|week)s?\b"
+)
+_PARTS_OF_DAY = {
+    "morning": (5, 12),
+    "afternoon": (12, 17),
+    "evening": (17, 22),
+    "tonight": (18, 24),
+}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="SearchRerank")
+
+# Results are keyed on the archive version, so any MemoryNode write makes
+# earlier entries unreachable; the TTL bounds how stale relative time
+# phrases ("last hour") can get.
+result_cache = SearchCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "600")),
+)
+
+
+def parse_time_filter(query: str, now: Optional[datetime] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Extract a time window from phrases like "yesterday" or "last 2 hours".
+
+    Phrases are interpreted in local time and returned as naive UTC datetimes,
+    matching how the camera pipeline stamps MemoryNodes.
+
+    Returns:
+        (start, end) or (None, None) if the query mentions no time window
+    """
+    text = (query or "").lower()
+    now = (now or datetime.now()).astimezone()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end = None
+
+    match = _RELATIVE_RE.search(text)
+    if match:
+        count = match.group(1)
+        count = int(count) if count and count.isdigit() else _NUMBER_WORDS.get(count, 1)
+        start, end = now - timedelta(seconds=count * _UNIT_SECONDS[match.group(2)]), now
+    elif "last night" in text:
+        start, end = midnight - timedelta(hours=6), midnight + timedelta(hours=6)
+    elif "yesterday" in text:
+        start, end = midnight - timedelta(days=1), midnight
+    elif "this week" in text:
+        start, end = midnight - timedelta(days=now.weekday()), now
+    elif "last week" in text:
+        this_monday = midnight - timedelta(days=now.weekday())
+        start, end = this_monday - timedelta(days=7), this_monday
+    else:
+        for part, (first_hour, last_hour) in _PARTS_OF_DAY.items():
+            if part in text and ("this" in text or "today" in text or part == "tonight"):
+                start, end = midnight + timedelta(hours=first_hour), midnight + timedelta(hours=last_hour)
+                break
+        else:
+            if "today" in text:
+                start, end = midnight, now
+
+    if start is None:
+        return None, None
+    to_utc = lambda dt: dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc(start), to_utc(end)
+
+
+def _timestamp_bounds(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[str], Optional[str]]:
+    """Format a window as string bounds that include both stored timestamp styles.
+
+    Nodes are stamped either "YYYY-MM-DDTHH:MM:SS.ffffff" or
+    "YYYY-MM-DD HH:MM:SS"; a space-separated lower bound and a T-separated
+    upper bound compare correctly against both.
+    """
+    lower = start.strftime("%Y-%m-%d %H:%M:%S") if start else None
+    upper = end.strftime("%Y-%m-%dT%H:%M:%S.999999") if end else None
+    return lower, upper
+
+
+def retrieve_candidates(query: str, limit: int = SEARCH_CANDIDATES,
+                        file_type: Optional[str] = None) -> Tuple[List[Tuple[int, float]], Dict]:
+    """Stage 1: build a fused local ranking of at most `limit` node IDs.
+
+    Returns:
+        ([(node_id, fused_score)], info) where info describes the time filter
+        and which retrievers contributed
+    """
+    start, end = parse_time_filter(query)
+    lower, upper = _timestamp_bounds(start, end)
+    info = {"time_filter": {"start": lower, "end": upper} if start else None, "sources": {}}
+
+    range_ids = None
+    if start:
+        range_ids = get_memory_node_ids_in_range(lower, upper, file_type=file_type, limit=TIME_FILTER_MAX_IDS)
+        if not range_ids:
+            return [], info
+
+    rankings = []
+    try:
+        fts_ids = [n["id"] for n in search_memory_nodes_fts(
+            query, limit=limit, file_type=file_type, start_timestamp=lower, end_timestamp=upper)]
+        rankings.append(fts_ids)
+        info["sources"]["fts"] = len(fts_ids)
+    except Exception as exc:
+        LOGGER.warning("FTS retrieval failed: %s", exc)
+
+    try:
+        from ai.embeddings import semantic_search, sync_index
+
+        sync_index()
+        semantic_ids = [node_id for node_id, _ in semantic_search(query, k=limit, candidate_ids=range_ids)]
+        rankings.append(semantic_ids)
+        info["sources"]["semantic"] = len(semantic_ids)
+    except Exception as exc:
+        LOGGER.warning("Semantic retrieval failed: %s", exc)
+
+    if range_ids:
+        # Purely temporal questions ("what happened this morning?") may match no
+        # text at all; recency inside the window is a useful last-resort signal.
+        rankings.append(range_ids[:limit])
+        info["sources"]["recent_in_window"] = min(len(range_ids), limit)
+
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking):
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return ranked, info
+
+
+def search(query: str, max_results: int = 5, candidates: int = SEARCH_CANDIDATES,
+           prompt_budget: int = SEARCH_PROMPT_BUDGET, rerank_timeout: float = SEARCH_RERANK_TIMEOUT,
+           file_type: Optional[str] = None, rerank: bool = True) -> Dict:
+    """Run retrieval then rerank and return the most relevant MemoryNodes.
+
+    Args:
+        query: User's search query
+        max_results: Maximum number of MemoryNodes to return
+        candidates: Shortlist size produced by local retrieval
+        prompt_budget: Maximum estimated tokens of node digests sent to Gemini
+        rerank_timeout: Seconds to wait for Gemini before using the local ranking
+        file_type: Optional filter by file type
+        rerank: Set False to skip Gemini entirely
+
+    Returns:
+        Dictionary with `memory_nodes`, the `strategy` used ("rerank" or
+        "local"), candidate and timing details
+    """
+    start, end = parse_time_filter(query)
+    cache_key = (
+        normalize_query(query), max_results, candidates, prompt_budget, file_type, rerank,
+        start.strftime("%Y-%m-%d %H:%M") if start else None,
+        end.strftime("%Y-%m-%d %H:%M") if end else None,
+        get_archive_version(),
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached, cached=True)
+
+    timings = {}
+    t0 = time.perf_counter()
+    ranked, info = retrieve_candidates(query, limit=max(candidates, max_results), file_type=file_type)
+    timings["retrieve_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    ranked_ids = [node_id for node_id, _ in ranked]
+    strategy = "local"
+    result_ids = ranked_ids[:max_results]
+
+    if rerank and len(ranked_ids) > 1:
+        t1 = time.perf_counter()
+        shortlist = get_memory_node_search_fields(ranked_ids)
+        digests = pack_digests(shortlist, prompt_budget)
+        info["prompt_tokens"] = sum(estimate_tokens(d) for _, d in digests)
+        info["reranked"] = len(digests)
+        try:
+            from ai.gemini_client import rerank_memory_nodes
+
+            future = _executor.submit(rerank_memory_nodes, query, digests, max_results, int(rerank_timeout) + 1)
+            result_ids = future.result(timeout=rerank_timeout)
+            strategy = "rerank"
+        except FutureTimeout:
+            LOGGER.warning("Gemini rerank timed out after %.1fs; using local ranking", rerank_timeout)
+        except Exception as exc:
+            LOGGER.warning("Gemini rerank failed (%s); using local ranking", exc)
+        timings["rerank_ms"] = round((time.perf_counter() - t1) * 1000, 1)
+
+    timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    result = {
+        "memory_nodes": get_memory_nodes_by_ids(result_ids),
+        "strategy": strategy,
+        "candidate_count": len(ranked_ids),
+        "time_filter": info["time_filter"],
+        "sources": info["sources"],
+        "prompt_tokens": info.get("prompt_tokens", 0),
+        "timings": timings,
+        "cached": False,
+    }
+    # A local fallback caused by a Gemini timeout or error is not cached, so
+    # the next identical query gets another chance at a proper rerank.
+    if strategy == "rerank" or not rerank or len(ranked_ids) <= 1:
+        result_cache.put(cache_key, result)
+    return result
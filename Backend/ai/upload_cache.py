@@ -0,0 +1,201 @@
+"""Reuse cache for files uploaded to the Gemini File API.
+
+Summarizing a recording, transcribing its audio and answering questions
+about it used to upload the same media again each time. Uploaded files stay
+usable on Gemini's side until they expire (48 hours), so the UploadManager in
+ai.gemini_client keeps their handles here, keyed by a hash of the file
+content, and only uploads what is not cached yet.
+
+Entries leave the cache when they expire, when the cache holds more than
+`max_files` files or `max_bytes` bytes (least recently used first), or on
+`clear()`. The `on_evict` callback deletes the remote file; an entry still in
+use by a request is evicted when that request releases it. Expired entries
+are swept on every lookup, insert and `stats()` call, so their remote files
+are deleted promptly instead of when their key happens to be requested again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Entries are dropped this long before Gemini's own expiry so a request never gets a file that expires mid-call.
+EXPIRY_MARGIN = 600.0
+# Used when the remote file carries no expiration time.
+DEFAULT_TTL = 47 * 3600.0
+
+
+def remote_ttl(remote: Any, default: float = DEFAULT_TTL) -> float:
+    """Seconds until a Gemini file handle expires (its expiration_time minus EXPIRY_MARGIN)."""
+    expiration = getattr(remote, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        if expiration.tzinfo is None:
+            expiration = expiration.replace(tzinfo=timezone.utc)
+        return (expiration - datetime.now(timezone.utc)).total_seconds() - EXPIRY_MARGIN
+    return default
+
+
+class UploadCache:
+    """Thread-safe LRU of remote file handles keyed by content hash, with per-entry expiry."""
+
+    def __init__(self, max_files: int = 64, max_bytes: int = 2 * 1024 ** 3,
+                 on_evict: Optional[Callable[[Any], None]] = None):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        # key -> [remote, size, expires_at, refs]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._bytes = 0
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stale = 0
+        self.evictions = 0
+        self.bytes_uploaded = 0
+        self.bytes_saved = 0
+
+    def file_key(self, path: str) -> str:
+        """SHA-256 of the file content (memoized by path, size and mtime)."""
+        st = os.stat(path)
+        memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+            if digest:
+                self._hashes.move_to_end(memo_key)
+                return digest
+        sha = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._hashes[memo_key] = digest
+            while len(self._hashes) > 4 * self.max_files:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def acquire(self, key: str) -> Optional[Any]:
+        """Return the cached handle for `key` and mark it in use, or None on a miss."""
+        with self._lock:
+            evicted = self._sweep_expired()
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                # Expired while in use by another caller; evicted on release.
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                entry[3] += 1
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += entry[1]
+        self._evict(evicted)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, remote: Any, size: int, ttl: float) -> bool:
+        """Cache a freshly uploaded handle, marked in use by the caller.
+
+        Returns:
+            False if the key is already cached (the caller keeps `remote` and deletes it itself)
+        """
+        with self._lock:
+            self.bytes_uploaded += size
+            if key in self._entries or ttl <= 0:
+                return False
+            self._entries[key] = [remote, size, time.monotonic() + ttl, 1]
+            self._bytes += size
+            evicted = self._sweep_expired() + self._over_limit()
+        self._evict(evicted)
+        return True
+
+    def release(self, key: str):
+        """The caller is done with the handle; it may now be evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[3] = max(0, entry[3] - 1)
+            evicted = self._over_limit()
+            if entry[3] == 0 and entry[2] <= time.monotonic() and key in self._entries:
+                evicted.append(self._remove(key))
+        self._evict(evicted)
+
+    def invalidate(self, key: str):
+        """Drop an entry the caller acquired whose remote file turned out to be unusable.
+
+        The lookup is counted as a miss instead of a hit.
+        """
+        with self._lock:
+            evicted = []
+            if key in self._entries:
+                self.hits -= 1
+                self.misses += 1
+                self.bytes_saved -= self._entries[key][1]
+                self.stale += 1
+                evicted.append(self._remove(key))
+        self._evict(evicted)
+
+    def clear(self) -> int:
+        """Evict every entry that is not in use."""
+        with self._lock:
+            evicted = [self._remove(key) for key, entry in list(self._entries.items()) if entry[3] == 0]
+        self._evict(evicted)
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            evicted = self._sweep_expired()
+            lookups = self.hits + self.misses
+            stats = {
+                "files": len(self._entries),
+                "bytes": self._bytes,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                "in_use": sum(1 for entry in self._entries.values() if entry[3]),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "bytes_uploaded": self.bytes_uploaded,
+                "bytes_saved": self.bytes_saved,
+            }
+        self._evict(evicted)
+        return stats
+
+    def _sweep_expired(self) -> List[Any]:
+        """Remove every idle entry past its expiry (lock held)."""
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry[3] == 0 and entry[2] <= now]
+        self.expired += len(expired)
+        return [self._remove(key) for key in expired]
+
+    def _over_limit(self) -> List[Any]:
+        """Remove least recently used idle entries until within limits (lock held)."""
+        evicted = []
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_files and self._bytes <= self.max_bytes:
+                break
+            if self._entries[key][3] == 0:
+                evicted.append(self._remove(key))
+                self.evictions += 1
+        return evicted
+
+    def _remove(self, key: str) -> Any:
+        remote, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+        return remote
+
+    def _evict(self, remotes: List[Any]):
+        if self.on_evict:
+            for remote in remotes:
+                self.on_evict(remote)
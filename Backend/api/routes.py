@@ -10,14 +10,20 @@ from db.database import (
     get_events, 
     search_events, 
     create_memory_node, 
-    get_all_memory_nodes_for_search,
     get_memory_nodes,
     get_memory_node_by_id,
-    cleanup_orphaned_memory_nodes
+    cleanup_orphaned_memory_nodes,
+    search_memory_nodes_fts,
+    get_archive_version,
+    get_jobs,
+    get_pipeline_stats
 )
-from audio import recorder, transcribe_audio, save_transcript
-from ai.gemini_client import search_memory_nodes as gemini_search_memory_nodes, generate_short_answer
-from camera.camera_service import get_camera_service
+from audio import recorder, transcribe_audio, save_transcript, get_transcription_client
+from ai.gemini_client import generate_short_answer, get_upload_manager
+from ai import search_pipeline
+from camera.camera_module import DEFAULT_CAMERA_ID, recover_recording_pipeline
+from camera.camera_service import get_camera_manager, get_camera_service
+from jobs.queue import get_job_queue
 
 api = Blueprint("api", __name__)
 
@@ -221,43 +227,143 @@ def get_memory_node_endpoint(node_id):
         return jsonify({"error": f"Failed to get MemoryNode: {str(e)}"}), 500
 
 
+def _bounded_number(data, name, cast, default, minimum, maximum):
+    """Read a numeric request field, clamped to `maximum`.
+    
+    Raises:
+        ValueError: if the value is not a number or is below `minimum`
+    """
+    value = data.get(name, default)
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number")
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if value != value or value < minimum:  # NaN compares unequal to itself
+        raise ValueError(f"{name} must be at least {minimum}")
+    return min(value, maximum)
+
+
 @api.route("/memory-nodes/search", methods=["POST"])
 def search_memory_nodes_endpoint():
-    """Search MemoryNodes using Gemini AI"""
+    """Search MemoryNodes: local retrieval narrows to a shortlist, then Gemini reranks it"""
     data = request.get_json() or {}
     query = data.get("query", "")
-    max_results = data.get("max_results", 5)
     
-    if not query:
+    if not query or not isinstance(query, str):
         return jsonify({"error": "Query parameter is required"}), 400
+    try:
+        max_results = _bounded_number(data, "max_results", int, 5, 1, search_pipeline.SEARCH_MAX_RESULTS)
+        candidates = _bounded_number(data, "candidates", int, search_pipeline.SEARCH_CANDIDATES,
+                                     1, search_pipeline.SEARCH_MAX_CANDIDATES)
+        prompt_budget = _bounded_number(data, "prompt_budget", int, search_pipeline.SEARCH_PROMPT_BUDGET,
+                                        100, search_pipeline.SEARCH_MAX_PROMPT_BUDGET)
+        rerank_timeout = _bounded_number(data, "rerank_timeout", float, search_pipeline.SEARCH_RERANK_TIMEOUT,
+                                         0.0, search_pipeline.SEARCH_MAX_RERANK_TIMEOUT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
-        all_nodes = get_all_memory_nodes_for_search()
-        
-        if not all_nodes:
-            return jsonify({"memory_nodes": []}), 200
-        
-        results = gemini_search_memory_nodes(
+        result = search_pipeline.search(
             query=query,
-            memory_nodes=all_nodes,
-            max_results=max_results
+            max_results=max_results,
+            candidates=candidates,
+            prompt_budget=prompt_budget,
+            rerank_timeout=rerank_timeout,
+            file_type=data.get("file_type"),
+            rerank=bool(data.get("rerank", True))
         )
         
         return jsonify({
             "query": query,
-            "memory_nodes": results,
-            "total_found": len(results)
+            "memory_nodes": result["memory_nodes"],
+            "total_found": len(result["memory_nodes"]),
+            "strategy": result["strategy"],
+            "candidate_count": result["candidate_count"],
+            "time_filter": result["time_filter"],
+            "timings": result["timings"],
+            "cached": result["cached"]
         }), 200
         
     except Exception as e:
         return jsonify({"error": f"Search failed: {str(e)}"}), 500
 
 
+@api.route("/memory-nodes/search/cache", methods=["GET"])
+def get_search_cache_stats():
+    """Get hit/miss statistics for the MemoryNode search result cache"""
+    stats = search_pipeline.result_cache.stats()
+    stats["archive_version"] = get_archive_version()
+    return jsonify(stats), 200
+
+
+@api.route("/memory-nodes/search/cache", methods=["DELETE"])
+def clear_search_cache():
+    """Drop all cached MemoryNode search results"""
+    cleared = search_pipeline.result_cache.clear()
+    return jsonify({"status": "cleared", "entries_removed": cleared}), 200
+
+
+@api.route("/transcription/stats", methods=["GET"])
+def get_transcription_stats():
+    """Get request counters of the shared transcription client (inline vs uploaded, queueing)"""
+    return jsonify(get_transcription_client().stats()), 200
+
+
+@api.route("/uploads/cache", methods=["GET"])
+def get_upload_cache_stats():
+    """Get upload counters and reuse statistics (hits, bytes saved) for media sent to Gemini"""
+    return jsonify(get_upload_manager().stats()), 200
+
+
+@api.route("/uploads/cache", methods=["DELETE"])
+def clear_upload_cache():
+    """Delete cached Gemini uploads that are not in use"""
+    cleared = get_upload_manager().cache.clear()
+    return jsonify({"status": "cleared", "files_deleted": cleared}), 200
+
+
+@api.route("/memory-nodes/fts", methods=["GET"])
+def search_memory_nodes_fts_endpoint():
+    """Search MemoryNodes locally with the SQLite full-text index (BM25 ranked)"""
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", 20, type=int)
+    file_type = request.args.get("file_type")
+    start = request.args.get("start")
+    end = request.args.get("end")
+    
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    
+    try:
+        results = search_memory_nodes_fts(
+            query,
+            limit=limit,
+            file_type=file_type,
+            start_timestamp=start,
+            end_timestamp=end
+        )
+        return jsonify({
+            "query": query,
+            "memory_nodes": results,
+            "total_found": len(results)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Full-text search failed: {str(e)}"}), 500
+
+
 @api.route("/memory-nodes/cleanup", methods=["POST"])
 def cleanup_orphaned_memory_nodes_endpoint():
     """Remove memory nodes whose associated files no longer exist"""
     try:
         deleted_count, deleted_ids = cleanup_orphaned_memory_nodes()
+        if deleted_count:
+            try:
+                from ai.embeddings import remove_deleted
+                remove_deleted()
+            except Exception as e:
+                LOGGER.warning(f"Failed to remove deleted nodes from the semantic index: {e}")
         return jsonify({
             "message": f"Cleaned up {deleted_count} orphaned memory nodes",
             "deleted_count": deleted_count,
@@ -440,8 +546,7 @@ def start_camera():
     data = request.get_json() or {}
     
     try:
-        camera_service = get_camera_service()
-        result, status_code = camera_service.start(**data)
+        result, status_code = get_camera_manager().start(DEFAULT_CAMERA_ID, **data)
         return jsonify(result), status_code
     except Exception as e:
         return jsonify({"error": f"Failed to start camera: {str(e)}"}), 500
@@ -468,3 +573,91 @@ def get_camera_status():
     except Exception as e:
         return jsonify({"error": f"Failed to get camera status: {str(e)}"}), 500
 
+
+@api.route("/cameras", methods=["GET"])
+def list_cameras():
+    """Get the status of every camera plus the shared job queue and database writer"""
+    try:
+        return jsonify(get_camera_manager().get_all_status()), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to list cameras: {str(e)}"}), 500
+
+
+@api.route("/cameras/<camera_id>/start", methods=["POST"])
+def start_camera_by_id(camera_id):
+    """Start motion detection and recording for one camera"""
+    data = request.get_json() or {}
+    
+    try:
+        result, status_code = get_camera_manager().start(camera_id, **data)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": f"Failed to start camera: {str(e)}"}), 500
+
+
+@api.route("/cameras/<camera_id>/stop", methods=["POST"])
+def stop_camera_by_id(camera_id):
+    """Stop one camera"""
+    try:
+        result, status_code = get_camera_manager().stop(camera_id)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": f"Failed to stop camera: {str(e)}"}), 500
+
+
+@api.route("/cameras/<camera_id>/status", methods=["GET"])
+def get_camera_status_by_id(camera_id):
+    """Get the status of one camera"""
+    try:
+        result, status_code = get_camera_manager().get_status(camera_id)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": f"Failed to get camera status: {str(e)}"}), 500
+
+
+@api.route("/jobs", methods=["GET"])
+def get_job_queue_status():
+    """Get queue depth, latency and worker counters for each background job type"""
+    try:
+        return jsonify(get_job_queue().stats()), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to get job stats: {str(e)}"}), 500
+
+
+@api.route("/jobs/list", methods=["GET"])
+def list_jobs():
+    """List recent background jobs, optionally filtered by ?status= and ?type="""
+    status = request.args.get("status")
+    job_type = request.args.get("type")
+    limit = request.args.get("limit", 50, type=int)
+    try:
+        jobs = get_jobs(status=status, job_type=job_type, limit=limit)
+        for job in jobs:
+            job["payload"] = json.loads(job["payload"] or "{}")
+        return jsonify({"jobs": jobs, "count": len(jobs)}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to list jobs: {str(e)}"}), 500
+
+
+@api.route("/pipeline/status", methods=["GET"])
+def get_pipeline_status():
+    """Get per-stage progress of recordings (recorded, transcribed, summarized, titled, indexed)"""
+    stuck_after = request.args.get("stuck_after", 600, type=int)
+    try:
+        return jsonify({
+            "pipeline": get_pipeline_stats(stuck_after_seconds=stuck_after),
+            "jobs": get_job_queue().stats(),
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to get pipeline status: {str(e)}"}), 500
+
+
+@api.route("/pipeline/recover", methods=["POST"])
+def recover_pipeline():
+    """Re-queue unfinished recording stages; pass {"retry_failed": true} to also retry failed ones"""
+    data = request.get_json(silent=True) or {}
+    try:
+        counts = recover_recording_pipeline(retry_failed=bool(data.get("retry_failed", False)))
+        return jsonify({"status": "ok", "queued": counts}), 200
+    except Exception as e:
+        return jsonify({"error": f"Pipeline recovery failed: {str(e)}"}), 500
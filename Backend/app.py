@@ -1,10 +1,15 @@
+import atexit
+import os
+import threading
+
 from flask import Flask
 
 from flask_cors import CORS
-from db.database import init_db
+from db.database import init_db, close_db
 from api.routes import api
+from camera.camera_module import recover_recording_pipeline, register_recording_jobs
 
-def create_app():
+def create_app(start_jobs=True):
     app = Flask(__name__)
     CORS(
         app,
@@ -19,6 +24,19 @@ def create_app():
     )
 
     init_db()
+    atexit.register(close_db)
+    if start_jobs:
+        # Resumes analysis/transcription jobs left over from the previous run.
+        job_queue = register_recording_jobs()
+        job_queue.start()
+        atexit.register(job_queue.stop)
+        # Re-queue recordings whose pipeline stages never finished.
+        threading.Thread(
+            target=recover_recording_pipeline,
+            args=(job_queue,),
+            daemon=True,
+            name="PipelineRecovery",
+        ).start()
 
     app.register_blueprint(api, url_prefix="/api")
 
@@ -29,5 +47,7 @@ def create_app():
     return app
 
 if __name__ == "__main__":
-    app = create_app()
+    # With debug=True the reloader runs this file twice; only the child
+    # process (WERKZEUG_RUN_MAIN) serves requests and should run jobs.
+    app = create_app(start_jobs=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
     app.run(host="0.0.0.0", port=5000, debug=True)
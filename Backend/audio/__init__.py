@@ -7,8 +7,12 @@ from .audio_module import (
     recorder,
     transcribe_audio,
     transcribe_with_gemini,
+    transcribe_samples,
+    analyze_speech,
+    has_speech,
     save_transcript,
     get_api_key,
+    get_transcription_client,
     record_to_wav,
     main,
     parse_args
@@ -19,8 +23,12 @@ __all__ = [
     "recorder",
     "transcribe_audio",
     "transcribe_with_gemini",
+    "transcribe_samples",
+    "analyze_speech",
+    "has_speech",
     "save_transcript",
     "get_api_key",
+    "get_transcription_client",
     "record_to_wav",
     "main",
     "parse_args"
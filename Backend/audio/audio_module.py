@@ -5,13 +5,18 @@ Can also be used as a standalone CLI script (like SpeechtoText.py)
 """
 # Standard library imports
 import argparse
+import io
+import json
 import os
 import queue
 import sys
 import threading
+import time
+from collections import deque
 from datetime import datetime
 
 # Third-party imports
+import numpy as np
 import sounddevice as sd
 import soundfile as sf
 from dotenv import load_dotenv
@@ -24,6 +29,51 @@ SAMPLE_RATE = 16_000
 CHANNELS = 1
 SUBTYPE = "PCM_16"
 
+# Recording file formats (all written by libsndfile). Lossless FLAC takes about
+# half the space of PCM WAV; Opus in an OGG container about a tenth, at speech quality.
+AUDIO_FORMATS = {
+    "wav": {"format": "WAV", "subtype": "PCM_16", "extension": ".wav", "mime_type": "audio/wav"},
+    "flac": {"format": "FLAC", "subtype": "PCM_16", "extension": ".flac", "mime_type": "audio/flac"},
+    "opus": {"format": "OGG", "subtype": "OPUS", "extension": ".ogg", "mime_type": "audio/ogg"},
+}
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "flac").strip().lower()
+if AUDIO_FORMAT not in AUDIO_FORMATS:
+    # The module-level recorder is built at import; a typo must not break the app.
+    print(f"[Audio] Unknown AUDIO_FORMAT '{AUDIO_FORMAT}' (expected one of {', '.join(AUDIO_FORMATS)}); "
+          f"recording FLAC", file=sys.stderr)
+    AUDIO_FORMAT = "flac"
+
+# Streaming transcription chunks: cut at the first pause after CHUNK_MIN_SECONDS,
+# and at CHUNK_MAX_SECONDS regardless. A pause is CHUNK_SILENCE_SECONDS of audio
+# whose RMS level stays below CHUNK_SILENCE_RMS (full scale = 1.0).
+CHUNK_MIN_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_MIN_SECONDS", "3"))
+CHUNK_MAX_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "10"))
+CHUNK_SILENCE_RMS = float(os.getenv("TRANSCRIPTION_SILENCE_RMS", "0.01"))
+CHUNK_SILENCE_SECONDS = float(os.getenv("TRANSCRIPTION_SILENCE_SECONDS", "0.3"))
+
+# Voice activity detection: a VAD_FRAME_SECONDS frame is speech when its RMS level
+# reaches VAD_RMS_THRESHOLD and its zero-crossing rate (sign changes per sample)
+# stays below VAD_ZCR_MAX, as for voiced speech; hiss and fan noise cross zero
+# far more often. Frames 3x louder than the threshold count regardless (fricatives).
+VAD_FRAME_SECONDS = float(os.getenv("VAD_FRAME_SECONDS", "0.03"))
+VAD_RMS_THRESHOLD = float(os.getenv("VAD_RMS_THRESHOLD", "0.01"))
+VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", "0.35"))
+# Speech segments closer than VAD_MERGE_GAP are joined; shorter than VAD_MIN_SEGMENT are dropped.
+VAD_MERGE_GAP = float(os.getenv("VAD_MERGE_GAP", "0.3"))
+VAD_MIN_SEGMENT = float(os.getenv("VAD_MIN_SEGMENT", "0.12"))
+# Clips with less speech than this in total are not transcribed at all.
+VAD_MIN_SPEECH_SECONDS = float(os.getenv("VAD_MIN_SPEECH_SECONDS", "0.3"))
+# Audio kept around the speech when leading and trailing silence is trimmed.
+VAD_PADDING = float(os.getenv("VAD_PADDING", "0.25"))
+
+# Transcription requests in flight at once (further callers wait for a slot).
+TRANSCRIPTION_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "4"))
+# Audio up to this size is sent inline with the request; larger files are
+# uploaded from disk through the File API (see ai.gemini_client.UploadManager).
+TRANSCRIPTION_INLINE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_INLINE_MAX_BYTES", str(8 * 1024 * 1024)))
+TRANSCRIPTION_PROMPT = "Transcribe the speech:"
+CHUNK_TRANSCRIPTION_PROMPT = "Transcribe the speech. Return only the spoken words, or nothing if there is no speech:"
+
 # Global queue for standalone recording (for CLI compatibility)
 audio_queue = queue.Queue()
 
@@ -43,12 +93,14 @@ def record_to_wav(output_path: str):
     print(f"Recording to {output_path}")
     print("Press Ctrl+C to stop.\n")
 
+    file_format = audio_format_for_path(output_path)
     with sf.SoundFile(
         output_path,
         mode="w",
         samplerate=SAMPLE_RATE,
         channels=CHANNELS,
-        subtype=SUBTYPE,
+        format=file_format["format"],
+        subtype=file_format["subtype"],
     ) as wav_file:
 
         with sd.InputStream(
@@ -63,32 +115,284 @@ def record_to_wav(output_path: str):
                 print("\nRecording stopped.")
 
 
+def audio_format_for_path(path: str):
+    """The AUDIO_FORMATS entry matching a file's extension (WAV for unknown extensions)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".opus":
+        return AUDIO_FORMATS["opus"]
+    for entry in AUDIO_FORMATS.values():
+        if entry["extension"] == extension:
+            return entry
+    return AUDIO_FORMATS["wav"]
+
+
+def audio_mime_type(path: str) -> str:
+    """MIME type to send an audio file to Gemini with"""
+    return audio_format_for_path(path)["mime_type"]
+
+
+class AudioChunker:
+    """Splits a stream of audio blocks into silence-delimited chunks"""
+    
+    def __init__(self, min_seconds: float = CHUNK_MIN_SECONDS, max_seconds: float = CHUNK_MAX_SECONDS,
+                 silence_rms: float = CHUNK_SILENCE_RMS, silence_seconds: float = CHUNK_SILENCE_SECONDS):
+        self.min_samples = int(min_seconds * SAMPLE_RATE)
+        self.max_samples = int(max(max_seconds, min_seconds) * SAMPLE_RATE)
+        self.silence_rms = silence_rms
+        self.silence_samples = int(silence_seconds * SAMPLE_RATE)
+        self.blocks = []
+        self.samples = 0
+        self.silent_samples = 0
+        self.offset = 0
+    
+    def feed(self, block):
+        """Add a block; returns (start_seconds, samples) when a chunk is complete, else None"""
+        self.blocks.append(block)
+        self.samples += len(block)
+        rms = float(np.sqrt(np.mean(np.square(block, dtype=np.float64)))) if len(block) else 0.0
+        self.silent_samples = self.silent_samples + len(block) if rms < self.silence_rms else 0
+        if self.samples >= self.max_samples or (
+            self.samples >= self.min_samples and self.silent_samples >= self.silence_samples
+        ):
+            return self.flush()
+        return None
+    
+    def flush(self):
+        """Return the buffered audio as (start_seconds, samples), or None if empty"""
+        if not self.blocks:
+            return None
+        samples = np.concatenate(self.blocks)
+        start = self.offset / SAMPLE_RATE
+        self.offset += len(samples)
+        self.blocks = []
+        self.samples = 0
+        self.silent_samples = 0
+        return start, samples
+
+
+class VoiceActivityDetector:
+    """Energy / zero-crossing voice activity detection, fed block by block while audio is written"""
+    
+    def __init__(self, frame_seconds: float = VAD_FRAME_SECONDS, rms_threshold: float = VAD_RMS_THRESHOLD,
+                 zcr_max: float = VAD_ZCR_MAX):
+        self.frame_seconds = frame_seconds
+        self.frame_samples = max(1, int(frame_seconds * SAMPLE_RATE))
+        self.rms_threshold = rms_threshold
+        self.zcr_max = zcr_max
+        self.samples = 0
+        self._flags = []
+        self._rest = np.zeros(0, dtype=np.float32)
+    
+    def feed(self, block):
+        """Classify the complete frames in a block of mono samples (the remainder waits for the next block)"""
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        self.samples += len(block)
+        data = np.concatenate([self._rest, block]) if len(self._rest) else block
+        count = len(data) // self.frame_samples
+        self._rest = data[count * self.frame_samples:].copy()
+        if count:
+            self._flags.append(self._classify(data[:count * self.frame_samples].reshape(count, self.frame_samples)))
+    
+    def _classify(self, frames):
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return (rms >= self.rms_threshold) & ((zcr <= self.zcr_max) | (rms >= 3 * self.rms_threshold))
+    
+    def result(self):
+        """Return {"duration", "speech_seconds", "segments": [[start, end], ...]} in seconds"""
+        flags = np.concatenate(self._flags) if self._flags else np.zeros(0, dtype=bool)
+        edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) * self.frame_seconds
+        ends = np.flatnonzero(edges == -1) * self.frame_seconds
+        segments = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if segments and start - segments[-1][1] < VAD_MERGE_GAP:
+                segments[-1][1] = end
+            else:
+                segments.append([start, end])
+        segments = [[round(start, 2), round(end, 2)] for start, end in segments if end - start >= VAD_MIN_SEGMENT]
+        return {
+            "duration": round(self.samples / SAMPLE_RATE, 2),
+            "speech_seconds": round(sum((end - start for start, end in segments), 0.0), 2),
+            "segments": segments,
+        }
+
+
+def detect_speech(samples):
+    """Run voice activity detection over mono samples held in memory (see VoiceActivityDetector.result)"""
+    vad = VoiceActivityDetector()
+    vad.feed(samples)
+    return vad.result()
+
+
+def has_speech(speech) -> bool:
+    """Whether a VAD result holds enough speech to be worth transcribing"""
+    return speech["speech_seconds"] >= VAD_MIN_SPEECH_SECONDS
+
+
+def speech_range(speech):
+    """(start, end) seconds of the audio to transcribe: the speech plus VAD_PADDING, without leading/trailing silence"""
+    if not speech["segments"]:
+        return 0.0, speech["duration"]
+    start = max(0.0, speech["segments"][0][0] - VAD_PADDING)
+    end = min(speech["duration"], speech["segments"][-1][1] + VAD_PADDING)
+    return start, end
+
+
+def speech_path(audio_path: str) -> str:
+    """Sidecar file holding the VAD result of a recording"""
+    return os.path.splitext(audio_path)[0] + ".speech.json"
+
+
+def analyze_speech(audio_path: str):
+    """
+    Return the VAD result of an audio file.
+    Uses the sidecar the SpeechRecorder writes while recording; other files are
+    analyzed block by block (and the result saved next to them).
+    """
+    path = speech_path(audio_path)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Unreadable speech file {path}: {e}", file=sys.stderr)
+    
+    vad = VoiceActivityDetector()
+    for block in sf.blocks(audio_path, blocksize=SAMPLE_RATE, dtype="float32", always_2d=True):
+        vad.feed(block[:, 0])
+    speech = vad.result()
+    _save_speech(audio_path, speech)
+    return speech
+
+
+def _save_speech(audio_path: str, speech):
+    try:
+        with open(speech_path(audio_path), "w", encoding="utf-8") as f:
+            json.dump(speech, f)
+    except OSError as e:
+        print(f"Failed to write speech file for {audio_path}: {e}", file=sys.stderr)
+
+
 class SpeechRecorder:
-    """Thread-safe audio recorder for Flask"""
+    """Thread-safe audio recorder for Flask
+    
+    The file format follows the output path's extension (.wav, .flac or .ogg
+    for Opus, see AUDIO_FORMATS); `file_extension` is the one of the
+    recorder's configured `audio_format`, for callers that name the files.
+    
+    With `start_monitoring(pre_roll)` the input stream stays open between
+    recordings and the last `pre_roll` seconds of audio are kept in memory;
+    the next `start_recording` writes them to the WAV file first.
+    
+    With `on_chunk`, the recorded audio is also handed out in silence-delimited
+    chunks while recording continues (see AudioChunker), for streaming
+    transcription: `on_chunk(index, start_seconds, samples, final)` is called
+    from the writer thread, and the last call (possibly with no samples) has
+    `final=True`.
+    
+    Voice activity detection runs on the audio as it is written; when the
+    recording stops its speech segments are saved next to the WAV file (see
+    analyze_speech) and kept in `speech`.
+    """
     
-    def __init__(self):
+    def __init__(self, audio_format: str = AUDIO_FORMAT):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format '{audio_format}' (expected one of {', '.join(AUDIO_FORMATS)})")
+        self.audio_format = audio_format
+        self.file_extension = AUDIO_FORMATS[audio_format]["extension"]
         self.audio_queue = queue.Queue()
         self.is_recording = False
         self.recording_thread = None
+        self.writer_stop = None
         self.wav_file = None
         self.stream = None
         self.output_path = None
+        self.is_monitoring = False
+        self.pre_roll_seconds = 0.0
+        self.pre_roll = deque()
+        self.pre_roll_samples = 0
+        self.on_chunk = None
+        self.speech = None
+        self.lock = threading.Lock()
         
     def audio_callback(self, indata, frames, time_info, status):
         """Callback for audio input stream"""
         if status:
             print(f"[Audio status] {status}", file=sys.stderr)
+        with self.lock:
+            if self.is_recording:
+                self.audio_queue.put(indata.copy())
+            elif self.is_monitoring:
+                self._remember(indata.copy())
+    
+    def _remember(self, block):
+        """Append a block to the pre-roll, dropping the oldest audio beyond the limit"""
+        self.pre_roll.append(block)
+        self.pre_roll_samples += len(block)
+        limit = int(self.pre_roll_seconds * SAMPLE_RATE)
+        while self.pre_roll and self.pre_roll_samples - len(self.pre_roll[0]) >= limit:
+            self.pre_roll_samples -= len(self.pre_roll.popleft())
+    
+    def _open_stream(self):
+        self.stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            callback=self.audio_callback,
+        )
+        self.stream.start()
+    
+    def start_monitoring(self, pre_roll_seconds: float):
+        """Keep the microphone open and buffer the last `pre_roll_seconds` of audio"""
+        if self.is_monitoring:
+            return {"error": "Already monitoring"}, 400
         if self.is_recording:
-            self.audio_queue.put(indata.copy())
+            return {"error": "Recording already in progress"}, 400
+        
+        try:
+            with self.lock:
+                self.pre_roll_seconds = max(0.0, float(pre_roll_seconds))
+                self.pre_roll.clear()
+                self.pre_roll_samples = 0
+                self.is_monitoring = True
+            self._open_stream()
+            return {"message": "Monitoring started", "pre_roll_seconds": self.pre_roll_seconds}, 200
+        except Exception as e:
+            self.is_monitoring = False
+            self.stream = None
+            return {"error": f"Failed to start monitoring: {str(e)}"}, 500
     
-    def start_recording(self, output_path: str = "recording.wav"):
-        """Start recording audio to a WAV file"""
+    def stop_monitoring(self):
+        """Close the monitoring stream (an active recording is stopped first)"""
+        if not self.is_monitoring:
+            return {"error": "Not monitoring"}, 400
+        if self.is_recording:
+            self.stop_recording()
+        
+        with self.lock:
+            self.is_monitoring = False
+            self.pre_roll.clear()
+            self.pre_roll_samples = 0
+        try:
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+            self.stream = None
+            return {"message": "Monitoring stopped"}, 200
+        except Exception as e:
+            return {"error": f"Failed to stop monitoring: {str(e)}"}, 500
+    
+    def start_recording(self, output_path: str = "recording.wav", on_chunk=None):
+        """Start recording audio to a WAV, FLAC or Opus file (prefixed with any buffered pre-roll)"""
         if self.is_recording:
             return {"error": "Recording already in progress"}, 400
         
         self.output_path = output_path
-        self.is_recording = True
         self.audio_queue = queue.Queue()
+        self.on_chunk = on_chunk
+        self.speech = None
+        file_format = audio_format_for_path(output_path)
         
         try:
             self.wav_file = sf.SoundFile(
@@ -96,19 +400,25 @@ class SpeechRecorder:
                 mode="w",
                 samplerate=SAMPLE_RATE,
                 channels=CHANNELS,
-                subtype=SUBTYPE,
+                format=file_format["format"],
+                subtype=file_format["subtype"],
             )
             
-            self.stream = sd.InputStream(
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                callback=self.audio_callback,
-            )
+            with self.lock:
+                while self.pre_roll:
+                    self.audio_queue.put(self.pre_roll.popleft())
+                self.pre_roll_samples = 0
+                self.is_recording = True
             
-            self.stream.start()
+            if not self.is_monitoring:
+                self._open_stream()
             
-            # Start thread to write audio data
-            self.recording_thread = threading.Thread(target=self._write_audio_data)
+            # Start thread to write audio data; it owns (and closes) this file
+            self.writer_stop = threading.Event()
+            self.recording_thread = threading.Thread(
+                target=self._write_audio_data,
+                args=(self.audio_queue, self.wav_file, self.writer_stop),
+            )
             self.recording_thread.daemon = True
             self.recording_thread.start()
             
@@ -116,45 +426,88 @@ class SpeechRecorder:
             
         except Exception as e:
             self.is_recording = False
+            if self.wav_file:
+                self.wav_file.close()
+                self.wav_file = None
             return {"error": f"Failed to start recording: {str(e)}"}, 500
     
-    def _write_audio_data(self):
-        """Write audio data from queue to file"""
+    def _write_audio_data(self, audio_queue, sound_file, stop):
+        """Write audio data from queue to file (and to `on_chunk` in chunks)
+
+        Runs until `stop` is set and the queue is drained, then closes
+        `sound_file` itself, so the file is never closed under a write.
+        """
+        on_chunk = self.on_chunk
+        output_path = self.output_path
+        chunker = AudioChunker() if on_chunk else None
+        vad = VoiceActivityDetector()
+        chunk_index = 0
         try:
-            while self.is_recording or not self.audio_queue.empty():
+            while not stop.is_set() or not audio_queue.empty():
                 try:
-                    data = self.audio_queue.get(timeout=0.1)
-                    if self.wav_file:
-                        self.wav_file.write(data)
+                    data = audio_queue.get(timeout=0.1)
+                    sound_file.write(data)
+                    mono = data[:, 0] if data.ndim > 1 else data
+                    vad.feed(mono)
+                    if chunker:
+                        chunk = chunker.feed(mono)
+                        if chunk:
+                            # A failing consumer must not stop the WAV file being written.
+                            try:
+                                on_chunk(chunk_index, chunk[0], chunk[1], False)
+                            except Exception as e:
+                                print(f"Error handing out audio chunk {chunk_index}: {e}", file=sys.stderr)
+                            chunk_index += 1
                 except queue.Empty:
-                    if not self.is_recording:
+                    if stop.is_set():
                         # If recording stopped and queue is empty, exit
                         break
                     continue
         except Exception as e:
             print(f"Error writing audio data: {e}", file=sys.stderr)
+        finally:
+            try:
+                sound_file.close()
+            except Exception as e:
+                print(f"Error closing audio file: {e}", file=sys.stderr)
+            # Saved before the final chunk, so whoever finishes the transcript finds it.
+            self.speech = vad.result()
+            _save_speech(output_path, self.speech)
+            if chunker:
+                chunk = chunker.flush() or (chunker.offset / SAMPLE_RATE, np.zeros(0, dtype=np.float32))
+                try:
+                    on_chunk(chunk_index, chunk[0], chunk[1], True)
+                except Exception as e:
+                    print(f"Error handing out final audio chunk: {e}", file=sys.stderr)
     
     def stop_recording(self):
         """Stop recording and close file/stream"""
         if not self.is_recording:
             return {"error": "No recording in progress"}, 400
         
-        self.is_recording = False
+        with self.lock:
+            self.is_recording = False
+        if self.writer_stop:
+            self.writer_stop.set()
         
         try:
-            if self.stream:
+            if self.stream and not self.is_monitoring:
                 self.stream.stop()
                 self.stream.close()
+                self.stream = None
             
-            if self.wav_file:
-                self.wav_file.close()
-            
+            # The writer drains queued blocks and closes the file itself
             if self.recording_thread:
                 self.recording_thread.join(timeout=2.0)
+                if self.recording_thread.is_alive():
+                    print(f"[Audio] Writer for {self.output_path} still draining; "
+                          f"it will close the file when done", file=sys.stderr)
+            self.wav_file = None
             
             return {
                 "message": "Recording stopped",
-                "output_path": self.output_path
+                "output_path": self.output_path,
+                "speech_seconds": self.speech["speech_seconds"] if self.speech else None,
             }, 200
             
         except Exception as e:
@@ -164,25 +517,126 @@ class SpeechRecorder:
         """Get current recording status"""
         return {
             "is_recording": self.is_recording,
-            "output_path": self.output_path if self.is_recording else None
+            "output_path": self.output_path if self.is_recording else None,
+            "is_monitoring": self.is_monitoring,
+            "pre_roll_seconds": round(self.pre_roll_samples / SAMPLE_RATE, 2),
+            "pre_roll_bytes": sum(block.nbytes for block in list(self.pre_roll)),
         }
 
 
 def get_api_key():
     """
-    Load API key from the .env file variable: GOOGLE_API_KEY
-    Matches original SpeechtoText.py behavior (exits on error for CLI)
+    Load the Gemini API key: GEMINI_API_KEY, else GOOGLE_API_KEY (from the
+    environment or .env), resolved in ai.gemini_client so uploads and
+    transcription always use the same key.
+    Raises RuntimeError if neither is set (the CLI reports it and exits)
     """
-    key = os.getenv("GOOGLE_API_KEY")
-    if not key:
-        print(
-            "ERROR: GOOGLE_API_KEY not found.\n"
-            "Make sure your .env file contains:\n\n"
-            "    GOOGLE_API_KEY=your_key_here\n\n",
-            file=sys.stderr
-        )
-        sys.exit(1)
-    return key
+    from ai.gemini_client import get_api_key as resolve_api_key
+    return resolve_api_key()
+
+
+class TranscriptionClient:
+    """Long-lived, thread-safe Gemini client for transcription requests
+    
+    Every transcription shares one genai.Client, and with it one pool of HTTP
+    connections; it is created on first use, so a missing API key is reported
+    to the caller as a RuntimeError. At most `concurrency` requests run at a
+    time. Audio up to `inline_max_bytes` is sent inline; larger files are
+    uploaded from disk instead of being read into memory.
+    """
+    
+    def __init__(self, concurrency: int = TRANSCRIPTION_CONCURRENCY,
+                 inline_max_bytes: int = TRANSCRIPTION_INLINE_MAX_BYTES):
+        self.concurrency = max(1, concurrency)
+        self.inline_max_bytes = inline_max_bytes
+        self._client = None
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.inline_requests = 0
+        self.upload_requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.wait_seconds = 0.0
+    
+    def client(self):
+        """The shared genai.Client"""
+        with self._lock:
+            if self._client is None:
+                self._client = genai.Client(api_key=get_api_key())
+            return self._client
+    
+    def transcribe_file(self, audio_path: str, model: str, mime_type: str = "audio/wav",
+                        prompt: str = TRANSCRIPTION_PROMPT):
+        """Transcribe an audio file, inline or uploaded depending on its size"""
+        if os.path.getsize(audio_path) <= self.inline_max_bytes:
+            with open(audio_path, "rb") as f:
+                return self.transcribe_bytes(f.read(), model, mime_type, prompt)
+        
+        try:
+            from ai.gemini_client import get_upload_manager
+        except ImportError as e:
+            raise RuntimeError(f"Cannot upload {audio_path} for transcription: {e}") from e
+        # Uploaded through the shared upload cache, so answering questions about
+        # this recording later reuses the same remote file.
+        with get_upload_manager().uploaded([audio_path]) as (audio_file,):
+            part = types.Part.from_uri(file_uri=audio_file.uri, mime_type=mime_type)
+            return self._generate(model, [prompt, part], upload=True)
+    
+    def transcribe_bytes(self, data: bytes, model: str, mime_type: str = "audio/wav",
+                         prompt: str = TRANSCRIPTION_PROMPT):
+        """Transcribe encoded audio held in memory (sent inline)"""
+        part = types.Part.from_bytes(data=data, mime_type=mime_type)
+        return self._generate(model, [prompt, part], upload=False)
+    
+    def _generate(self, model: str, contents, upload: bool):
+        client = self.client()
+        waiting = time.monotonic()
+        with self._slots:
+            with self._lock:
+                self.wait_seconds += time.monotonic() - waiting
+                self.in_flight += 1
+            try:
+                response = client.models.generate_content(model=model, contents=contents)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                raise
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.requests += 1
+                    if upload:
+                        self.upload_requests += 1
+                    else:
+                        self.inline_requests += 1
+        return (response.text or "").strip()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "inline_requests": self.inline_requests,
+                "upload_requests": self.upload_requests,
+                "failures": self.failures,
+                "in_flight": self.in_flight,
+                "avg_wait_seconds": round(self.wait_seconds / self.requests, 3) if self.requests else 0.0,
+                "concurrency": self.concurrency,
+                "inline_max_bytes": self.inline_max_bytes,
+            }
+
+
+_transcription_client = None
+_transcription_client_lock = threading.Lock()
+
+
+def get_transcription_client():
+    """Get or create the shared transcription client"""
+    global _transcription_client
+    with _transcription_client_lock:
+        if _transcription_client is None:
+            _transcription_client = TranscriptionClient()
+        return _transcription_client
 
 
 def transcribe_with_gemini(audio_path: str, model: str = "gemini-2.5-flash"):
@@ -192,34 +646,55 @@ def transcribe_with_gemini(audio_path: str, model: str = "gemini-2.5-flash"):
     """
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    return get_transcription_client().transcribe_file(audio_path, model, mime_type=audio_mime_type(audio_path))
 
-    api_key = get_api_key()
 
-    with open(audio_path, "rb") as f:
-        audio_bytes = f.read()
-
-    client = genai.Client(api_key=api_key)
-
-    response = client.models.generate_content(
-        model=model,
-        contents=[
-            "Transcribe the speech:",
-            types.Part.from_bytes(
-                data=audio_bytes,
-                mime_type="audio/wav",
-            ),
-        ],
-    )
-
-    return (response.text or "").strip()
-
-
-def transcribe_audio(audio_path: str, model: str = "gemini-2.5-flash"):
+def transcribe_samples(samples, model: str = "gemini-2.5-flash", prompt: str = CHUNK_TRANSCRIPTION_PROMPT):
+    """
+    Transcribe a chunk of recorded audio (float samples at SAMPLE_RATE) held in memory.
+    Chunks without speech return "" without a request; otherwise leading and
+    trailing silence is trimmed and the chunk is sent inline as FLAC with
+    `prompt` (the chunk prompt by default; whole recordings use TRANSCRIPTION_PROMPT).
+    Returns the transcript string.
+    """
+    if len(samples) == 0:
+        return ""
+    speech = detect_speech(samples)
+    if not has_speech(speech):
+        return ""
+    start, end = speech_range(speech)
+    samples = samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, SAMPLE_RATE, subtype="PCM_16", format="FLAC")
+    return get_transcription_client().transcribe_bytes(buffer.getvalue(), model, mime_type="audio/flac",
+                                                       prompt=prompt)
+
+
+def transcribe_audio(audio_path: str, model: str = "gemini-2.5-flash", speech=None):
     """
     Transcribe audio file using Gemini API
     Returns tuple of (transcript_text, timestamp) for Flask usage
+    
+    Files without speech (see analyze_speech; `speech` is the VAD result if the
+    caller already has it) return an empty transcript without a request. When
+    the speech left after trimming leading/trailing silence fits in
+    TRANSCRIPTION_INLINE_MAX_BYTES, only the speech is sent, inline; otherwise
+    the whole file is transcribed (see TranscriptionClient.transcribe_file).
     """
-    transcript = transcribe_with_gemini(audio_path, model)
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    if speech is None:
+        speech = analyze_speech(audio_path)
+    
+    start, end = speech_range(speech)
+    if not has_speech(speech):
+        transcript = ""
+    elif (start > 0 or end < speech["duration"]) and (end - start) * SAMPLE_RATE * 2 <= TRANSCRIPTION_INLINE_MAX_BYTES:
+        samples, _ = sf.read(audio_path, start=int(start * SAMPLE_RATE), stop=int(end * SAMPLE_RATE),
+                             dtype="float32", always_2d=True)
+        transcript = transcribe_samples(samples[:, 0], model, prompt=TRANSCRIPTION_PROMPT)
+    else:
+        transcript = transcribe_with_gemini(audio_path, model)
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return transcript, timestamp
 
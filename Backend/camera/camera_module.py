@@ -7,6 +7,7 @@ especially for macOS and Continuity Camera devices that may be unreliable.
 
 from __future__ import annotations
 
+import json
 import logging
 import os
 import sys
@@ -16,18 +17,37 @@ from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Deque, Dict, List, Optional, Tuple
-import json
 
 import cv2
+import numpy as np
 
+from camera.capture import FrameGrabber, FrameRingBuffer, RecordingWriter
+from camera.detection import DetectionService, aggregate_detections, get_detection_service, sample_frames
+from camera.encoders import CODECS, ENCODER_BACKENDS, HWACCELS, parse_encoder_settings
+from camera.keyframes import (
+    KEYFRAME_TRANSCRIPT_WAIT,
+    SUMMARY_MODE,
+    SUMMARY_MODES,
+    choose_summary_mode,
+    load_keyframes,
+    record_summary_latency,
+)
+from camera.motion import MOTION_ENGINES, MotionDetector
+from camera.recording import get_recording, placeholder_metadata
+from camera.transcription import TRANSCRIPTION_MODE, TRANSCRIPTION_MODES, StreamingTranscription
+from jobs.queue import JobQueue, get_job_queue
 
 try:
-    from db.database import add_event, create_memory_node
+    from db.database import add_event, create_memory_node, set_pipeline_stages
 except (ImportError, ModuleNotFoundError):
     add_event = None
     create_memory_node = None
+    set_pipeline_stages = None
     logging.warning("Database module not found. Events will be logged to console only.")
 
+DEFAULT_CAMERA_ID = "default"
+DEFAULT_IMAGE_DIR = Path(__file__).resolve().parents[1] / "data" / "images"
+
 
 def _import_gemini_helpers() -> (Callable[[str], str], Callable[[str], str], Callable[[str], str]):
     """Return `describe_image` and `summarize_video` callables if available, else safe fallbacks."""
@@ -82,11 +102,18 @@ def _generate_title_from_transcript(transcript: str, generate_title_fn: Callable
         return text
 
 
-def _import_audio_helpers():
-    """Return audio recorder and transcription functions if available, else None."""
+def _import_audio_helpers(dedicated: bool = False):
+    """Return audio recorder and transcription functions if available, else None.
+    
+    With `dedicated`, a new SpeechRecorder is created instead of the shared
+    global recorder, so several cameras can record audio at the same time.
+    """
     try:
         from audio import recorder, transcribe_audio, save_transcript
         
+        if dedicated and recorder is not None:
+            recorder = type(recorder)()
+        
         if recorder is None:
             logging.error("✗ Audio recorder is None - audio recording will be disabled")
             return None, None, None
@@ -105,20 +132,197 @@ def _import_audio_helpers():
         return None, None, None
 
 
-def _load_yolo_model():
-    """Load YOLOv8 model if available, otherwise return None."""
+def _refresh_semantic_index():
+    """Embed newly written MemoryNode text into the local semantic index (best effort)."""
+    try:
+        from ai.embeddings import sync_index
+        from db.database import get_memory_node_revision, mark_pipeline_indexed
+        revision = get_memory_node_revision()
+        sync_index()
+        mark_pipeline_indexed(revision)
+    except Exception as exc:
+        logging.warning("Semantic index update failed: %s", exc)
+
+
+def _mark_pipeline(video_path: str, error: Optional[str] = None, **stages):
+    """Set pipeline stages on the recording's MemoryNode (best effort).
+    
+    Finishing the transcribed stage releases a keyframe summary waiting for it.
+    """
+    if not set_pipeline_stages:
+        return
+    try:
+        from db.database import get_memory_node_by_file_path
+        node = get_memory_node_by_file_path(video_path)
+        if node:
+            set_pipeline_stages(node["id"], error=error, **stages)
+    except Exception as exc:
+        logging.warning("Failed to update pipeline state for %s: %s", video_path, exc)
+    if stages.get("transcribed") in ("done", "skipped", "failed"):
+        _transcription_finished(video_path)
+
+
+def _final_transcript(video_path: str) -> Optional[str]:
+    """Return the recording's final transcript, or None if transcription has not finished with one.
+    
+    A partial (streaming) transcript is never returned.
+    """
+    try:
+        from db.database import get_memory_node_by_file_path, get_pipeline_state
+        node = get_memory_node_by_file_path(video_path)
+        state = get_pipeline_state(node["id"]) if node else None
+        if not state or state["transcribed"] != "done":
+            return None
+        metadata = json.loads(node["metadata"] or "{}")
+        if metadata.get("transcript_partial"):
+            return None
+        return metadata.get("transcript") or None
+    except Exception as exc:
+        logging.warning("Could not read transcript for %s: %s", video_path, exc)
+    return None
+
+
+def _transcription_pending(video_path: str) -> bool:
+    """Whether the recording's transcription stage has yet to finish (False if unknown)."""
+    try:
+        from db.database import get_memory_node_by_file_path, get_pipeline_state
+        node = get_memory_node_by_file_path(video_path)
+        state = get_pipeline_state(node["id"]) if node else None
+        return bool(state) and state["transcribed"] == "pending"
+    except Exception as exc:
+        logging.warning("Could not read pipeline state for %s: %s", video_path, exc)
+    return False
+
+
+def _queue_keyframe_summary(video_path: str, summary_mode: Optional[str] = None, delay: float = 0.0):
+    """Queue the keyframe summary of a recording that is waiting for its transcript.
+    
+    Queued with delay=KEYFRAME_TRANSCRIPT_WAIT as a deadline when analysis
+    defers the summary, and again without delay when transcription finishes;
+    the job queue deduplicates by video path and brings the pending job forward.
+    """
+    try:
+        register_recording_jobs().enqueue(
+            KEYFRAME_SUMMARY_JOB,
+            {"video_path": video_path, "summary_mode": summary_mode},
+            dedup_key=video_path,
+            delay=delay,
+        )
+    except Exception as e:
+        logging.error(f"✗ Failed to queue keyframe summary for {video_path}: {e}", exc_info=True)
+
+
+def _transcription_finished(video_path: str):
+    """Run a keyframe summary that is waiting for this recording's transcription (done, skipped or failed)."""
+    try:
+        from db.database import get_memory_node_by_file_path, get_pipeline_state
+        node = get_memory_node_by_file_path(video_path)
+        if not node:
+            return
+        waiting = json.loads(node["metadata"] or "{}").get("summary_waiting")
+        state = get_pipeline_state(node["id"])
+    except Exception as exc:
+        logging.warning("Could not check summary state of %s: %s", video_path, exc)
+        return
+    if not waiting or not state or state["summarized"] != "pending" or state["transcribed"] == "pending":
+        return
+    logging.info(f"Transcription of {video_path} finished; running its keyframe summary")
+    _queue_keyframe_summary(video_path, waiting.get("mode"))
+
+
+def _summarize_recording(
+    video_path: str,
+    summarize_video: Callable,
+    summary_mode: Optional[str] = None,
+    transcript: Optional[str] = None,
+    waited: float = 0.0,
+) -> Tuple[str, Dict[str, object]]:
+    """
+    Summarize a recording from its keyframes or from the full video (see camera.keyframes).
+    
+    Keyframe summaries include the recording's final transcript: `transcript`
+    if given, otherwise whatever final transcript is stored already.
+    A failed or empty keyframe summary falls back to uploading the video;
+    errors of the video summary propagate. Every attempt is timed per mode,
+    including the `waited` seconds the summary was held back for the
+    transcript, so the latency is the real time to a summary.
+    
+    Returns:
+        The summary and the metadata describing how it was made
+        (summary_mode, summary_mode_reason, summary_seconds, and
+        summary_wait_seconds if the summary waited)
+    """
+    manifest = load_keyframes(video_path)
+    mode, reason = choose_summary_mode(summary_mode or SUMMARY_MODE, manifest)
+    started = time.monotonic() - waited
+    wait_info = {"summary_wait_seconds": round(waited, 2)} if waited else {}
+    if mode == "keyframes":
+        transcript = transcript or _final_transcript(video_path)
+        try:
+            from ai.gemini_client import summarize_keyframes
+            summary = summarize_keyframes(
+                [keyframe["path"] for keyframe in manifest["keyframes"]],
+                transcript=transcript,
+                timestamps=[keyframe["time"] for keyframe in manifest["keyframes"]],
+            )
+            if summary == "No summary returned":
+                raise RuntimeError(summary)
+        except Exception as e:
+            record_summary_latency("keyframes", time.monotonic() - started, ok=False)
+            logging.warning(f"Keyframe summary failed for {video_path} ({e}); uploading the video instead")
+            mode, reason = "video", "keyframe summary failed"
+        else:
+            elapsed = time.monotonic() - started
+            record_summary_latency("keyframes", elapsed, ok=True)
+            logging.info(f"Summarized {video_path} from {len(manifest['keyframes'])} keyframes in {elapsed:.1f}s"
+                         + (f" ({waited:.1f}s waiting for the transcript)" if waited else ""))
+            return summary, {"summary_mode": "keyframes", "summary_mode_reason": reason,
+                             "summary_seconds": round(elapsed, 2), **wait_info}
+    
+    started = time.monotonic() - waited
     try:
-        from ultralytics import YOLO
-        model = YOLO("yolov8n.pt")
-        logging.info("YOLOv8 model loaded successfully.")
-        return model
-    except (ImportError, ModuleNotFoundError, Exception) as exc:
-        logging.warning("YOLO model unavailable: %s", exc)
+        summary = summarize_video(video_path)
+    except Exception:
+        record_summary_latency("video", time.monotonic() - started, ok=False)
+        raise
+    elapsed = time.monotonic() - started
+    record_summary_latency("video", elapsed, ok=True)
+    logging.info(f"Summarized {video_path} from the full video in {elapsed:.1f}s ({reason})")
+    return summary, {"summary_mode": "video", "summary_mode_reason": reason, "summary_seconds": round(elapsed, 2),
+                     **wait_info}
+
+
+def _summary_needs_transcript(video_path: str, summary_mode: Optional[str] = None) -> bool:
+    """Whether the recording would be summarized from keyframes while its transcription is still pending."""
+    mode, _ = choose_summary_mode(summary_mode or SUMMARY_MODE, load_keyframes(video_path))
+    return mode == "keyframes" and _transcription_pending(video_path)
+
+
+def _describe_recording(objects: List[str], summary: str) -> str:
+    desc_parts = []
+    if objects:
+        desc_parts.append(f"Objects detected: {', '.join(objects)}")
+    if summary:
+        desc_parts.append(f"AI Summary: {summary}")
+    return " | ".join(desc_parts) or "Video recorded"
+
+
+def _summary_title(recording, summary: str, generate_title: Optional[Callable[[str], str]]) -> Optional[str]:
+    """Generate a title from `summary` if the recording would keep it."""
+    if not (summary and generate_title and recording.wants_title("summary")):
         return None
+    try:
+        title = _generate_title_from_transcript(summary, generate_title)
+        logging.info(f"Generated title from summary: {title}")
+        return title
+    except Exception as e:
+        logging.warning(f"Failed to generate title from summary: {e}")
+    return None
+
 
 def analyze_and_log_video(
     video_path: str,
-    yolo_model,
+    detector: Optional[DetectionService],
     describe_image: Callable,
     summarize_video: Callable,
     image_dir: Path,
@@ -126,54 +330,78 @@ def analyze_and_log_video(
     transcript_path: Optional[str] = None,
     transcript: Optional[str] = None,
     generate_title: Optional[Callable[[str], str]] = None,
+    strict: bool = False,
+    summary_mode: Optional[str] = None,
 ):
     """
-    Analyzes a video in a separate thread, generates a summary, and logs the event.
-    Creates a unified MemoryNode with video path, audio path, summary, and transcript.
+    Analyzes a video (on a job queue worker), generates a summary, and logs the event.
+    Objects are detected on frames sampled across the whole clip (see
+    camera.detection); `detector` is None when no model is available.
+    The results are merged into the recording's MemoryNode through its
+    RecordingAggregate (camera.recording), which creates the node if needed.
+    
+    With `strict`, failures to read the video or to summarize it raise instead
+    of being logged, so the job is retried; the final attempt runs non-strict
+    and stores whatever analysis succeeded.
+    
+    `summary_mode` ("auto", "keyframes" or "video", default SUMMARY_MODE)
+    selects between summarizing the recording's keyframes with its transcript
+    and uploading the whole video (see _summarize_recording). A keyframe
+    summary whose transcript is still being made is deferred: the node is
+    marked `summary_waiting` and a keyframe summary job runs once
+    transcription finishes, or after KEYFRAME_TRANSCRIPT_WAIT without it.
     """
     try:
         logging.info(f"Starting analysis for {video_path}...")
         
-        cap = cv2.VideoCapture(video_path)
-        ret, frame = cap.read()
-        cap.release()
+        samples = sample_frames(video_path)
 
-        if not ret:
+        if not samples:
+            if strict:
+                raise RuntimeError(f"Failed to read first frame from {video_path}")
             logging.error(f"Failed to read first frame from {video_path} for analysis.")
+            _mark_pipeline(video_path, summarized="failed", error="Failed to read video")
             return
 
         ts_utc = datetime.utcnow()
         first_frame_filename = f"thumbnail_{ts_utc.strftime('%Y%m%d_%H%M%S_%f')}.jpg"
         first_frame_path = image_dir / first_frame_filename
-        cv2.imwrite(str(first_frame_path), frame)
+        cv2.imwrite(str(first_frame_path), samples[0][1])
 
         objects = []
-        if yolo_model:
+        detection_fields: Dict[str, object] = {}
+        if detector:
             try:
-                results = yolo_model(first_frame_path, verbose=False)
-                if results and hasattr(results[0], "names"):
-                    box_classes = results[0].boxes.cls.cpu().numpy()
-                    objects = sorted(list(set(results[0].names[int(c)] for c in box_classes)))
+                detections = detector.detect([frame for _, frame in samples])
+                if detections is not None:
+                    detection_fields = aggregate_detections([seconds for seconds, _ in samples], detections)
+                    objects = detection_fields.pop("objects_detected")
+                    logging.info(f"Detected {objects or 'no objects'} in {len(samples)} sampled frames of {video_path}")
             except Exception as e:
                 logging.error(f"YOLO prediction failed: {e}")
+        # The decoded frames are not needed during the (slow) summary call.
+        del samples
 
         summary = ""
-        try:
-            summary = summarize_video(video_path)
-        except Exception as e:
-            logging.error(f"Gemini video summary failed: {e}")
+        summary_info: Dict[str, object] = {}
+        waiting = None
+        if not transcript and _summary_needs_transcript(video_path, summary_mode):
+            waiting = {"since": time.time(), "mode": summary_mode, "event_time": ts_utc.isoformat()}
+            logging.info(f"Deferring the keyframe summary of {video_path} until its transcription finishes")
+        else:
+            try:
+                summary, summary_info = _summarize_recording(video_path, summarize_video, summary_mode, transcript)
+            except Exception as e:
+                if strict:
+                    raise
+                logging.error(f"Gemini video summary failed: {e}")
 
-        desc_parts = []
-        if objects:
-            desc_parts.append(f"Objects detected: {', '.join(objects)}")
-        if summary:
-            desc_parts.append(f"AI Summary: {summary}")
-        
-        description = " | ".join(desc_parts) or "Video recorded"
+        description = _describe_recording(objects, summary)
         
         logging.info(f"Analysis complete for {video_path}: {description}")
 
-        if add_event:
+        # A deferred summary logs the event once it has the summary.
+        if add_event and not waiting:
             try:
                 add_event(
                     event_type="video_recording",
@@ -186,64 +414,368 @@ def analyze_and_log_video(
         
         if create_memory_node:
             try:
-                from db.database import get_memory_node_by_file_path, update_memory_node_metadata
+                recording = get_recording(video_path)
+                fields = {
+                    "video_path": video_path,
+                    "summary": summary,
+                    "objects_detected": objects,
+                    "description": description,
+                    "thumbnail_path": str(first_frame_path),
+                    **detection_fields,
+                    **summary_info,
+                }
+                if audio_path:
+                    fields['audio_path'] = audio_path
+                if transcript_path:
+                    fields['transcript_path'] = transcript_path
+                if transcript:
+                    fields['transcript'] = transcript
+                if waiting:
+                    del fields["summary"]
+                    fields["summary_waiting"] = waiting
                 
-                existing_node = get_memory_node_by_file_path(video_path)
-                
-                if existing_node:
-                    try:
-                        existing_metadata = json.loads(existing_node.get('metadata', '{}') or '{}')
-                    except:
-                        existing_metadata = {}
-                    
-                    existing_metadata['video_path'] = video_path
-                    existing_metadata['summary'] = summary
-                    if summary and generate_title and not existing_metadata.get('title'):
-                        try:
-                            title = _generate_title_from_transcript(summary, generate_title)
-                            existing_metadata['title'] = title
-                            logging.info(f"Generated title from summary: {title}")
-                        except Exception as e:
-                            logging.warning(f"Failed to generate title from summary: {e}")
-                    existing_metadata['objects_detected'] = objects
-                    existing_metadata['description'] = description
-                    existing_metadata['thumbnail_path'] = str(first_frame_path)
-                    if audio_path:
-                        existing_metadata['audio_path'] = audio_path
-                    if transcript_path:
-                        existing_metadata['transcript_path'] = transcript_path
-                    if transcript:
-                        existing_metadata['transcript'] = transcript
-                    
-                    if update_memory_node_metadata(existing_node['id'], existing_metadata):
-                        logging.info(f"✓ Updated existing MemoryNode {existing_node['id']} with video analysis data")
-                    else:
-                        logging.error(f"✗ Failed to update existing MemoryNode {existing_node['id']}")
-                else:
-                    metadata = {
-                        "video_path": video_path,
-                        "audio_path": audio_path,
-                        "transcript_path": transcript_path,
-                        "summary": summary,
-                        "transcript": transcript,
-                        "objects_detected": objects,
-                        "description": description,
-                        "thumbnail_path": str(first_frame_path)
-                    }
-                    create_memory_node(
-                        file_path=video_path,
-                        file_type="recording",
-                        timestamp=ts_utc.isoformat(),
-                        metadata=json.dumps(metadata)
-                    )
-                    logging.info(f"✓ Created new MemoryNode for recording: {video_path}")
+                title = _summary_title(recording, summary, generate_title)
+                node_id = recording.merge("analysis", fields, title=title, title_source="summary", audio_path=audio_path)
+                if node_id and not summary and not waiting and set_pipeline_stages:
+                    set_pipeline_stages(node_id, summarized="failed", error="No video summary generated")
             except Exception as e:
                 logging.error(f"Failed to create/update MemoryNode: {e}", exc_info=True)
+            
+            if waiting:
+                # The deadline; finishing transcription brings it forward. Checked
+                # again here in case transcription finished before the node was marked.
+                _queue_keyframe_summary(video_path, summary_mode, delay=KEYFRAME_TRANSCRIPT_WAIT)
+                _transcription_finished(video_path)
+            _refresh_semantic_index()
 
     except Exception as e:
+        if strict:
+            raise
         logging.critical(f"An error occurred during video analysis for {video_path}: {e}", exc_info=True)
 
 
+VIDEO_ANALYSIS_JOB = "video_analysis"
+TRANSCRIPTION_JOB = "transcription"
+TITLE_JOB = "title"
+KEYFRAME_SUMMARY_JOB = "keyframe_summary"
+VIDEO_ANALYSIS_WORKERS = int(os.getenv("VIDEO_ANALYSIS_WORKERS", "2"))
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "2"))
+
+
+def _import_transcription_helpers():
+    """Return `transcribe_audio` and `save_transcript`; raises if the audio module is unavailable."""
+    from audio import transcribe_audio, save_transcript
+    return transcribe_audio, save_transcript
+
+
+def _analyze_speech(audio_path: str) -> Tuple[Optional[dict], bool]:
+    """Return a recording's voice activity (see audio.analyze_speech) and whether it has speech.
+    
+    If voice activity detection is unavailable the audio is assumed to contain speech.
+    """
+    try:
+        from audio import analyze_speech, has_speech
+        speech = analyze_speech(audio_path)
+        return speech, has_speech(speech)
+    except Exception as exc:
+        logging.warning(f"Voice activity detection failed for {audio_path}: {exc}")
+        return None, True
+
+
+def _speech_fields(speech: Optional[dict]) -> Dict[str, object]:
+    if not speech:
+        return {}
+    return {"speech_seconds": speech["speech_seconds"], "speech_segments": speech["segments"]}
+
+
+def _skip_silent_recording(video_path: str, audio_path: str, speech: dict):
+    """Record that a recording's audio has no speech; it is not transcribed."""
+    logging.info(f"No speech detected in {audio_path} ({speech['duration']:.1f}s of audio); skipping transcription")
+    if create_memory_node:
+        try:
+            get_recording(video_path).merge("transcription", _speech_fields(speech), audio_path=audio_path)
+        except Exception as e:
+            logging.error(f"✗ Error storing speech activity in MemoryNode: {e}", exc_info=True)
+    _mark_pipeline(video_path, transcribed="skipped")
+
+
+def _video_analysis_job(payload: dict, job: dict):
+    """Job handler: analyze a finished recording (see analyze_and_log_video)."""
+    video_path = payload["video_path"]
+    if not os.path.exists(video_path):
+        logging.error(f"Recording no longer exists, skipping analysis: {video_path}")
+        _mark_pipeline(video_path, summarized="failed", error="Video file missing")
+        return
+    describe_image, summarize_video, generate_title_fn = _import_gemini_helpers()
+    analyze_and_log_video(
+        video_path,
+        get_detection_service(),
+        describe_image,
+        summarize_video,
+        Path(payload["image_dir"]),
+        audio_path=payload.get("audio_path"),
+        generate_title=generate_title_fn,
+        strict=job["attempts"] < job["max_attempts"],
+        summary_mode=payload.get("summary_mode"),
+    )
+
+
+def _keyframe_summary_job(payload: dict, job: dict):
+    """Job handler: make the keyframe summary that analysis deferred for the transcript.
+    
+    Runs when transcription finishes (see _transcription_finished), or at the
+    KEYFRAME_TRANSCRIPT_WAIT deadline without the transcript. The time spent
+    waiting counts towards the summary latency.
+    """
+    from db.database import get_memory_node_by_file_path
+    video_path = payload["video_path"]
+    node = get_memory_node_by_file_path(video_path)
+    metadata = json.loads(node["metadata"] or "{}") if node else {}
+    waiting = metadata.get("summary_waiting")
+    if not waiting:
+        return
+    _, summarize_video, generate_title_fn = _import_gemini_helpers()
+    
+    summary = ""
+    summary_info: Dict[str, object] = {}
+    try:
+        summary, summary_info = _summarize_recording(
+            video_path, summarize_video, waiting.get("mode"), waited=max(0.0, time.time() - waiting["since"])
+        )
+    except Exception as e:
+        if job["attempts"] < job["max_attempts"]:
+            raise
+        logging.error(f"Gemini video summary failed: {e}")
+    description = _describe_recording(metadata.get("objects_detected") or [], summary)
+    logging.info(f"Summary complete for {video_path}: {description}")
+    
+    if add_event:
+        try:
+            add_event(
+                event_type="video_recording",
+                timestamp=waiting.get("event_time") or datetime.utcnow().isoformat(),
+                description=description,
+                image_path=video_path,
+            )
+        except Exception as e:
+            logging.error(f"Failed to save video event to database: {e}")
+    
+    recording = get_recording(video_path)
+    fields = {"summary": summary, "description": description, "summary_waiting": None, **summary_info}
+    title = _summary_title(recording, summary, generate_title_fn)
+    node_id = recording.merge("summary", fields, title=title, title_source="summary")
+    if node_id and not summary and set_pipeline_stages:
+        set_pipeline_stages(node_id, summarized="failed", error="No video summary generated")
+    _refresh_semantic_index()
+
+
+def _transcription_job(payload: dict, job: dict):
+    """Job handler: transcribe a recording's audio and store the transcript on its MemoryNode.
+    
+    Transcription errors propagate so the job queue retries them.
+    """
+    video_path = payload["video_path"]
+    audio_path = payload["audio_path"]
+    transcript_path = payload["transcript_path"]
+    if not os.path.exists(audio_path):
+        logging.warning(f"⚠ Audio file does not exist, skipping transcription: {audio_path}")
+        _mark_pipeline(video_path, transcribed="skipped", error="Audio file missing")
+        return
+    speech, speaking = _analyze_speech(audio_path)
+    if not speaking:
+        _skip_silent_recording(video_path, audio_path, speech)
+        return
+    
+    try:
+        transcribe_audio, save_transcript = _import_transcription_helpers()
+        _, _, generate_title_fn = _import_gemini_helpers()
+        
+        logging.info(f"Starting transcription for: {audio_path}")
+        transcript, timestamp = transcribe_audio(audio_path, speech=speech)
+    except Exception as e:
+        if job["attempts"] >= job["max_attempts"]:
+            _mark_pipeline(video_path, transcribed="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    
+    _store_transcript(video_path, audio_path, transcript_path, transcript, timestamp,
+                      save_transcript, generate_title_fn, speech)
+
+
+def _store_transcript(video_path: str, audio_path: str, transcript_path: str, transcript: str, timestamp: str,
+                      save_transcript: Callable, generate_title_fn: Optional[Callable[[str], str]],
+                      speech: Optional[dict] = None):
+    """Save a finished transcript to its file and merge it (with a title) into the recording's MemoryNode.
+    
+    `speech` is the voice activity of the audio; its speech duration and segments are stored too.
+    """
+    logging.info("=" * 80)
+    logging.info(f"TRANSCRIPT FOR VIDEO: {video_path}")
+    logging.info("=" * 80)
+    logging.info(transcript if transcript else "[No transcript generated]")
+    logging.info("=" * 80)
+    
+    if save_transcript(transcript, timestamp, transcript_path):
+        logging.info(f"Transcript saved: {transcript_path}")
+    else:
+        logging.error(f"Failed to save transcript: {transcript_path}")
+    
+    if not transcript:
+        logging.warning(f"⚠ No transcript to store for {video_path}")
+        _mark_pipeline(video_path, transcribed="done")
+        return
+    if not create_memory_node:
+        return
+    
+    try:
+        recording = get_recording(video_path)
+        title = None
+        if generate_title_fn and recording.wants_title("transcript"):
+            try:
+                title = _generate_title_from_transcript(transcript, generate_title_fn)
+                logging.info(f"Generated title from transcript: {title}")
+            except Exception as e:
+                logging.warning(f"Failed to generate title from transcript: {e}")
+        
+        fields = {
+            "transcript": transcript,
+            "transcript_partial": False,
+            "transcript_path": transcript_path,
+            "audio_path": audio_path,
+            **_speech_fields(speech),
+        }
+        if recording.merge("transcription", fields, title=title, title_source="transcript", audio_path=audio_path):
+            logging.info(f"   Transcript ({len(transcript)} characters): {transcript[:50]}...")
+    except Exception as e:
+        logging.error(f"✗ Error handling transcript in MemoryNode: {e}", exc_info=True)
+    
+    _transcription_finished(video_path)
+    _refresh_semantic_index()
+
+
+def _title_job(payload: dict, job: dict):
+    """Job handler: title a recording whose transcript/summary finished without one."""
+    from db.database import get_memory_node_fields, update_memory_node_fields
+    node_id = payload["node_id"]
+    fields = get_memory_node_fields(node_id, "title", "summary", "transcript")
+    if fields is None or fields["title"]:
+        return
+    summary = fields["summary"] if fields["summary"] != "Loading Summary..." else None
+    source = fields["transcript"] or summary
+    if not source:
+        set_pipeline_stages(node_id, titled="skipped")
+        return
+    _, _, generate_title_fn = _import_gemini_helpers()
+    title = _generate_title_from_transcript(source, generate_title_fn)
+    if update_memory_node_fields(node_id, title=title):
+        logging.info(f"Generated title for MemoryNode {node_id}: {title}")
+        _refresh_semantic_index()
+
+
+def register_recording_jobs(job_queue: Optional[JobQueue] = None) -> JobQueue:
+    """Register the recording analysis, keyframe summary, transcription and title job types (idempotent)."""
+    job_queue = job_queue or get_job_queue()
+    job_queue.register(VIDEO_ANALYSIS_JOB, _video_analysis_job, workers=VIDEO_ANALYSIS_WORKERS,
+                       max_attempts=3, retry_delay=10.0)
+    job_queue.register(KEYFRAME_SUMMARY_JOB, _keyframe_summary_job, workers=VIDEO_ANALYSIS_WORKERS,
+                       max_attempts=3, retry_delay=10.0)
+    job_queue.register(TRANSCRIPTION_JOB, _transcription_job, workers=TRANSCRIPTION_WORKERS,
+                       max_attempts=3, retry_delay=10.0)
+    job_queue.register(TITLE_JOB, _title_job, workers=1, max_attempts=3, retry_delay=10.0)
+    return job_queue
+
+
+def recover_recording_pipeline(job_queue: Optional[JobQueue] = None, retry_failed: bool = False,
+                               image_dir: Path = DEFAULT_IMAGE_DIR) -> Dict[str, int]:
+    """
+    Re-queue the unfinished stages of every recording (see db pipeline_state).
+    
+    Run at startup so recordings interrupted by a crash or deploy are finished
+    instead of keeping their "Loading Summary..." placeholder. Jobs are
+    deduplicated by video path, so stages whose jobs are still queued are not
+    queued twice. Stages marked failed are only retried with `retry_failed`.
+    
+    Returns:
+        Jobs queued (or found already pending) per type, stages marked
+        skipped/failed, and recordings awaiting indexing
+    """
+    from db.database import get_incomplete_pipeline_nodes
+    job_queue = register_recording_jobs(job_queue)
+    retry_states = ("pending", "failed") if retry_failed else ("pending",)
+    counts = {VIDEO_ANALYSIS_JOB: 0, KEYFRAME_SUMMARY_JOB: 0, TRANSCRIPTION_JOB: 0, TITLE_JOB: 0,
+              "skipped": 0, "failed": 0, "index": 0}
+    
+    for node in get_incomplete_pipeline_nodes(include_failed=retry_failed):
+        node_id = node["node_id"]
+        # Transcript-only nodes (from the /transcribe endpoints) have no video;
+        # jobs find a node by its file_path.
+        video_path = node["video_path"]
+        recording_path = video_path or node["file_path"]
+        audio_path = node["audio_path"]
+        summary_waiting = json.loads(node["summary_waiting"]) if node["summary_waiting"] else None
+        transcribing = node["transcribed"] in retry_states and bool(audio_path) and os.path.exists(audio_path)
+        waiting = False
+        
+        if node["summarized"] in retry_states and summary_waiting and video_path and os.path.exists(video_path):
+            # Analysis is done; only its deferred keyframe summary is outstanding.
+            delay = 0.0
+            if transcribing:
+                delay = max(0.0, summary_waiting["since"] + KEYFRAME_TRANSCRIPT_WAIT - time.time())
+            job_queue.enqueue(
+                KEYFRAME_SUMMARY_JOB,
+                {"video_path": video_path, "summary_mode": summary_waiting.get("mode")},
+                dedup_key=video_path,
+                delay=delay,
+            )
+            counts[KEYFRAME_SUMMARY_JOB] += 1
+            waiting = True
+        elif node["summarized"] in retry_states:
+            if video_path and os.path.exists(video_path):
+                job_queue.enqueue(
+                    VIDEO_ANALYSIS_JOB,
+                    {"video_path": video_path, "audio_path": audio_path, "image_dir": str(image_dir)},
+                    dedup_key=video_path,
+                )
+                counts[VIDEO_ANALYSIS_JOB] += 1
+                waiting = True
+            elif not video_path:
+                set_pipeline_stages(node_id, summarized="skipped")
+                counts["skipped"] += 1
+            else:
+                set_pipeline_stages(node_id, summarized="failed", error="Video file missing")
+                counts["failed"] += 1
+        
+        if node["transcribed"] in retry_states:
+            if transcribing:
+                transcript_path = node["transcript_path"] or str(
+                    image_dir.parent / "transcripts" / f"{Path(audio_path).stem}.txt"
+                )
+                job_queue.enqueue(
+                    TRANSCRIPTION_JOB,
+                    {"video_path": recording_path, "audio_path": audio_path, "transcript_path": transcript_path},
+                    dedup_key=recording_path,
+                )
+                counts[TRANSCRIPTION_JOB] += 1
+                waiting = True
+            else:
+                set_pipeline_stages(node_id, transcribed="skipped", error="Audio file missing")
+                counts["skipped"] += 1
+        
+        # Analysis and transcription title the node themselves.
+        if node["titled"] == "pending" and not waiting:
+            job_queue.enqueue(TITLE_JOB, {"node_id": node_id}, dedup_key=str(node_id))
+            counts[TITLE_JOB] += 1
+        
+        if node["indexed"] == "pending":
+            counts["index"] += 1
+    
+    if counts["index"]:
+        _refresh_semantic_index()
+    job_types = (VIDEO_ANALYSIS_JOB, KEYFRAME_SUMMARY_JOB, TRANSCRIPTION_JOB, TITLE_JOB)
+    queued = sum(counts[job_type] for job_type in job_types)
+    if queued or counts["skipped"] or counts["failed"]:
+        logging.info(f"Pipeline recovery: {counts}")
+    return counts
+
 
 def run_camera_loop(
     camera_index: int,
@@ -256,20 +788,62 @@ def run_camera_loop(
     capture_fps: Optional[float] = None,
     max_frame_failures: int = 10,
     warmup_period: float = 2.0,
-    inactivity_timeout: float = 1.0,
+    post_roll: float = 1.0,
     delta_thresh: int = 50,
-    status_callback: Optional[Callable[[bool, bool, float], None]] = None,
+    status_callback: Optional[Callable[[bool, bool, float, Dict[str, object]], None]] = None,
+    frame_buffer_size: int = 32,
+    pre_roll: float = 3.0,
+    pre_roll_max_bytes: int = 64 * 1024 * 1024,
+    motion_engine: str = "frame_diff",
+    analysis_width: int = 640,
+    analysis_height: int = 480,
+    zones: Optional[List[Dict]] = None,
+    camera_id: str = DEFAULT_CAMERA_ID,
+    record_audio: bool = True,
+    encoder: Optional[Dict] = None,
+    summary_mode: Optional[str] = None,
+    transcription_mode: Optional[str] = None,
 ):
     """
     Main webcam loop for motion detection and event creation.
     
+    Capture, motion analysis and video writing run on separate threads around a
+    shared frame ring buffer (see camera.capture), so recordings contain every
+    captured frame even when analysis runs at a lower `processing_fps`.
+    
     Args:
-        status_callback: Optional callback(motion_detected: bool, is_recording: bool, motion_level: float)
-                         to update status during the loop
+        status_callback: Optional callback(motion_detected: bool, is_recording: bool, motion_level: float,
+                         frame_stats: dict) to update status during the loop
+        post_roll: Seconds to keep recording after motion was last detected
+        frame_buffer_size: Number of full-resolution frames held between the grabber and the writer
+        pre_roll: Seconds of video (JPEG-encoded) and audio kept in memory and prepended to
+                  each recording, so it includes the moments before motion crossed the threshold
+        pre_roll_max_bytes: Memory cap for the encoded video pre-roll
+        motion_engine: Motion detection engine (see camera.motion.MOTION_ENGINES)
+        analysis_width, analysis_height: Resolution frames are downsized to for motion analysis
+        zones: Optional ROI/exclusion polygons (see camera.motion.parse_zones). With include
+               zones, recording triggers when any zone's averaged level exceeds its `min_area`
+               (default `min_contour_area`), and the triggering zone names are stored in the
+               MemoryNode metadata under "zones"
+        camera_id: Identifies this camera in file names and MemoryNode metadata; cameras other
+                   than the default one get their own SpeechRecorder
+        record_audio: Set False for cameras without a microphone of their own
+        encoder: Recording encoder settings (see camera.encoders.parse_encoder_settings);
+                 defaults to H.264 through ffmpeg when available, else OpenCV mp4v
+        summary_mode: How recordings are summarized: "keyframes", "video" or "auto" (keyframes
+                      for short clips, the full video otherwise); defaults to SUMMARY_MODE
+        transcription_mode: "streaming" transcribes audio chunks while recording (see
+                            camera.transcription), "batch" the whole file after it stops;
+                            defaults to TRANSCRIPTION_MODE
     """
-    yolo_model = _load_yolo_model()
-    describe_image, summarize_video, generate_title_fn = _import_gemini_helpers()
-    audio_recorder, transcribe_audio, save_transcript = _import_audio_helpers()
+    streaming_transcription = (transcription_mode or TRANSCRIPTION_MODE) == "streaming"
+    job_queue = register_recording_jobs()
+    job_queue.start()
+    if record_audio:
+        audio_recorder, _, _ = _import_audio_helpers(dedicated=camera_id != DEFAULT_CAMERA_ID)
+    else:
+        audio_recorder = None
+    file_prefix = "motion" if camera_id == DEFAULT_CAMERA_ID else f"motion_{camera_id}"
     
     if audio_recorder:
         logging.info("✓ Audio recorder initialized successfully")
@@ -337,60 +911,177 @@ def run_camera_loop(
         cap.release()
         raise RuntimeError("FATAL: Camera opened but failed to start streaming.")
 
-    cap = _open_capture()
+    ring = FrameRingBuffer(frame_buffer_size)
+    grabber = FrameGrabber(_open_capture, ring, stop_event, max_frame_failures, name=f"FrameGrabber-{camera_id}")
+    writer = RecordingWriter(ring, encoder=encoder, pre_roll=pre_roll, pre_roll_max_bytes=pre_roll_max_bytes,
+                             name=f"RecordingWriter-{camera_id}")
+    analysis_counters = {"frames_analyzed": 0, "analysis_skipped": 0, "analysis_overrun": 0}
+
+    def _frame_stats() -> Dict[str, object]:
+        stats = ring.stats()
+        stats.update(writer.stats())
+        stats.update(analysis_counters)
+        stats["capture_fps"] = round(grabber.measured_fps, 2)
+        stats["capture_failures"] = grabber.read_failures
+        if detector.zones:
+            stats["zone_levels"] = detector.zone_levels()
+        if audio_monitoring:
+            try:
+                stats["audio_pre_roll_bytes"] = audio_recorder.get_status().get("pre_roll_bytes", 0)
+            except Exception:
+                pass
+        return stats
+
+    def _start_analysis_when_closed(analysis_audio_path: Optional[str]):
+        """Build the writer callback that queues video analysis once the file is complete."""
+        def on_closed(closed_video_path: str, frames_written: int, segments: List[str]):
+            if not frames_written:
+                logging.warning(f"No frames were written to {closed_video_path}; skipping analysis")
+                return
+            logging.info(f"Recording closed with {frames_written} frames: {closed_video_path}")
+            if segments and create_memory_node:
+                # The encoder died mid-recording; the rest of the clip is in these files.
+                try:
+                    get_recording(closed_video_path).merge("recording", {"video_segments": segments})
+                except Exception as e:
+                    logging.error(f"✗ Failed to record the segments of {closed_video_path}: {e}", exc_info=True)
+            try:
+                job_queue.enqueue(
+                    VIDEO_ANALYSIS_JOB,
+                    {"video_path": closed_video_path, "audio_path": analysis_audio_path, "image_dir": str(image_dir),
+                     "summary_mode": summary_mode},
+                    dedup_key=closed_video_path,
+                )
+            except Exception as e:
+                logging.error(f"✗ Failed to queue analysis for {closed_video_path}: {e}", exc_info=True)
+        return on_closed
+
+    def _create_placeholder_node(node_video_path: str, node_audio_path: Optional[str]) -> Optional[int]:
+        """Create the recording's MemoryNode with a placeholder summary; jobs fill in the rest."""
+        if not (create_memory_node and node_video_path):
+            return None
+        try:
+            metadata = placeholder_metadata(node_video_path, node_audio_path)
+            metadata["camera_id"] = camera_id
+            if detector.zones:
+                metadata["zones"] = sorted(recording_zones)
+            node_id = get_recording(node_video_path).create_node(metadata)
+            logging.info(f"✓ Created MemoryNode {node_id} immediately after recording stopped (with Loading Summary... placeholder)")
+            return node_id
+        except Exception as e:
+            logging.error(f"✗ Failed to create immediate MemoryNode: {e}", exc_info=True)
+            return None
+
+    def _queue_transcription(video_path: str, audio_path: str, timestamp_str: str):
+        transcript_path = str(transcript_dir / f"{file_prefix}_{timestamp_str}.txt")
+        try:
+            job_queue.enqueue(
+                TRANSCRIPTION_JOB,
+                {
+                    "video_path": video_path,
+                    "audio_path": audio_path,
+                    "transcript_path": transcript_path,
+                },
+                dedup_key=video_path,
+            )
+        except Exception as e:
+            logging.error(f"✗ Failed to queue transcription for {audio_path}: {e}", exc_info=True)
+
+    def _start_streaming_transcription(video_path: str, audio_path: str, timestamp_str: str):
+        """Create the transcriber whose `submit` receives the recorder's audio chunks, or None."""
+        try:
+            from audio import transcribe_samples
+        except Exception as e:
+            logging.warning(f"Streaming transcription unavailable, using batch transcription: {e}")
+            return None
+
+        def on_complete(transcription: StreamingTranscription, transcript: str, errors: List[str]):
+            if errors:
+                logging.warning(f"{len(errors)} audio chunks of {audio_path} failed; transcribing the whole file instead")
+                _queue_transcription(video_path, audio_path, timestamp_str)
+                return
+            speech, speaking = _analyze_speech(audio_path)
+            if not speaking and not transcript:
+                _skip_silent_recording(video_path, audio_path, speech)
+                return
+            transcript_path = str(transcript_dir / f"{file_prefix}_{timestamp_str}.txt")
+            _, save_transcript = _import_transcription_helpers()
+            _, _, generate_title_fn = _import_gemini_helpers()
+            _store_transcript(video_path, audio_path, transcript_path, transcript,
+                              datetime.now().strftime("%Y-%m-%d %H:%M:%S"), save_transcript, generate_title_fn, speech)
+
+        return StreamingTranscription(video_path, audio_path, transcribe_samples, on_complete)
+
     is_recording = False
     last_motion_time = None
-    video_writer = None
-    consecutive_failures = 0
     audio_path = None
+    video_path = None
     current_timestamp_str = None
-    prev_gray_frame = None
+    transcriber = None
+    last_seq = -1
+    detector = MotionDetector(
+        engine=motion_engine,
+        width=analysis_width,
+        height=analysis_height,
+        delta_thresh=delta_thresh,
+        zones=zones,
+    )
+    # Per-zone thresholds default to the global one; histories mirror motion_history.
+    zone_thresholds = np.array([
+        zone["min_area"] if zone["min_area"] is not None else min_contour_area
+        for zone in detector.zones if not zone["exclude"]
+    ] or [min_contour_area])
+    zone_history: Deque[np.ndarray] = deque(maxlen=motion_history_length)
+    recording_zones = set()
+    if detector.zones:
+        logging.info(f"Motion zones: {', '.join(detector.zone_names)} "
+                     f"({sum(1 for zone in detector.zones if zone['exclude'])} excluded areas)")
     
+    audio_monitoring = False
+    if audio_recorder and pre_roll > 0 and hasattr(audio_recorder, "start_monitoring"):
+        result, status_code = audio_recorder.start_monitoring(pre_roll)
+        audio_monitoring = status_code == 200
+        if not audio_monitoring:
+            logging.warning(f"Audio pre-roll unavailable: {result.get('error', 'Unknown error')}")
+    
+    grabber.start()
+    writer.start()
     logging.info(f"Starting motion detection loop at ~{processing_fps:.1f} FPS.")
 
     try:
         while not stop_event.is_set():
             read_start_time = time.monotonic()
             
-            ret, frame = cap.read()
-            if not ret:
-                consecutive_failures += 1
-                logging.warning(f"Frame grab failed ({consecutive_failures}/{max_frame_failures})")
-                if consecutive_failures >= max_frame_failures:
-                    logging.error("Exceeded max frame failures. Aborting.")
+            latest = ring.wait_latest(last_seq, timeout=1.0)
+            if latest is None:
+                if not grabber.is_alive():
                     break
-                cap.release()
-                try:
-                    cap = _open_capture()
-                    consecutive_failures = 0
-                except RuntimeError as e:
-                    logging.error(f"Failed to reopen camera: {e}. Retrying in 5s.")
-                    time.sleep(5)
                 continue
+            seq, frame, _ = latest
+            if last_seq >= 0:
+                analysis_counters["analysis_skipped"] += seq - last_seq - 1
+            last_seq = seq
 
-            small_frame = cv2.resize(frame, (640, 480))
-            gray_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-            gray_frame = cv2.GaussianBlur(gray_frame, (21, 21), 0)
-
-            if prev_gray_frame is None:
-                prev_gray_frame = gray_frame
+            motion_area = detector.process(frame, still_valid=lambda: ring.is_current(seq))
+            if motion_area is None:
+                # The grabber lapped this slot while we were reading it.
+                analysis_counters["analysis_overrun"] += 1
                 continue
-
-            delta = cv2.absdiff(prev_gray_frame, gray_frame)
-            thresh = cv2.threshold(delta, delta_thresh, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
-            contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            prev_gray_frame = gray_frame
-
-            total_contour_area = sum(cv2.contourArea(c) for c in contours)
-            motion_history.append(total_contour_area)
+            analysis_counters["frames_analyzed"] += 1
+            motion_history.append(motion_area)
             avg_motion = sum(motion_history) / len(motion_history) if motion_history else 0
-            motion_detected = avg_motion > min_contour_area
+            if detector.zones:
+                zone_history.append(detector.zone_scores.copy())
+                zone_avg = np.mean(zone_history, axis=0)
+                active_zones = [name for name, hit in zip(detector.zone_names, zone_avg > zone_thresholds) if hit]
+                motion_detected = bool(active_zones)
+            else:
+                motion_detected = avg_motion > min_contour_area
+                active_zones = []
             
             if status_callback:
                 try:
-                    status_callback(motion_detected, is_recording, avg_motion)
+                    status_callback(motion_detected, is_recording, avg_motion, _frame_stats())
                 except Exception as e:
                     logging.debug(f"Status callback error: {e}")
 
@@ -400,16 +1091,14 @@ def run_camera_loop(
                     is_recording = True
                     ts_utc = datetime.utcnow()
                     current_timestamp_str = ts_utc.strftime('%Y%m%d_%H%M%S')
-                    video_filename = f"motion_{current_timestamp_str}.mp4"
+                    video_filename = f"{file_prefix}_{current_timestamp_str}.mp4"
                     video_path = str(recording_dir / video_filename)
-                    
-                    frame_height, frame_width, _ = frame.shape
-                    
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    video_writer = cv2.VideoWriter(video_path, fourcc, capture_fps or processing_fps, (frame_width, frame_height))
+                    recording_zones.clear()
+                    writer.start_recording(video_path, seq, grabber.measured_fps or capture_fps or processing_fps)
                     
                     if audio_recorder:
-                        audio_filename = f"motion_{current_timestamp_str}.wav"
+                        audio_extension = getattr(audio_recorder, "file_extension", ".wav")
+                        audio_filename = f"{file_prefix}_{current_timestamp_str}{audio_extension}"
                         audio_path = str(audio_dir / audio_filename)
                         
                         try:
@@ -428,8 +1117,13 @@ def run_camera_loop(
                             logging.warning(f"Could not get recorder status: {e}")
                         
                         logging.info(f"Attempting to start audio recording: {audio_path}")
+                        transcriber = None
+                        if streaming_transcription:
+                            transcriber = _start_streaming_transcription(video_path, audio_path, current_timestamp_str)
                         try:
-                            result, status_code = audio_recorder.start_recording(audio_path)
+                            result, status_code = audio_recorder.start_recording(
+                                audio_path, on_chunk=transcriber.submit if transcriber else None
+                            )
                             if status_code == 200:
                                 logging.info(f"✓ Audio recording started successfully: {audio_path}")
                                 try:
@@ -445,27 +1139,29 @@ def run_camera_loop(
                                 logging.error(f"  2. Another process using the microphone")
                                 logging.error(f"  3. Audio device not available")
                                 audio_path = None
+                                transcriber = None
                         except Exception as e:
                             logging.error(f"✗ Exception starting audio recording: {e}", exc_info=True)
                             logging.error(f"  Exception type: {type(e).__name__}")
                             audio_path = None
+                            transcriber = None
                     else:
                         logging.warning("✗ Audio recorder not available - skipping audio recording")
                         audio_path = None
                     
                     logging.info(f"Motion detected (avg level: {avg_motion:.0f})! Starting new recording: {video_path}")
+                recording_zones.update(active_zones)
             
             if is_recording:
-                if video_writer:
-                    video_writer.write(frame)
-
-                if time.monotonic() - (last_motion_time or 0) > inactivity_timeout:
-                    logging.info(f"Motion level below threshold for {inactivity_timeout}s. Stopping recording: {video_path}")
+                if time.monotonic() - (last_motion_time or 0) > post_roll:
+                    logging.info(f"Motion level below threshold for {post_roll}s. Stopping recording: {video_path}")
                     is_recording = False
                     
                     current_audio_path = audio_path
                     current_video_path = video_path
                     timestamp_for_transcript = current_timestamp_str if current_timestamp_str else datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+                    streamed = transcriber is not None
+                    transcriber = None
                     
                     logging.info(f"Stopping recording - audio_path: {current_audio_path}, audio_recorder available: {audio_recorder is not None}")
                     
@@ -491,167 +1187,22 @@ def run_camera_loop(
                         if not current_audio_path:
                             logging.warning("✗ No audio path set - audio was not recorded")
                     
-                    if create_memory_node and current_video_path:
-                        try:
-                            ts_utc = datetime.utcnow()
-                            metadata = {
-                                "video_path": current_video_path,
-                                "audio_path": current_audio_path,
-                                "transcript_path": None,
-                                "summary": "Loading Summary...",
-                                "transcript": None,
-                                "title": None,
-                                "objects_detected": [],
-                                "description": "Motion detected - processing...",
-                            }
-                            node_id = create_memory_node(
-                                file_path=current_video_path,
-                                file_type="recording",
-                                timestamp=ts_utc.isoformat(),
-                                metadata=json.dumps(metadata)
-                            )
-                            logging.info(f"✓ Created MemoryNode {node_id} immediately after recording stopped (with Loading Summary... placeholder)")
-                        except Exception as e:
-                            logging.error(f"✗ Failed to create immediate MemoryNode: {e}", exc_info=True)
+                    node_id = _create_placeholder_node(current_video_path, current_audio_path)
                     
                     if current_audio_path and os.path.exists(current_audio_path):
-                        def transcribe_and_save():
-                            try:
-                                logging.info(f"Starting transcription for: {current_audio_path}")
-                                transcript, timestamp = transcribe_audio(current_audio_path)
-                                
-                                logging.info("=" * 80)
-                                logging.info(f"TRANSCRIPT FOR VIDEO: {current_video_path}")
-                                logging.info("=" * 80)
-                                logging.info(transcript if transcript else "[No transcript generated]")
-                                logging.info("=" * 80)
-                                
-                                transcript_filename = f"motion_{timestamp_for_transcript}.txt"
-                                transcript_path = str(transcript_dir / transcript_filename)
-                                transcript_saved = save_transcript(transcript, timestamp, transcript_path)
-                                
-                                if transcript_saved:
-                                    logging.info(f"Transcript saved: {transcript_path}")
-                                else:
-                                    logging.error(f"Failed to save transcript: {transcript_path}")
-                                
-                                title = None
-                                if transcript and generate_title_fn:
-                                    try:
-                                        title = _generate_title_from_transcript(transcript, generate_title_fn)
-                                        logging.info(f"Generated title from transcript: {title}")
-                                    except Exception as e:
-                                        logging.warning(f"Failed to generate title from transcript: {e}")
-                                if create_memory_node and current_video_path and transcript:
-                                    try:
-                                        from db.database import (
-                                            get_memory_node_by_file_path, 
-                                            update_memory_node_metadata,
-                                            create_memory_node as create_node
-                                        )
-                                        
-                                        max_retries = 3
-                                        retry_delay = 2.0
-                                        video_node = None
-                                        
-                                        logging.info(f"Looking for MemoryNode to update with transcript: {current_video_path}")
-                                        
-                                        for attempt in range(max_retries):
-                                            video_node = get_memory_node_by_file_path(current_video_path)
-                                            if video_node:
-                                                logging.info(f"✓ Found MemoryNode {video_node['id']} on attempt {attempt + 1}")
-                                                break
-                                            if attempt < max_retries - 1:
-                                                logging.debug(f"MemoryNode not found yet, waiting {retry_delay}s (attempt {attempt + 1}/{max_retries})")
-                                                time.sleep(retry_delay)
-                                        
-                                        if video_node:
-                                            try:
-                                                existing_metadata = json.loads(video_node.get('metadata', '{}') or '{}')
-                                            except:
-                                                existing_metadata = {}
-                                            
-                                            existing_metadata['transcript'] = transcript
-                                            existing_metadata['transcript_path'] = transcript_path
-                                            existing_metadata['audio_path'] = current_audio_path
-                                            if title:
-                                                existing_metadata['title'] = title
-                                            
-                                            if update_memory_node_metadata(video_node['id'], existing_metadata):
-                                                logging.info(f"✓ Successfully updated MemoryNode {video_node['id']} with transcript ({len(transcript)} characters)")
-                                                
-                                                time.sleep(0.5)
-                                                updated_node = get_memory_node_by_file_path(current_video_path)
-                                                if updated_node:
-                                                    try:
-                                                        verify_metadata = json.loads(updated_node.get('metadata', '{}') or '{}')
-                                                        if verify_metadata.get('transcript'):
-                                                            logging.info(f"✓✓ Verified: transcript is stored in MemoryNode {video_node['id']}")
-                                                            logging.info(f"   Transcript preview: {transcript[:50]}...")
-                                                        else:
-                                                            logging.error(f"✗ Verification failed: transcript not found in MemoryNode {video_node['id']}")
-                                                            logging.error(f"   Metadata keys: {list(verify_metadata.keys())}")
-                                                    except Exception as e:
-                                                        logging.error(f"✗ Error verifying metadata: {e}")
-                                            else:
-                                                logging.error(f"✗ Failed to update MemoryNode {video_node['id']} with transcript")
-                                        else:
-                                            logging.warning(f"⚠ MemoryNode not found after {max_retries} attempts. Creating new one with transcript.")
-                                            try:
-                                                metadata = {
-                                                    "video_path": current_video_path,
-                                                    "audio_path": current_audio_path,
-                                                    "transcript_path": transcript_path,
-                                                    "summary": None,
-                                                    "transcript": transcript,
-                                                    "objects_detected": [],
-                                                    "description": "Recording with transcript",
-                                                }
-                                                node_id = create_node(
-                                                    file_path=current_video_path,
-                                                    file_type="recording",
-                                                    timestamp=timestamp,
-                                                    metadata=json.dumps(metadata)
-                                                )
-                                                logging.info(f"✓ Created MemoryNode {node_id} with transcript ({len(transcript)} characters)")
-                                            except Exception as e:
-                                                logging.error(f"✗ Failed to create MemoryNode with transcript: {e}", exc_info=True)
-                                    except Exception as e:
-                                        logging.error(f"✗ Error handling transcript in MemoryNode: {e}", exc_info=True)
-                                elif not transcript:
-                                    logging.warning(f"⚠ No transcript to store for {current_video_path}")
-                                
-                            except Exception as e:
-                                logging.error(f"Error transcribing audio {current_audio_path}: {e}", exc_info=True)
-                        
-                        transcription_thread = threading.Thread(target=transcribe_and_save, daemon=True)
-                        transcription_thread.start()
+                        if streamed:
+                            logging.info(f"Streaming transcription of {current_audio_path} finishes with its last chunk")
+                        else:
+                            _queue_transcription(current_video_path, current_audio_path, timestamp_for_transcript)
                     else:
                         if current_audio_path:
                             logging.warning(f"⚠ Audio file does not exist, skipping transcription: {current_audio_path}")
+                            if node_id:
+                                set_pipeline_stages(node_id, transcribed="skipped", error="Audio file missing")
                         else:
                             logging.info("ℹ No audio recording available for transcription")
                     
-                    if video_writer:
-                        video_writer.release()
-                        
-                        analysis_thread = threading.Thread(
-                            target=analyze_and_log_video,
-                            args=(
-                                current_video_path,
-                                yolo_model,
-                                describe_image,
-                                summarize_video,
-                                image_dir,
-                                current_audio_path,
-                                None,
-                                None,
-                            ),
-                            daemon=True,
-                        )
-                        analysis_thread.start()
-
-                        video_writer = None
+                    writer.stop_recording(seq + 1, on_closed=_start_analysis_when_closed(current_audio_path))
                     audio_path = None
                     current_timestamp_str = None
             
@@ -661,129 +1212,32 @@ def run_camera_loop(
                 time.sleep(sleep_time)
 
     finally:
-        if is_recording and video_writer:
+        grabber.stop()
+        grabber.join(timeout=5)
+        ring.close()
+        
+        if is_recording:
             logging.info("Finishing active recording before shutdown...")
             current_audio_path = audio_path
             current_video_path = video_path
             timestamp_for_transcript = current_timestamp_str if current_timestamp_str else datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            _create_placeholder_node(current_video_path, current_audio_path)
             
             if audio_recorder and current_audio_path:
                 try:
                     result, status_code = audio_recorder.stop_recording()
                     if status_code == 200:
                         logging.info(f"Audio recording stopped on exit: {current_audio_path}")
-                        def transcribe_and_save():
-                            try:
-                                logging.info(f"Starting transcription for: {current_audio_path}")
-                                transcript, timestamp = transcribe_audio(current_audio_path)
-                                
-                                logging.info("=" * 80)
-                                logging.info(f"TRANSCRIPT FOR VIDEO: {current_video_path}")
-                                logging.info("=" * 80)
-                                logging.info(transcript if transcript else "[No transcript generated]")
-                                logging.info("=" * 80)
-                                
-                                transcript_filename = f"motion_{timestamp_for_transcript}.txt"
-                                transcript_path = str(transcript_dir / transcript_filename)
-                                transcript_saved = save_transcript(transcript, timestamp, transcript_path)
-                                
-                                if transcript_saved:
-                                    logging.info(f"Transcript saved: {transcript_path}")
-                                else:
-                                    logging.error(f"Failed to save transcript: {transcript_path}")
-                                
-                                title = None
-                                if transcript and generate_title_fn:
-                                    try:
-                                        title = _generate_title_from_transcript(transcript, generate_title_fn)
-                                        logging.info(f"Generated title from transcript: {title}")
-                                    except Exception as e:
-                                        logging.warning(f"Failed to generate title from transcript: {e}")
-                                
-                                if create_memory_node and current_video_path and transcript:
-                                    try:
-                                        from db.database import (
-                                            get_memory_node_by_file_path, 
-                                            update_memory_node_metadata,
-                                            create_memory_node as create_node
-                                        )
-                                        
-                                        max_retries = 15
-                                        retry_delay = 2.0
-                                        video_node = None
-                                        
-                                        logging.info(f"Looking for MemoryNode to update with transcript: {current_video_path}")
-                                        
-                                        for attempt in range(max_retries):
-                                            video_node = get_memory_node_by_file_path(current_video_path)
-                                            if video_node:
-                                                logging.info(f"✓ Found MemoryNode {video_node['id']} on attempt {attempt + 1}")
-                                                break
-                                            if attempt < max_retries - 1:
-                                                logging.debug(f"MemoryNode not found yet, waiting {retry_delay}s (attempt {attempt + 1}/{max_retries})")
-                                                time.sleep(retry_delay)
-                                        
-                                        if video_node:
-                                            try:
-                                                existing_metadata = json.loads(video_node.get('metadata', '{}') or '{}')
-                                            except:
-                                                existing_metadata = {}
-                                            
-                                            existing_metadata['transcript'] = transcript
-                                            existing_metadata['transcript_path'] = transcript_path
-                                            existing_metadata['audio_path'] = current_audio_path
-                                            
-                                            if update_memory_node_metadata(video_node['id'], existing_metadata):
-                                                logging.info(f"✓ Successfully updated MemoryNode {video_node['id']} with transcript ({len(transcript)} characters)")
-                                        else:
-                                            metadata = {
-                                                    "video_path": current_video_path,
-                                                    "audio_path": current_audio_path,
-                                                    "transcript_path": transcript_path,
-                                                    "summary": "Loading Summary...",
-                                                    "transcript": transcript,
-                                                    "title": title,
-                                                    "objects_detected": [],
-                                                    "description": "Recording with transcript",
-                                                }
-                                            node_id = create_node(
-                                                file_path=current_video_path,
-                                                file_type="recording",
-                                                timestamp=timestamp,
-                                                metadata=json.dumps(metadata)
-                                            )
-                                            logging.info(f"✓ Created MemoryNode {node_id} with transcript ({len(transcript)} characters)")
-                                    except Exception as e:
-                                        logging.error(f"✗ Error handling transcript in MemoryNode: {e}", exc_info=True)
-                            except Exception as e:
-                                logging.error(f"Error transcribing audio {current_audio_path}: {e}", exc_info=True)
-                        
-                        transcription_thread = threading.Thread(target=transcribe_and_save, daemon=False)
-                        transcription_thread.start()
+                        if transcriber is None:
+                            _queue_transcription(current_video_path, current_audio_path, timestamp_for_transcript)
                     else:
                         logging.warning(f"Failed to stop audio recording on exit: {result.get('error', 'Unknown error')}")
                 except Exception as e:
                     logging.warning(f"Error stopping audio recording on exit: {e}")
+                # Already stopped; the cleanup below must not stop it again.
+                audio_path = None
             
-            if video_writer:
-                video_writer.release()
-                
-                analysis_thread = threading.Thread(
-                    target=analyze_and_log_video,
-                    args=(
-                        current_video_path,
-                        yolo_model,
-                        describe_image,
-                        summarize_video,
-                        image_dir,
-                        current_audio_path,
-                        None,
-                        None,
-                    ),
-                    daemon=False,
-                )
-                analysis_thread.start()
-                logging.info(f"Video analysis started for: {current_video_path}")
+            writer.stop_recording(ring.head, on_closed=_start_analysis_when_closed(current_audio_path))
         
         if audio_recorder and audio_path:
             try:
@@ -792,11 +1246,13 @@ def run_camera_loop(
             except Exception as e:
                 logging.warning(f"Error stopping audio recording on exit: {e}")
         
-        if 'cap' in locals() and cap.isOpened():
-            cap.release()
-        if video_writer:
-            video_writer.release()
-        logging.info("Camera loop stopped.")
+        if audio_monitoring:
+            audio_recorder.stop_monitoring()
+        
+        writer.join(timeout=30)
+        if writer.is_alive():
+            logging.warning("Recording writer did not finish draining frames within 30s")
+        logging.info(f"Camera loop stopped. Frame stats: {_frame_stats()}")
 
 
 def main(argv: Optional[List[str]] = None) -> int:
@@ -811,9 +1267,36 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument("--height", type=int, help="Requested capture height (pixels).")
     parser.add_argument("--capture-fps", type=float, help="Requested capture FPS from the device.")
     parser.add_argument("--max-frame-failures", type=int, default=10, help="Max consecutive frame read failures.")
-    parser.add_argument("--inactivity-timeout", type=float, default=5.0, help="Seconds of no motion to stop recording.")
+    parser.add_argument("--post-roll", "--inactivity-timeout", dest="post_roll", type=float, default=5.0,
+                        help="Seconds of no motion before a recording stops.")
+    parser.add_argument("--pre-roll", type=float, default=3.0, help="Seconds kept from before motion is detected.")
+    parser.add_argument("--motion-engine", choices=MOTION_ENGINES, default="frame_diff", help="Motion detection engine.")
+    parser.add_argument("--analysis-width", type=int, default=640, help="Width frames are downsized to for motion analysis.")
+    parser.add_argument("--analysis-height", type=int, default=480, help="Height frames are downsized to for motion analysis.")
     parser.add_argument("--delta-thresh", type=int, default=50, help="Threshold for detecting pixel changes (1-255).")
+    parser.add_argument("--frame-buffer", type=int, default=32, help="Frames buffered between capture and the video writer.")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default=None, help="Recording encoder backend.")
+    parser.add_argument("--codec", choices=CODECS, default=None, help="Recording codec.")
+    parser.add_argument("--crf", type=int, default=None, help="Constant rate factor for H.264/H.265 (lower is better quality).")
+    parser.add_argument("--bitrate", default=None, help="Target bitrate, e.g. 1M (overrides --crf).")
+    parser.add_argument("--record-width", type=int, default=None, help="Width recordings are scaled to.")
+    parser.add_argument("--record-height", type=int, default=None, help="Height recordings are scaled to.")
+    parser.add_argument("--hwaccel", choices=HWACCELS, default=None, help="Hardware encoder for ffmpeg.")
+    parser.add_argument("--summary-mode", choices=SUMMARY_MODES, default=None,
+                        help="Summarize recordings from keyframes, the full video, or pick per clip (auto).")
+    parser.add_argument("--transcription-mode", choices=TRANSCRIPTION_MODES, default=None,
+                        help="Transcribe audio in chunks while recording (streaming) or after it stops (batch).")
     args = parser.parse_args(argv)
+    encoder_args = {
+        "backend": args.encoder,
+        "codec": args.codec,
+        "crf": args.crf,
+        "bitrate": args.bitrate,
+        "width": args.record_width,
+        "height": args.record_height,
+        "hwaccel": args.hwaccel,
+    }
+    encoder = parse_encoder_settings({key: value for key, value in encoder_args.items() if value is not None})
 
     stop_event = threading.Event()
     
@@ -843,13 +1326,26 @@ def main(argv: Optional[List[str]] = None) -> int:
             capture_height=args.height,
             capture_fps=args.capture_fps,
             max_frame_failures=args.max_frame_failures,
-            inactivity_timeout=args.inactivity_timeout,
+            post_roll=args.post_roll,
+            pre_roll=args.pre_roll,
+            motion_engine=args.motion_engine,
+            analysis_width=args.analysis_width,
+            analysis_height=args.analysis_height,
             delta_thresh=args.delta_thresh,
+            frame_buffer_size=args.frame_buffer,
+            encoder=encoder,
+            summary_mode=args.summary_mode,
+            transcription_mode=args.transcription_mode,
         )
     except Exception as e:
         logging.critical(f"An unrecoverable error occurred: {e}", exc_info=True)
         return 1
     
+    job_queue = get_job_queue()
+    if not job_queue.wait_idle(timeout=120):
+        logging.warning("Analysis jobs are still pending; they will resume on the next start")
+    job_queue.stop()
+    
     return 0
 
 
@@ -1,21 +1,55 @@
 """
 Camera service manager for Flask API integration.
-Manages the camera loop thread and allows start/stop control via API.
+Manages one camera loop thread per camera and allows start/stop control via API.
+All cameras share the YOLO model in camera.workers (fed in batches by
+camera.detection), the persistent job queue that analyzes and transcribes
+recordings, and the single database writer connection.
 """
 
 import logging
+import re
 import threading
 from pathlib import Path
-from typing import Optional, Tuple
-from camera.camera_module import run_camera_loop
+from typing import Dict, Optional, Tuple
+from camera import workers as camera_workers
+from camera.camera_module import DEFAULT_CAMERA_ID, run_camera_loop
+from camera.detection import get_detection_service
+from camera.encoders import parse_encoder_settings
+from camera.keyframes import SUMMARY_MODE, SUMMARY_MODES, summary_stats
+from camera.transcription import TRANSCRIPTION_MODE, TRANSCRIPTION_MODES
+from camera.motion import MOTION_ENGINES, parse_zones
+from jobs.queue import get_job_queue
 
 logger = logging.getLogger(__name__)
 
 
+_CAMERA_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+# Numeric start settings: setting -> (request key, type, lowest value, whether the lowest value is allowed).
+# camera.capture.FrameRingBuffer needs at least 3 slots.
+_NUMERIC_SETTINGS = {
+    "processing_fps": ("fps", float, 0, False),
+    "frame_buffer_size": ("frame_buffer_size", int, 3, True),
+    "analysis_width": ("analysis_width", int, 1, True),
+    "analysis_height": ("analysis_height", int, 1, True),
+}
+
+
+def _parse_number(value, kind: type, lowest: float, inclusive: bool):
+    """Return `value` as `kind`; raises ValueError if it is not a number in range."""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    number = kind(value)
+    if number != number or number < lowest or (number == lowest and not inclusive):
+        raise ValueError(value)
+    return number
+
+
 class CameraService:
-    """Thread-safe camera service manager"""
+    """Thread-safe manager for a single camera loop"""
     
-    def __init__(self):
+    def __init__(self, camera_id: str = DEFAULT_CAMERA_ID):
+        self.camera_id = camera_id
         self.camera_thread: Optional[threading.Thread] = None
         self.stop_event: Optional[threading.Event] = None
         self.is_running = False
@@ -24,6 +58,7 @@ class CameraService:
         self.motion_detected = False
         self.is_currently_recording = False
         self.last_motion_level = 0.0
+        self.frame_stats: dict = {}
         
         self.camera_index = 0
         self.processing_fps = 10.0
@@ -32,8 +67,18 @@ class CameraService:
         self.capture_height = None
         self.capture_fps = None
         self.max_frame_failures = 10
-        self.inactivity_timeout = 5.0
+        self.post_roll = 5.0
+        self.pre_roll = 3.0
+        self.motion_engine = "frame_diff"
+        self.analysis_width = 640
+        self.analysis_height = 480
+        self.zones = []
         self.delta_thresh = 50
+        self.frame_buffer_size = 32
+        self.record_audio = True
+        self.encoder = parse_encoder_settings(None)
+        self.summary_mode = SUMMARY_MODE
+        self.transcription_mode = TRANSCRIPTION_MODE
         
         base_dir = Path(__file__).resolve().parents[1]
         self.image_dir = base_dir / "data" / "images"
@@ -42,43 +87,96 @@ class CameraService:
         """Start the camera loop in a background thread"""
         with self.lock:
             if self.is_running:
+                if self.stop_event and self.stop_event.is_set():
+                    return {"error": "Camera service is still stopping; retry once the camera is released"}, 409
                 return {"error": "Camera service is already running"}, 400
             
-            self.camera_index = kwargs.get("camera_index", self.camera_index)
-            self.processing_fps = kwargs.get("fps", self.processing_fps)
-            self.min_contour_area = kwargs.get("min_area", self.min_contour_area)
-            self.capture_width = kwargs.get("width", self.capture_width)
-            self.capture_height = kwargs.get("height", self.capture_height)
-            self.capture_fps = kwargs.get("capture_fps", self.capture_fps)
-            self.max_frame_failures = kwargs.get("max_frame_failures", self.max_frame_failures)
-            self.inactivity_timeout = kwargs.get("inactivity_timeout", self.inactivity_timeout)
-            self.delta_thresh = kwargs.get("delta_thresh", self.delta_thresh)
+            # Validate everything before touching the service, so a rejected
+            # request leaves the previous settings intact.
+            settings = {
+                "camera_index": kwargs.get("camera_index", self.camera_index),
+                "processing_fps": kwargs.get("fps", self.processing_fps),
+                "min_contour_area": kwargs.get("min_area", self.min_contour_area),
+                "capture_width": kwargs.get("width", self.capture_width),
+                "capture_height": kwargs.get("height", self.capture_height),
+                "capture_fps": kwargs.get("capture_fps", self.capture_fps),
+                "max_frame_failures": kwargs.get("max_frame_failures", self.max_frame_failures),
+                # "inactivity_timeout" is the old name of post_roll
+                "post_roll": kwargs.get("post_roll", kwargs.get("inactivity_timeout", self.post_roll)),
+                "pre_roll": kwargs.get("pre_roll", self.pre_roll),
+                "motion_engine": kwargs.get("motion_engine", self.motion_engine),
+                "analysis_width": kwargs.get("analysis_width", self.analysis_width),
+                "analysis_height": kwargs.get("analysis_height", self.analysis_height),
+                "zones": self.zones,
+                "delta_thresh": kwargs.get("delta_thresh", self.delta_thresh),
+                "frame_buffer_size": kwargs.get("frame_buffer_size", self.frame_buffer_size),
+                "record_audio": bool(kwargs.get("record_audio", self.record_audio)),
+                "encoder": self.encoder,
+                "summary_mode": kwargs.get("summary_mode", self.summary_mode),
+                "transcription_mode": kwargs.get("transcription_mode", self.transcription_mode),
+            }
+            for name, (key, kind, lowest, inclusive) in _NUMERIC_SETTINGS.items():
+                try:
+                    settings[name] = _parse_number(settings[name], kind, lowest, inclusive)
+                except (TypeError, ValueError):
+                    bound = f"of at least {lowest}" if inclusive else f"greater than {lowest}"
+                    kind_name = "an integer" if kind is int else "a number"
+                    return {"error": f"Invalid {key} '{settings[name]}': must be {kind_name} {bound}"}, 400
+            if settings["motion_engine"] not in MOTION_ENGINES:
+                return {"error": f"Unknown motion_engine '{settings['motion_engine']}'",
+                        "motion_engines": list(MOTION_ENGINES)}, 400
+            if "zones" in kwargs:
+                try:
+                    settings["zones"] = parse_zones(kwargs["zones"])
+                except ValueError as e:
+                    return {"error": f"Invalid zones: {e}"}, 400
+            if "encoder" in kwargs:
+                try:
+                    settings["encoder"] = parse_encoder_settings(kwargs["encoder"])
+                except ValueError as e:
+                    return {"error": f"Invalid encoder settings: {e}"}, 400
+            if settings["summary_mode"] not in SUMMARY_MODES:
+                return {"error": f"Unknown summary_mode '{settings['summary_mode']}'",
+                        "summary_modes": list(SUMMARY_MODES)}, 400
+            if settings["transcription_mode"] not in TRANSCRIPTION_MODES:
+                return {"error": f"Unknown transcription_mode '{settings['transcription_mode']}'",
+                        "transcription_modes": list(TRANSCRIPTION_MODES)}, 400
+            
+            for name, value in settings.items():
+                setattr(self, name, value)
             self.stop_event = threading.Event()
             
             self.camera_thread = threading.Thread(
                 target=self._run_camera_loop,
                 daemon=True,
-                name="CameraLoop"
+                name=f"CameraLoop-{self.camera_id}"
             )
             self.camera_thread.start()
             self.is_running = True
             
-            logger.info("Camera service started")
+            logger.info(f"Camera service started for camera '{self.camera_id}'")
             return {
                 "message": "Camera service started",
+                "camera_id": self.camera_id,
                 "camera_index": self.camera_index,
                 "processing_fps": self.processing_fps
             }, 200
     
     def stop(self) -> Tuple[dict, int]:
-        """Stop the camera loop (non-blocking - returns immediately)"""
+        """Stop the camera loop (non-blocking - returns immediately)
+
+        `is_running` stays True until the loop thread has finished and
+        released the camera device, so the service (or another camera on the
+        same device index) cannot be started while the device is still open.
+        """
         with self.lock:
             if not self.is_running:
                 return {"error": "Camera service is not running"}, 400
+            if self.stop_event and self.stop_event.is_set():
+                return {"message": "Camera service is already stopping"}, 200
             
             if self.stop_event:
                 self.stop_event.set()
-            self.is_running = False
             
             logger.info("Stop signal sent to camera service (thread will finish processing)")
             return {"message": "Camera service stop signal sent"}, 200
@@ -87,30 +185,46 @@ class CameraService:
         """Get current camera service status"""
         with self.lock:
             status = {
+                "camera_id": self.camera_id,
                 "is_running": self.is_running,
+                "is_stopping": bool(self.is_running and self.stop_event and self.stop_event.is_set()),
                 "camera_index": self.camera_index,
                 "processing_fps": self.processing_fps,
                 "min_contour_area": self.min_contour_area,
+                "pre_roll": self.pre_roll,
+                "post_roll": self.post_roll,
+                "motion_engine": self.motion_engine,
+                "analysis_resolution": [self.analysis_width, self.analysis_height],
+                "zones": self.zones,
+                "record_audio": self.record_audio,
+                "encoder": self.encoder,
+                "summary_mode": self.summary_mode,
+                "transcription_mode": self.transcription_mode,
                 "motion_detected": self.motion_detected,
                 "is_currently_recording": self.is_currently_recording,
                 "last_motion_level": self.last_motion_level,
+                "frames": dict(self.frame_stats),
             }
             if self.camera_thread:
                 status["thread_alive"] = self.camera_thread.is_alive()
             return status
     
-    def update_status(self, motion_detected: bool, is_recording: bool, motion_level: float = 0.0):
-        """Update motion and recording status (called by camera loop)"""
+    def update_status(self, motion_detected: bool, is_recording: bool, motion_level: float = 0.0,
+                      frame_stats: Optional[dict] = None):
+        """Update motion, recording and frame-pipeline status (called by camera loop)"""
         with self.lock:
             self.motion_detected = motion_detected
             self.is_currently_recording = is_recording
             self.last_motion_level = motion_level
+            if frame_stats is not None:
+                self.frame_stats = frame_stats
     
     def _run_camera_loop(self):
         """Internal method to run the camera loop"""
         try:
-            def status_callback(motion_detected: bool, is_recording: bool, motion_level: float):
-                self.update_status(motion_detected, is_recording, motion_level)
+            def status_callback(motion_detected: bool, is_recording: bool, motion_level: float,
+                                frame_stats: Optional[dict] = None):
+                self.update_status(motion_detected, is_recording, motion_level, frame_stats)
             
             run_camera_loop(
                 camera_index=self.camera_index,
@@ -122,8 +236,19 @@ class CameraService:
                 capture_height=self.capture_height,
                 capture_fps=self.capture_fps,
                 max_frame_failures=self.max_frame_failures,
-                inactivity_timeout=self.inactivity_timeout,
+                post_roll=self.post_roll,
+                pre_roll=self.pre_roll,
+                motion_engine=self.motion_engine,
+                analysis_width=self.analysis_width,
+                analysis_height=self.analysis_height,
+                zones=self.zones,
+                camera_id=self.camera_id,
+                record_audio=self.record_audio,
+                encoder=self.encoder,
+                summary_mode=self.summary_mode,
+                transcription_mode=self.transcription_mode,
                 delta_thresh=self.delta_thresh,
+                frame_buffer_size=self.frame_buffer_size,
                 status_callback=status_callback,
             )
         except Exception as e:
@@ -137,13 +262,87 @@ class CameraService:
                 logger.info("Camera loop thread finished and cleaned up")
 
 
-_camera_service: Optional[CameraService] = None
+class CameraManager:
+    """Registry of per-camera services, addressed by camera id"""
+    
+    def __init__(self):
+        self.cameras: Dict[str, CameraService] = {}
+        self.lock = threading.Lock()
+    
+    def get(self, camera_id: str, create: bool = False) -> Optional[CameraService]:
+        """Return the service for `camera_id`, creating it if requested"""
+        with self.lock:
+            service = self.cameras.get(camera_id)
+            if service is None and create:
+                service = CameraService(camera_id)
+                self.cameras[camera_id] = service
+            return service
+    
+    def start(self, camera_id: str, **kwargs) -> Tuple[dict, int]:
+        """Start a camera, refusing a device index already in use by another running camera
+        
+        The index check and the start happen under the manager lock, so two
+        concurrent starts cannot both claim the same device.
+        """
+        if not _CAMERA_ID_RE.match(camera_id or ""):
+            return {"error": "Camera id must be 1-32 letters, digits, '_' or '-'"}, 400
+        
+        with self.lock:
+            service = self.cameras.get(camera_id)
+            camera_index = kwargs.get("camera_index", service.camera_index if service else 0)
+            for other in self.cameras.values():
+                if other is not service and other.is_running and other.camera_index == camera_index:
+                    return {"error": f"Camera index {camera_index} is already used by camera '{other.camera_id}'"}, 409
+            if service is None:
+                service = CameraService(camera_id)
+                self.cameras[camera_id] = service
+            return service.start(**kwargs)
+    
+    def stop(self, camera_id: str) -> Tuple[dict, int]:
+        service = self.get(camera_id)
+        if service is None:
+            return {"error": f"Unknown camera '{camera_id}'"}, 404
+        return service.stop()
+    
+    def get_status(self, camera_id: str) -> Tuple[dict, int]:
+        service = self.get(camera_id)
+        if service is None:
+            return {"error": f"Unknown camera '{camera_id}'"}, 404
+        return service.get_status(), 200
+    
+    def get_all_status(self) -> dict:
+        """Status of every camera plus the shared model and detection batches, job queue, summary latency and database writer"""
+        with self.lock:
+            services = list(self.cameras.values())
+        status = {
+            "cameras": {service.camera_id: service.get_status() for service in services},
+            "workers": camera_workers.stats(),
+            "detection": get_detection_service().stats(),
+            "jobs": get_job_queue().stats(),
+            "summaries": summary_stats(),
+        }
+        try:
+            from db.database import get_writer_stats
+            status["database_writer"] = get_writer_stats()
+        except (ImportError, ModuleNotFoundError):
+            pass
+        return status
+
+
+_camera_manager: Optional[CameraManager] = None
+_camera_manager_lock = threading.Lock()
+
+
+def get_camera_manager() -> CameraManager:
+    """Get or create the global camera manager"""
+    global _camera_manager
+    with _camera_manager_lock:
+        if _camera_manager is None:
+            _camera_manager = CameraManager()
+        return _camera_manager
 
 
 def get_camera_service() -> CameraService:
-    """Get or create the global camera service instance"""
-    global _camera_service
-    if _camera_service is None:
-        _camera_service = CameraService()
-    return _camera_service
+    """Get or create the service for the default camera (used by the /camera routes)"""
+    return get_camera_manager().get(DEFAULT_CAMERA_ID, create=True)
 
@@ -0,0 +1,472 @@
+"""
+Threaded frame capture for the camera loop.
+
+A `FrameGrabber` thread reads the camera as fast as it delivers frames and
+stores them in a `FrameRingBuffer` of preallocated slots (frames are decoded
+straight into the slots, so steady-state capture allocates nothing). Two
+consumers read from the ring:
+
+- the motion analyzer takes the newest frame each time and simply skips
+  anything it was too slow to look at;
+- a `RecordingWriter` thread consumes every frame in order and writes the
+  ones that fall inside a recording to a `VideoEncoder` (camera.encoders:
+  ffmpeg H.264/H.265 or `cv2.VideoWriter`) at the measured capture rate. Between recordings it keeps the last few seconds as JPEGs
+  (the pre-roll) and writes them at the start of the next recording. It also
+  passes the recorded frames to a `KeyframeSelector` (camera.keyframes), whose
+  picks are saved next to each recording for keyframe-based summaries.
+
+The grabber never overwrites a frame the writer has not consumed yet; if the
+writer falls a whole ring behind, new frames are dropped and counted instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from camera.encoders import VideoEncoder, create_encoder, parse_encoder_settings
+from camera.keyframes import KeyframeSelector
+
+
+class FrameRingBuffer:
+    """Fixed-capacity ring of preallocated frames with sequence numbers.
+
+    One producer (the grabber), one in-order reader that must see every frame
+    (the writer) and any number of "latest frame" readers (motion analysis).
+    Latest-frame readers get a view into the ring and must call `is_current`
+    after using it: a False result means the slot was overwritten meanwhile.
+    """
+
+    def __init__(self, capacity: int = 64):
+        if capacity < 3:
+            raise ValueError("FrameRingBuffer needs at least 3 slots")
+        self.capacity = capacity
+        self._frames: Optional[np.ndarray] = None
+        self._seqs: List[int] = [-1] * capacity
+        self._times: List[float] = [0.0] * capacity
+        self._head = 0
+        self._reader_seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.frames_dropped = 0
+
+    @property
+    def frame_shape(self) -> Optional[Tuple[int, ...]]:
+        return None if self._frames is None else self._frames.shape[1:]
+
+    def allocate(self, shape: Tuple[int, ...], dtype=np.uint8):
+        """(Re)allocate the slots for frames of `shape`.
+
+        Frames still waiting for the in-order reader are lost when the
+        resolution changes; they are counted as dropped.
+        """
+        with self._cond:
+            if self._frames is not None and self._frames.shape[1:] == tuple(shape):
+                return
+            self.frames_dropped += self._head - self._reader_seq
+            self._reader_seq = self._head
+            self._seqs = [-1] * self.capacity
+            self._frames = np.empty((self.capacity, *shape), dtype=dtype)
+            logging.info(f"Frame ring allocated: {self.capacity} x {shape} "
+                         f"({self._frames.nbytes / 1e6:.1f} MB)")
+
+    def slot_for_write(self) -> Optional[np.ndarray]:
+        """Return the slot for the next frame, or None if the ring is full."""
+        with self._cond:
+            if self._frames is None or self._head - self._reader_seq >= self.capacity:
+                return None
+            index = self._head % self.capacity
+            self._seqs[index] = -1
+            return self._frames[index]
+
+    def commit(self, timestamp: float) -> int:
+        """Publish the frame just written to `slot_for_write()`; returns its sequence number."""
+        with self._cond:
+            seq = self._head
+            index = seq % self.capacity
+            self._seqs[index] = seq
+            self._times[index] = timestamp
+            self._head += 1
+            self._cond.notify_all()
+            return seq
+
+    def drop(self):
+        with self._cond:
+            self.frames_dropped += 1
+
+    @property
+    def head(self) -> int:
+        """Sequence number the next captured frame will get."""
+        return self._head
+
+    def wait_latest(self, after_seq: int, timeout: float) -> Optional[Tuple[int, np.ndarray, float]]:
+        """Wait for a frame newer than `after_seq` and return the newest one."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._head - 1 > after_seq or self._closed, timeout):
+                return None
+            if self._head - 1 <= after_seq:
+                return None
+            seq = self._head - 1
+            index = seq % self.capacity
+            return seq, self._frames[index], self._times[index]
+
+    def is_current(self, seq: int) -> bool:
+        return self._seqs[seq % self.capacity] == seq
+
+    def next_in_order(self, timeout: float) -> Optional[Tuple[int, np.ndarray, float]]:
+        """Return the oldest frame not yet released by the in-order reader."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._reader_seq < self._head or self._closed, timeout):
+                return None
+            if self._reader_seq >= self._head:
+                return None
+            seq = self._reader_seq
+            index = seq % self.capacity
+            return seq, self._frames[index], self._times[index]
+
+    def release(self, seq: int):
+        """Mark every frame up to `seq` as consumed by the in-order reader."""
+        with self._cond:
+            self._reader_seq = max(self._reader_seq, seq + 1)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "ring_bytes": 0 if self._frames is None else self._frames.nbytes,
+                "frames_captured": self._head,
+                "frames_dropped": self.frames_dropped,
+                "writer_backlog": self._head - self._reader_seq,
+                "ring_capacity": self.capacity,
+            }
+
+
+class FrameGrabber(threading.Thread):
+    """Reads frames from the camera into a `FrameRingBuffer` as fast as they arrive."""
+
+    def __init__(
+        self,
+        open_capture: Callable[[], cv2.VideoCapture],
+        ring: FrameRingBuffer,
+        stop_event: threading.Event,
+        max_frame_failures: int = 10,
+        name: str = "FrameGrabber",
+    ):
+        super().__init__(daemon=True, name=name)
+        self.open_capture = open_capture
+        self.ring = ring
+        self.stop_event = stop_event
+        self.max_frame_failures = max_frame_failures
+        self.failed = False
+        self.read_failures = 0
+        self._halt = threading.Event()
+        self._frame_times: Deque[float] = deque(maxlen=60)
+        self._reported_fps = 0.0
+
+    def stop(self):
+        self._halt.set()
+
+    @property
+    def measured_fps(self) -> float:
+        """Capture rate over the last ~60 frames (falls back to the driver's value)."""
+        times = self._frame_times
+        if len(times) >= 2 and times[-1] > times[0]:
+            return (len(times) - 1) / (times[-1] - times[0])
+        return self._reported_fps
+
+    def _open(self) -> cv2.VideoCapture:
+        cap = self.open_capture()
+        self._reported_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        return cap
+
+    def _read_into_ring(self, cap: cv2.VideoCapture) -> bool:
+        slot = self.ring.slot_for_write()
+        if slot is None:
+            ret, frame = cap.read()
+            if not ret:
+                return False
+            if self.ring.frame_shape is None:
+                self.ring.allocate(frame.shape, frame.dtype)
+                slot = self.ring.slot_for_write()
+                np.copyto(slot, frame)
+                self.ring.commit(time.monotonic())
+            else:
+                self.ring.drop()
+            return True
+
+        ret, frame = cap.read(slot)
+        if not ret:
+            return False
+        if frame.ctypes.data != slot.ctypes.data:
+            # The driver returned its own buffer (e.g. the resolution changed).
+            if frame.shape != slot.shape:
+                self.ring.allocate(frame.shape, frame.dtype)
+                slot = self.ring.slot_for_write()
+                if slot is None:
+                    self.ring.drop()
+                    return True
+            np.copyto(slot, frame)
+        self.ring.commit(time.monotonic())
+        return True
+
+    def run(self):
+        cap = None
+        try:
+            cap = self._open()
+            consecutive_failures = 0
+            while not self.stop_event.is_set() and not self._halt.is_set():
+                if self._read_into_ring(cap):
+                    consecutive_failures = 0
+                    self._frame_times.append(time.monotonic())
+                    continue
+
+                consecutive_failures += 1
+                self.read_failures += 1
+                logging.warning(f"Frame grab failed ({consecutive_failures}/{self.max_frame_failures})")
+                if consecutive_failures >= self.max_frame_failures:
+                    logging.error("Exceeded max frame failures. Aborting.")
+                    self.failed = True
+                    break
+                cap.release()
+                try:
+                    cap = self._open()
+                    consecutive_failures = 0
+                except RuntimeError as e:
+                    logging.error(f"Failed to reopen camera: {e}. Retrying in 5s.")
+                    self.stop_event.wait(5)
+        except Exception as e:
+            logging.error(f"Frame grabber stopped: {e}", exc_info=True)
+            self.failed = True
+        finally:
+            if cap is not None and cap.isOpened():
+                cap.release()
+            self.ring.close()
+
+
+def segment_path(path: str, index: int) -> str:
+    """Path of a recording's `index`-th continuation segment (1-based), e.g. clip_part1.mp4 for clip.mp4."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_part{index}{ext}"
+
+
+class RecordingWriter(threading.Thread):
+    """Writes every captured frame that falls inside a recording, in capture order.
+
+    Recordings are delimited by sequence numbers: `start_recording(path, seq)`
+    includes frame `seq` onwards and `stop_recording(seq)` ends the file
+    before frame `seq`. Frames outside a recording are kept as JPEG-encoded
+    pre-roll (at most `pre_roll` seconds and `pre_roll_max_bytes`) and
+    written ahead of frame `seq` when the next recording starts.
+    `encoder` holds the settings for camera.encoders.parse_encoder_settings.
+    With `keyframes`, each recording's keyframes are selected and saved when
+    its file is closed, before `on_closed` runs.
+    If the encoder process dies mid-recording, the file it wrote is kept and
+    the rest of the recording goes to a new OpenCV segment next to it (see
+    segment_path); `on_closed` receives the segment paths.
+    """
+
+    def __init__(
+        self,
+        ring: FrameRingBuffer,
+        encoder: Optional[Dict] = None,
+        pre_roll: float = 0.0,
+        pre_roll_quality: int = 80,
+        pre_roll_max_bytes: int = 64 * 1024 * 1024,
+        keyframes: bool = True,
+        name: str = "RecordingWriter",
+    ):
+        super().__init__(daemon=True, name=name)
+        self.ring = ring
+        self.encoder_settings = parse_encoder_settings(encoder)
+        self.pre_roll = pre_roll
+        self.pre_roll_max_bytes = pre_roll_max_bytes
+        self._jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, int(pre_roll_quality)]
+        self._pre_roll_frames: Deque[Tuple[float, np.ndarray]] = deque()
+        self._pre_roll_bytes = 0
+        self._pre_roll_shape: Optional[Tuple[int, ...]] = None
+        self.frames_written = 0
+        self._commands: Deque[tuple] = deque()
+        self._commands_lock = threading.Lock()
+        self._next_seq = 0
+        self._writer: Optional[VideoEncoder] = None
+        self._encoder_name: Optional[str] = None
+        self._frame_size = (0, 0)
+        self._path: Optional[str] = None
+        self._fps = 0.0
+        self._on_closed: Optional[Callable[[str, int, List[str]], None]] = None
+        self._recording_frames = 0
+        self._segments: List[str] = []
+        self._keyframes = KeyframeSelector() if keyframes else None
+        self.keyframes_saved = 0
+
+    def start_recording(self, path: str, start_seq: int, fps: float):
+        with self._commands_lock:
+            self._commands.append(("start", start_seq, path, fps))
+
+    def stop_recording(self, end_seq: int, on_closed: Optional[Callable[[str, int, List[str]], None]] = None):
+        """End the current file before frame `end_seq`; `on_closed(path, frames, segments)` runs once it is closed.
+
+        `segments` lists the files the recording continued in after an encoder failure, in order.
+        """
+        with self._commands_lock:
+            self._commands.append(("stop", end_seq, on_closed))
+
+    def _apply_commands(self, upto_seq: int):
+        while True:
+            with self._commands_lock:
+                if not self._commands or self._commands[0][1] > upto_seq:
+                    return
+                command = self._commands.popleft()
+            if command[0] == "start":
+                self._close_file()
+                _, _, self._path, self._fps = command
+                self._recording_frames = 0
+                self._segments = []
+                if self._keyframes:
+                    self._keyframes.reset()
+                self._flush_pre_roll()
+            else:
+                self._on_closed = command[2]
+                self._close_file()
+
+    def _close_file(self):
+        path, on_closed, frames, segments = self._path, self._on_closed, self._recording_frames, self._segments
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception as e:
+                logging.error(f"Failed to finish {path}: {e}", exc_info=True)
+        self._writer = None
+        self._path = None
+        self._on_closed = None
+        self._segments = []
+        if path and frames and self._keyframes:
+            try:
+                manifest = self._keyframes.finish(path)
+                if manifest:
+                    self.keyframes_saved += len(manifest["keyframes"])
+            except Exception as e:
+                logging.error(f"Failed to save keyframes for {path}: {e}", exc_info=True)
+        if path and on_closed:
+            try:
+                on_closed(path, frames, segments)
+            except Exception as e:
+                logging.error(f"Recording close callback failed for {path}: {e}", exc_info=True)
+
+    def _remember(self, frame: np.ndarray, timestamp: float):
+        """Add a frame to the pre-roll, trimming it to the configured duration and size."""
+        if frame.shape != self._pre_roll_shape:
+            self._clear_pre_roll()
+            self._pre_roll_shape = frame.shape
+        ok, encoded = cv2.imencode(".jpg", frame, self._jpeg_params)
+        if not ok:
+            return
+        self._pre_roll_frames.append((timestamp, encoded))
+        self._pre_roll_bytes += encoded.nbytes
+        frames = self._pre_roll_frames
+        while frames and (timestamp - frames[0][0] > self.pre_roll or self._pre_roll_bytes > self.pre_roll_max_bytes):
+            self._pre_roll_bytes -= frames.popleft()[1].nbytes
+
+    def _clear_pre_roll(self):
+        self._pre_roll_frames.clear()
+        self._pre_roll_bytes = 0
+
+    def _flush_pre_roll(self):
+        for timestamp, encoded in self._pre_roll_frames:
+            frame = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+            if frame is not None:
+                self._write(frame, timestamp)
+        self._clear_pre_roll()
+
+    def _write(self, frame: np.ndarray, timestamp: float):
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._frame_size = (width, height)
+            self._writer = self._open_encoder(width, height)
+        elif frame.shape[1::-1] != self._frame_size:
+            # The camera was reopened at another resolution mid-recording.
+            frame = cv2.resize(frame, self._frame_size)
+        try:
+            self._writer.write(frame)
+        except OSError as e:
+            # The encoder process died. Closing it lets ffmpeg finish the frames it
+            # has; reopening the same path would truncate them, so the rest of the
+            # recording goes to a new segment, written with OpenCV.
+            segment = segment_path(self._path, len(self._segments) + 1)
+            logging.error(f"{self._writer.name} failed writing {self._path} ({e}); continuing in {segment} with OpenCV")
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+            self._segments.append(segment)
+            self._writer = self._open_encoder(*self._frame_size, fallback=True)
+            self._writer.write(frame)
+        self._recording_frames += 1
+        self.frames_written += 1
+        if self._keyframes:
+            self._keyframes.add(frame, timestamp)
+
+    def _open_encoder(self, width: int, height: int, fallback: bool = False) -> VideoEncoder:
+        """Open the encoder for the current file: the recording, or its latest segment."""
+        path = self._segments[-1] if self._segments else self._path
+        opencv_settings = dict(self.encoder_settings, backend="opencv", codec="mp4v")
+        encoder = create_encoder(opencv_settings if fallback else self.encoder_settings)
+        try:
+            encoder.open(path, self._fps, width, height)
+        except OSError as e:
+            logging.error(f"Could not start {encoder.name} ({e}); recording {path} with OpenCV")
+            encoder = create_encoder(opencv_settings)
+            encoder.open(path, self._fps, width, height)
+        self._encoder_name = encoder.name
+        logging.info(f"Writing {path} at {self._fps:.2f} FPS ({width}x{height}) with {encoder.name}")
+        return encoder
+
+    def run(self):
+        try:
+            while True:
+                item = self.ring.next_in_order(timeout=0.2)
+                if item is None:
+                    if self.ring.closed and self.ring.head <= self._next_seq:
+                        break
+                    self._apply_commands(self._next_seq)
+                    continue
+                seq, frame, timestamp = item
+                self._apply_commands(seq)
+                if self._path:
+                    self._write(frame, timestamp)
+                elif self.pre_roll > 0:
+                    self._remember(frame, timestamp)
+                self._next_seq = seq + 1
+                self.ring.release(seq)
+        except Exception as e:
+            logging.error(f"Recording writer stopped: {e}", exc_info=True)
+        finally:
+            self._apply_commands(float("inf"))
+            self._close_file()
+
+    def stats(self) -> Dict[str, object]:
+        frames = list(self._pre_roll_frames)
+        return {
+            "frames_written": self.frames_written,
+            "recording_path": self._path,
+            "encoder": self._encoder_name,
+            "keyframes_saved": self.keyframes_saved,
+            "pre_roll_frames": len(frames),
+            "pre_roll_seconds": round(frames[-1][0] - frames[0][0], 2) if len(frames) > 1 else 0.0,
+            "pre_roll_bytes": self._pre_roll_bytes,
+        }
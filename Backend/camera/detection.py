@@ -0,0 +1,223 @@
+"""
+Batched object detection on the shared YOLO model.
+
+Recording analysis used to run YOLO on the first frame only, written to disk
+and read back by path, so anything that entered the scene later was missed.
+Analysis now samples several frames per recording in memory and submits
+them to the process-wide `DetectionService`. Its single inference thread
+collects frames from every recording being analyzed into batches (up to
+`max_batch` frames, waiting at most `max_wait` seconds for a batch to fill)
+and runs each batch as one model call.
+
+`aggregate_detections` turns the per-frame results into what is stored on the
+MemoryNode: the detected classes, the most instances of each class seen in a
+single frame, and when each class first appeared.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from camera import workers as camera_workers
+
+DETECTION_MAX_BATCH = int(os.getenv("DETECTION_MAX_BATCH", "16"))
+DETECTION_MAX_WAIT = float(os.getenv("DETECTION_MAX_WAIT", "0.05"))
+DETECTION_CONFIDENCE = float(os.getenv("DETECTION_CONFIDENCE", "0.25"))
+# Frames sampled per recording: one every DETECTION_SAMPLE_INTERVAL seconds, at most DETECTION_SAMPLES.
+DETECTION_SAMPLES = int(os.getenv("DETECTION_SAMPLES", "8"))
+DETECTION_SAMPLE_INTERVAL = float(os.getenv("DETECTION_SAMPLE_INTERVAL", "1.0"))
+
+
+class DetectionService:
+    """Runs detection requests from many threads as batched calls on one model"""
+
+    def __init__(self, max_batch: int = DETECTION_MAX_BATCH, max_wait: float = DETECTION_MAX_WAIT,
+                 confidence: float = DETECTION_CONFIDENCE):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.confidence = confidence
+        self._pending: Deque[Tuple[np.ndarray, Future]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.frames = 0
+        self.failed_batches = 0
+        self.inference_seconds = 0.0
+
+    def detect(self, frames: List[np.ndarray], timeout: Optional[float] = None) -> Optional[List[List[Dict]]]:
+        """Detect objects in BGR frames.
+
+        Returns:
+            One list of detections per frame, each {"label", "confidence", "box": [x1, y1, x2, y2]};
+            None if no model is available
+
+        Raises:
+            RuntimeError: if inference fails.
+        """
+        if not frames:
+            return []
+        if camera_workers.get_yolo_model() is None:
+            return None
+        futures = [Future() for _ in frames]
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="DetectionService")
+                self._thread.start()
+            self._pending.extend(zip(frames, futures))
+            self._cond.notify()
+        return [future.result(timeout=timeout) for future in futures]
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "failed_batches": self.failed_batches,
+                "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "avg_inference_ms": round(1000 * self.inference_seconds / self.batches, 1) if self.batches else 0.0,
+                "queued_frames": len(self._pending),
+                "max_batch": self.max_batch,
+                "max_wait": self.max_wait,
+            }
+
+    def _next_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Give other recordings a moment to add frames before running a partial batch.
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.max_batch, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            try:
+                model = camera_workers.get_yolo_model()
+                with camera_workers.yolo_inference_lock:
+                    results = model([frame for frame, _ in batch], conf=self.confidence, verbose=False)
+                detections = [_parse_result(result) for result in results]
+            except Exception as exc:
+                logging.error(f"YOLO batch of {len(batch)} frames failed: {exc}")
+                with self._cond:
+                    self.failed_batches += 1
+                for _, future in batch:
+                    future.set_exception(RuntimeError(f"YOLO inference failed: {exc}"))
+                continue
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+                self.inference_seconds += time.monotonic() - started
+            for (_, future), frame_detections in zip(batch, detections):
+                future.set_result(frame_detections)
+
+
+def _parse_result(result) -> List[Dict]:
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    classes = boxes.cls.cpu().numpy()
+    confidences = boxes.conf.cpu().numpy()
+    coordinates = boxes.xyxy.cpu().numpy()
+    return [
+        {
+            "label": result.names[int(cls)],
+            "confidence": round(float(conf), 3),
+            "box": [round(float(value), 1) for value in box],
+        }
+        for cls, conf, box in zip(classes, confidences, coordinates)
+    ]
+
+
+def sample_frames(video_path: str, samples: int = DETECTION_SAMPLES,
+                  interval: float = DETECTION_SAMPLE_INTERVAL) -> List[Tuple[float, np.ndarray]]:
+    """Read up to `samples` frames spread over the video, one per `interval` seconds.
+
+    Frames are decoded in order (grab() skips the ones in between), which is
+    cheaper and more reliable than seeking in H.264 files.
+
+    Returns:
+        (seconds into the video, BGR frame) pairs; the first frame is always included
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if fps <= 0:
+            fps = 30.0
+        if total > 0:
+            count = max(1, min(samples, int(total / fps / interval) + 1))
+            targets = sorted(set(np.linspace(0, total - 1, count).round().astype(int).tolist()))
+        else:
+            step = max(1, round(fps * interval))
+            targets = [i * step for i in range(samples)]
+        sampled = []
+        index = 0
+        for target in targets:
+            while index < target:
+                if not cap.grab():
+                    return sampled
+                index += 1
+            ok, frame = cap.read()
+            if not ok:
+                break
+            index += 1
+            sampled.append((round(target / fps, 2), frame))
+        return sampled
+    finally:
+        cap.release()
+
+
+def aggregate_detections(times: List[float], detections: List[List[Dict]]) -> Dict[str, object]:
+    """Summarize per-frame detections for the MemoryNode metadata.
+
+    Returns:
+        objects_detected (sorted class names), object_counts (most instances of
+        each class in one frame), object_first_seen (seconds into the video) and
+        detections (per sampled frame: time and class counts)
+    """
+    counts: Dict[str, int] = {}
+    first_seen: Dict[str, float] = {}
+    per_frame = []
+    for seconds, frame_detections in zip(times, detections):
+        frame_counts: Dict[str, int] = {}
+        for detection in frame_detections:
+            frame_counts[detection["label"]] = frame_counts.get(detection["label"], 0) + 1
+        for label, count in frame_counts.items():
+            counts[label] = max(counts.get(label, 0), count)
+            first_seen.setdefault(label, seconds)
+        per_frame.append({"time": seconds, "objects": frame_counts})
+    return {
+        "objects_detected": sorted(counts),
+        "object_counts": counts,
+        "object_first_seen": first_seen,
+        "detections": per_frame,
+    }
+
+
+_detection_service: Optional[DetectionService] = None
+_detection_service_lock = threading.Lock()
+
+
+def get_detection_service() -> DetectionService:
+    """Get or create the process-wide detection service"""
+    global _detection_service
+    with _detection_service_lock:
+        if _detection_service is None:
+            _detection_service = DetectionService()
+        return _detection_service
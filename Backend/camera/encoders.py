@@ -0,0 +1,405 @@
+"""
+Video encoders for recordings.
+
+`RecordingWriter` hands every frame to a `VideoEncoder`:
+
+- ``FFmpegEncoder`` streams raw BGR frames to an ``ffmpeg`` subprocess over
+  stdin and encodes H.264/H.265 (libx264/libx265, or a hardware encoder via
+  `hwaccel`). Frames are written straight from the ring buffer slot through
+  the buffer protocol, so Python makes no copy; scaling happens in ffmpeg.
+- ``OpenCVEncoder`` wraps ``cv2.VideoWriter`` (``mp4v`` by default), the
+  original behaviour and the fallback when ffmpeg is not installed.
+
+Settings are a dict validated by `parse_encoder_settings`, configurable per
+camera. The ffmpeg binary is taken from $FFMPEG_BINARY, the PATH, or the
+optional ``imageio-ffmpeg`` package.
+
+Run ``python -m camera.encoders`` to benchmark file size and CPU time of the
+configurations on this machine.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+ENCODER_BACKENDS = ("auto", "ffmpeg", "opencv")
+CODECS = ("h264", "h265", "mp4v")
+HWACCELS = ("nvenc", "qsv", "videotoolbox")
+
+DEFAULT_ENCODER_SETTINGS = {
+    "backend": os.getenv("RECORDING_ENCODER", "auto"),
+    "codec": os.getenv("RECORDING_CODEC", "h264"),
+    "crf": int(os.getenv("RECORDING_CRF", "28")),
+    "bitrate": None,
+    # ultrafast keeps libx264 close to mp4v's CPU cost while still shrinking
+    # files severalfold (see the benchmark below).
+    "preset": os.getenv("RECORDING_PRESET", "ultrafast"),
+    "width": None,
+    "height": None,
+    "hwaccel": None,
+}
+
+_SOFTWARE_ENCODERS = {"h264": "libx264", "h265": "libx265"}
+_HARDWARE_ENCODERS = {
+    ("h264", "nvenc"): "h264_nvenc",
+    ("h265", "nvenc"): "hevc_nvenc",
+    ("h264", "qsv"): "h264_qsv",
+    ("h265", "qsv"): "hevc_qsv",
+    ("h264", "videotoolbox"): "h264_videotoolbox",
+    ("h265", "videotoolbox"): "hevc_videotoolbox",
+}
+# Hardware encoders have no CRF; these are their closest constant-quality
+# options. VideoToolbox has none and needs a bitrate.
+_HARDWARE_QUALITY_FLAGS = {"nvenc": "-cq", "qsv": "-global_quality"}
+HARDWARE_DEFAULT_BITRATE = "2M"
+_OPENCV_FOURCCS = {"mp4v": "mp4v", "h264": "avc1", "h265": "hev1"}
+
+_ffmpeg_path: Optional[str] = None
+_ffmpeg_searched = False
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Return the path of an ffmpeg binary, or None if none is available."""
+    global _ffmpeg_path, _ffmpeg_searched
+    if not _ffmpeg_searched:
+        _ffmpeg_path = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+        if not _ffmpeg_path:
+            try:
+                import imageio_ffmpeg
+                _ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
+            except (ImportError, ModuleNotFoundError, RuntimeError):
+                _ffmpeg_path = None
+        _ffmpeg_searched = True
+    return _ffmpeg_path
+
+
+def parse_encoder_settings(settings: Optional[Dict]) -> Dict[str, object]:
+    """Validate encoder settings and fill in defaults.
+
+    Keys: ``backend`` (auto/ffmpeg/opencv), ``codec`` (h264/h265/mp4v),
+    ``crf`` (0-51, ignored when ``bitrate`` is set), ``bitrate`` (e.g. "1M"),
+    ``preset`` (x264/x265 preset), ``width``/``height`` (output resolution;
+    one of them keeps the aspect ratio, neither keeps the capture size) and
+    ``hwaccel`` (nvenc/qsv/videotoolbox).
+
+    Raises:
+        ValueError: If a setting is invalid
+    """
+    parsed = dict(DEFAULT_ENCODER_SETTINGS)
+    if settings is None:
+        settings = {}
+    if not isinstance(settings, dict):
+        raise ValueError("Encoder settings must be an object")
+    unknown = set(settings) - set(parsed)
+    if unknown:
+        raise ValueError(f"Unknown encoder settings: {', '.join(sorted(unknown))}")
+    parsed.update({key: value for key, value in settings.items()})
+
+    if parsed["backend"] not in ENCODER_BACKENDS:
+        raise ValueError(f"backend must be one of: {', '.join(ENCODER_BACKENDS)}")
+    if parsed["codec"] not in CODECS:
+        raise ValueError(f"codec must be one of: {', '.join(CODECS)}")
+    if parsed["backend"] == "ffmpeg" and parsed["codec"] == "mp4v":
+        raise ValueError("The ffmpeg backend encodes h264 or h265")
+    if parsed["crf"] is not None:
+        parsed["crf"] = int(parsed["crf"])
+        if not 0 <= parsed["crf"] <= 51:
+            raise ValueError("crf must be between 0 and 51")
+    if parsed["bitrate"] is not None:
+        parsed["bitrate"] = str(parsed["bitrate"])
+    for key in ("width", "height"):
+        if parsed[key] is not None:
+            parsed[key] = int(parsed[key])
+            if parsed[key] < 16:
+                raise ValueError(f"{key} must be at least 16 pixels")
+    if parsed["hwaccel"] is not None and parsed["hwaccel"] not in HWACCELS:
+        raise ValueError(f"hwaccel must be one of: {', '.join(HWACCELS)}")
+    return parsed
+
+
+def output_size(settings: Dict[str, object], width: int, height: int) -> tuple:
+    """Output resolution for a `width` x `height` input (even sizes, as H.264/H.265 require)."""
+    out_w, out_h = settings.get("width"), settings.get("height")
+    if out_w and not out_h:
+        out_h = height * out_w / width
+    elif out_h and not out_w:
+        out_w = width * out_h / height
+    elif not out_w:
+        out_w, out_h = width, height
+    return int(out_w) // 2 * 2, int(out_h) // 2 * 2
+
+
+class VideoEncoder:
+    """Writes BGR frames of one recording to a file"""
+
+    name = "base"
+
+    def __init__(self, settings: Dict[str, object]):
+        self.settings = settings
+        self.path: Optional[str] = None
+        self.frames = 0
+
+    def open(self, path: str, fps: float, width: int, height: int):
+        raise NotImplementedError
+
+    def write(self, frame: np.ndarray):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class OpenCVEncoder(VideoEncoder):
+    """cv2.VideoWriter; resizes in Python when a different output size is configured"""
+
+    name = "opencv"
+
+    def __init__(self, settings: Dict[str, object]):
+        super().__init__(settings)
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._resized: Optional[np.ndarray] = None
+        self._size = (0, 0)
+
+    def open(self, path: str, fps: float, width: int, height: int):
+        self.path = path
+        self._size = output_size(self.settings, width, height)
+        fourcc = _OPENCV_FOURCCS[self.settings.get("codec", "mp4v")]
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, self._size)
+        if not self._writer.isOpened() and fourcc != "mp4v":
+            logging.warning(f"OpenCV cannot encode {fourcc} here; falling back to mp4v for {path}")
+            fourcc = "mp4v"
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, self._size)
+        self.name = f"opencv/{fourcc}"
+        if self._size != (width, height):
+            self._resized = np.empty((self._size[1], self._size[0], 3), dtype=np.uint8)
+
+    def write(self, frame: np.ndarray):
+        if self._resized is not None:
+            cv2.resize(frame, self._size, dst=self._resized, interpolation=cv2.INTER_AREA)
+            frame = self._resized
+        self._writer.write(frame)
+        self.frames += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        self._writer = None
+
+
+class FFmpegEncoder(VideoEncoder):
+    """Streams raw frames over stdin to an ffmpeg H.264/H.265 encoder"""
+
+    def __init__(self, settings: Dict[str, object], ffmpeg: str):
+        super().__init__(settings)
+        self.ffmpeg = ffmpeg
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr = None
+        self._frame_shape = None
+        codec, hwaccel = settings["codec"], settings.get("hwaccel")
+        self.codec_name = _HARDWARE_ENCODERS[(codec, hwaccel)] if hwaccel else _SOFTWARE_ENCODERS[codec]
+        self.name = f"ffmpeg/{self.codec_name}"
+
+    def command(self, path: str, fps: float, width: int, height: int) -> List[str]:
+        settings = self.settings
+        out_w, out_h = output_size(settings, width, height)
+        command = [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps:.3f}",
+            "-i", "-",
+        ]
+        if (out_w, out_h) != (width, height):
+            command += ["-vf", f"scale={out_w}:{out_h}"]
+        command += ["-c:v", self.codec_name, "-pix_fmt", "yuv420p"]
+        hwaccel = settings.get("hwaccel")
+        if settings.get("bitrate"):
+            command += ["-b:v", settings["bitrate"]]
+        elif hwaccel in _HARDWARE_QUALITY_FLAGS and settings.get("crf") is not None:
+            command += [_HARDWARE_QUALITY_FLAGS[hwaccel], str(settings["crf"])]
+        elif hwaccel:
+            command += ["-b:v", HARDWARE_DEFAULT_BITRATE]
+        elif settings.get("crf") is not None:
+            command += ["-crf", str(settings["crf"])]
+        if settings.get("preset") and not hwaccel:
+            command += ["-preset", settings["preset"]]
+        if self.codec_name == "libx265":
+            command += ["-tag:v", "hvc1", "-x265-params", "log-level=error"]
+        command += ["-movflags", "+faststart", path]
+        return command
+
+    def open(self, path: str, fps: float, width: int, height: int):
+        self.path = path
+        self._frame_shape = (height, width, 3)
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            self.command(path, fps, width, height),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self._stderr,
+        )
+
+    def write(self, frame: np.ndarray):
+        if frame.shape != self._frame_shape:
+            raise ValueError(f"Frame size changed mid-recording: {frame.shape} != {self._frame_shape}")
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        self._process.stdin.write(memoryview(frame))
+        self.frames += 1
+
+    def close(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            returncode = self._process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            returncode = self._process.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode(errors="replace").strip()[-1000:]
+            logging.error(f"ffmpeg exited with {returncode} writing {self.path}: {error}")
+        self._stderr.close()
+        self._process = None
+
+
+def create_encoder(settings: Optional[Dict] = None) -> VideoEncoder:
+    """Create the encoder for parsed `settings` (ffmpeg when available for "auto")."""
+    settings = settings or parse_encoder_settings(None)
+    backend = settings["backend"]
+    if backend in ("auto", "ffmpeg") and settings["codec"] != "mp4v":
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            return FFmpegEncoder(settings, ffmpeg)
+        if backend == "ffmpeg":
+            logging.warning("ffmpeg not found; recording with OpenCV instead")
+    if backend == "auto":
+        # Without ffmpeg keep the long-standing OpenCV default rather than
+        # depending on OpenCV's optional H.264 support.
+        settings = dict(settings, codec="mp4v")
+    return OpenCVEncoder(settings)
+
+
+def _synthetic_frames(count: int, width: int, height: int) -> List[np.ndarray]:
+    """A static gradient scene with a moving object and mild sensor noise."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    background = np.dstack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height)) + 64])
+    background = background.astype(np.int16)
+    frames = []
+    for i in range(count):
+        frame = background + rng.normal(0, 3, background.shape).astype(np.int16)
+        left = (i * 7) % max(1, width - width // 5)
+        frame[height // 3:height // 3 + height // 4, left:left + width // 5] = (40, 40, 200)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def _load_frames(path: str, count: int) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+BENCHMARK_CONFIGS = (
+    {"backend": "opencv", "codec": "mp4v"},
+    {"backend": "ffmpeg", "codec": "h264", "crf": 23},
+    {"backend": "ffmpeg", "codec": "h264", "crf": 28},
+    {"backend": "ffmpeg", "codec": "h264", "crf": 28, "preset": "ultrafast"},
+    {"backend": "ffmpeg", "codec": "h264", "crf": 28, "width": 640},
+    {"backend": "ffmpeg", "codec": "h264", "bitrate": "1M"},
+    {"backend": "ffmpeg", "codec": "h265", "crf": 28},
+)
+
+
+def benchmark(frames: List[np.ndarray], fps: float = 30.0, configs=BENCHMARK_CONFIGS) -> List[Dict[str, object]]:
+    """Encode `frames` with each configuration and measure size and CPU time.
+
+    CPU time includes the encoder subprocess, so ffmpeg and OpenCV compare fairly.
+    """
+    import resource
+    height, width = frames[0].shape[:2]
+    duration = len(frames) / fps
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, config in enumerate(configs):
+            settings = parse_encoder_settings(config)
+            encoder = create_encoder(settings)
+            if settings["backend"] == "ffmpeg" and not isinstance(encoder, FFmpegEncoder):
+                continue
+            path = os.path.join(tmp, f"bench_{index}.mp4")
+            children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_before = time.process_time()
+            started = time.perf_counter()
+            encoder.open(path, fps, width, height)
+            for frame in frames:
+                encoder.write(frame)
+            encoder.close()
+            wall = time.perf_counter() - started
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = (time.process_time() - cpu_before
+                   + (children_after.ru_utime - children_before.ru_utime)
+                   + (children_after.ru_stime - children_before.ru_stime))
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            label = ", ".join(f"{k}={v}" for k, v in config.items() if k != "backend")
+            results.append({
+                "encoder": encoder.name,
+                "settings": label,
+                "bytes": size,
+                "kbit_per_s": round(size * 8 / 1000 / duration, 1),
+                "encode_fps": round(len(frames) / wall, 1),
+                "cpu_seconds": round(cpu, 2),
+                "cpu_per_frame_ms": round(cpu * 1000 / len(frames), 2),
+            })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark recording encoders (size vs. CPU).")
+    parser.add_argument("--input", help="Video to re-encode (default: a synthetic scene).")
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames to encode.")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width.")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height.")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate the output is tagged with.")
+    args = parser.parse_args(argv)
+
+    frames = _load_frames(args.input, args.frames) if args.input else _synthetic_frames(args.frames, args.width, args.height)
+    if not frames:
+        logging.error("No frames to encode")
+        return 1
+    if not find_ffmpeg():
+        logging.warning("ffmpeg not found; only the OpenCV encoder is benchmarked")
+
+    results = benchmark(frames, args.fps)
+    baseline = results[0]["bytes"] or 1
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}, {args.fps:g} FPS")
+    print(f"{'encoder':<20} {'settings':<40} {'size KB':>9} {'ratio':>6} {'kbit/s':>8} {'enc FPS':>8} {'CPU ms/f':>9}")
+    for r in results:
+        print(f"{r['encoder']:<20} {r['settings']:<40} {r['bytes'] / 1024:>9.0f} {baseline / max(r['bytes'], 1):>5.1f}x "
+              f"{r['kbit_per_s']:>8.0f} {r['encode_fps']:>8.1f} {r['cpu_per_frame_ms']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
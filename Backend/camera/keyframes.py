@@ -0,0 +1,257 @@
+"""
+Keyframe selection for keyframe-based recording summaries.
+
+Uploading a whole recording to Gemini means an upload plus server-side video
+processing before the summary can even start. For most motion clips a handful
+of stills says as much, so the `RecordingWriter` feeds every recorded frame to
+a `KeyframeSelector`, which samples a few frames per second and keeps:
+
+- the first frame of the recording
+- scene changes: frames that differ strongly from the last kept keyframe
+- motion peaks: the frame with the most frame-to-frame change since the last
+  keyframe, when that change is significant
+
+The chosen frames are saved as JPEGs next to the recording
+(``recordings/keyframes/<stem>_NN.jpg``) with a ``<stem>.json`` manifest, so
+the analysis job (including one re-queued after a restart) can find them.
+
+`choose_summary_mode` decides per recording whether the keyframes are enough
+or the full video should be uploaded (long clips, or clips where the selection
+is ambiguous), and `record_summary_latency` keeps per-mode latency figures for
+the status endpoint.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+SUMMARY_MODES = ("auto", "keyframes", "video")
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "auto")
+# At most this many keyframes per recording are kept (and sent to Gemini).
+KEYFRAME_MAX = int(os.getenv("KEYFRAME_MAX", "8"))
+# Seconds between frames the selector looks at.
+KEYFRAME_SAMPLE_INTERVAL = float(os.getenv("KEYFRAME_SAMPLE_INTERVAL", "0.5"))
+# Mean absolute difference (0-255) on a small grayscale thumbnail that counts as a scene change.
+KEYFRAME_SCENE_THRESHOLD = float(os.getenv("KEYFRAME_SCENE_THRESHOLD", "20"))
+# Frame-to-frame difference a motion peak needs to be kept.
+KEYFRAME_MOTION_THRESHOLD = float(os.getenv("KEYFRAME_MOTION_THRESHOLD", "6"))
+# In "auto" mode, recordings longer than this are summarized from the full video.
+KEYFRAME_MAX_CLIP_SECONDS = float(os.getenv("KEYFRAME_MAX_CLIP_SECONDS", "60"))
+# Deadline (seconds after analysis) for a keyframe summary deferred until transcription finishes;
+# it then runs without the transcript.
+KEYFRAME_TRANSCRIPT_WAIT = float(os.getenv("KEYFRAME_TRANSCRIPT_WAIT", "60"))
+KEYFRAME_WIDTH = int(os.getenv("KEYFRAME_WIDTH", "640"))
+KEYFRAME_JPEG_QUALITY = int(os.getenv("KEYFRAME_JPEG_QUALITY", "80"))
+
+_THUMB_SIZE = (64, 36)
+
+
+def keyframe_dir(video_path: str) -> Path:
+    return Path(video_path).parent / "keyframes"
+
+
+def manifest_path(video_path: str) -> Path:
+    return keyframe_dir(video_path) / f"{Path(video_path).stem}.json"
+
+
+class KeyframeSelector:
+    """Picks scene-change and motion-peak keyframes from the frames of one recording"""
+
+    def __init__(self, max_keyframes: int = KEYFRAME_MAX, sample_interval: float = KEYFRAME_SAMPLE_INTERVAL,
+                 scene_threshold: float = KEYFRAME_SCENE_THRESHOLD,
+                 motion_threshold: float = KEYFRAME_MOTION_THRESHOLD, width: int = KEYFRAME_WIDTH):
+        self.max_keyframes = max(1, max_keyframes)
+        self.sample_interval = sample_interval
+        self.scene_threshold = scene_threshold
+        self.motion_threshold = motion_threshold
+        self.width = width
+        self._jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, KEYFRAME_JPEG_QUALITY]
+        self.reset()
+
+    def reset(self):
+        """Forget the previous recording."""
+        self._keyframes: List[dict] = []
+        self._peak: Optional[dict] = None
+        self._last_key_thumb: Optional[np.ndarray] = None
+        self._prev_thumb: Optional[np.ndarray] = None
+        self._start: Optional[float] = None
+        self._last_sample = float("-inf")
+        self._last_time = 0.0
+        self.frames = 0
+        self.dropped = 0
+
+    def add(self, frame: np.ndarray, timestamp: float):
+        """Look at one recorded frame (only every `sample_interval` seconds is examined)."""
+        self.frames += 1
+        if self._start is None:
+            self._start = timestamp
+        self._last_time = timestamp
+        if timestamp - self._last_sample < self.sample_interval:
+            return
+        self._last_sample = timestamp
+
+        thumb = cv2.cvtColor(cv2.resize(frame, _THUMB_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        thumb = thumb.astype(np.int16)
+        offset = timestamp - self._start
+        if self._last_key_thumb is None:
+            self._keep(frame, thumb, offset, "first", 0.0)
+            self._prev_thumb = thumb
+            return
+
+        motion = float(np.mean(np.abs(thumb - self._prev_thumb)))
+        scene = float(np.mean(np.abs(thumb - self._last_key_thumb)))
+        self._prev_thumb = thumb
+        if scene >= self.scene_threshold:
+            self._commit_peak()
+            self._keep(frame, thumb, offset, "scene_change", scene)
+        elif motion >= self.motion_threshold and (self._peak is None or motion > self._peak["score"]):
+            self._peak = {"frame": self._encode(frame), "thumb": thumb, "time": offset, "score": motion}
+
+    def finish(self, video_path: str) -> Optional[dict]:
+        """Write the keyframes of the finished recording and its manifest.
+
+        Returns:
+            The manifest (see `load_keyframes`), or None if nothing was recorded
+        """
+        self._commit_peak()
+        if not self._keyframes:
+            return None
+        directory = keyframe_dir(video_path)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = Path(video_path).stem
+        entries = []
+        for index, keyframe in enumerate(sorted(self._keyframes, key=lambda k: k["time"])):
+            path = directory / f"{stem}_{index:02d}.jpg"
+            path.write_bytes(keyframe["frame"].tobytes())
+            entries.append({
+                "path": str(path),
+                "time": round(keyframe["time"], 2),
+                "reason": keyframe["reason"],
+                "score": round(keyframe["score"], 2),
+            })
+        manifest = {
+            "video_path": video_path,
+            "duration": round(self._last_time - self._start, 2),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "keyframes": entries,
+        }
+        manifest_path(video_path).write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+    def _commit_peak(self):
+        if self._peak is not None:
+            peak, self._peak = self._peak, None
+            self._keyframes.append(dict(peak, reason="motion_peak"))
+            self._last_key_thumb = peak["thumb"]
+            self._trim()
+
+    def _keep(self, frame: np.ndarray, thumb: np.ndarray, offset: float, reason: str, score: float):
+        self._keyframes.append({"frame": self._encode(frame), "thumb": thumb, "time": offset,
+                                "reason": reason, "score": score})
+        self._last_key_thumb = thumb
+        self._peak = None
+        self._trim()
+
+    def _trim(self):
+        # Over budget: drop the weakest keyframe, never the first one.
+        while len(self._keyframes) > self.max_keyframes:
+            weakest = min(range(1, len(self._keyframes)), key=lambda i: self._keyframes[i]["score"])
+            del self._keyframes[weakest]
+            self.dropped += 1
+
+    def _encode(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if width > self.width:
+            frame = cv2.resize(frame, (self.width, round(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", frame, self._jpeg_params)
+        if not ok:
+            raise RuntimeError("JPEG encoding of keyframe failed")
+        return encoded
+
+
+def load_keyframes(video_path: str) -> Optional[dict]:
+    """Return the keyframe manifest of a recording, or None if it has none (or files are missing).
+
+    The manifest holds "duration" (seconds), "frames", "dropped" (keyframes
+    discarded over the KEYFRAME_MAX budget) and "keyframes", a list of
+    {"path", "time", "reason", "score"} in time order.
+    """
+    path = manifest_path(video_path)
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        logging.warning(f"Unreadable keyframe manifest {path}: {e}")
+        return None
+    if not all(os.path.exists(keyframe["path"]) for keyframe in manifest.get("keyframes", [])):
+        return None
+    return manifest
+
+
+def choose_summary_mode(mode: str, manifest: Optional[dict]) -> Tuple[str, str]:
+    """Decide how to summarize a recording.
+
+    Args:
+        mode: "keyframes", "video" or "auto"
+        manifest: The recording's keyframe manifest (see load_keyframes)
+
+    Returns:
+        ("keyframes" or "video", reason)
+    """
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summary mode '{mode}'")
+    if mode == "video":
+        return "video", "configured"
+    if not manifest or not manifest.get("keyframes"):
+        return "video", "no keyframes"
+    if mode == "keyframes":
+        return "keyframes", "configured"
+    if manifest.get("duration", 0) > KEYFRAME_MAX_CLIP_SECONDS:
+        return "video", f"clip longer than {KEYFRAME_MAX_CLIP_SECONDS:.0f}s"
+    # More changes than the keyframe budget holds: stills would miss part of the action.
+    if manifest.get("dropped", 0) > 0:
+        return "video", "more scene changes than keyframes"
+    return "keyframes", "short clip"
+
+
+_latency: Dict[str, dict] = {}
+_latency_lock = threading.Lock()
+
+
+def record_summary_latency(mode: str, seconds: float, ok: bool):
+    """Count one summary attempt in `mode` and how long it took."""
+    with _latency_lock:
+        entry = _latency.setdefault(mode, {"count": 0, "failures": 0, "total_seconds": 0.0,
+                                           "max_seconds": 0.0, "last_seconds": None})
+        entry["count"] += 1
+        if not ok:
+            entry["failures"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["last_seconds"] = round(seconds, 2)
+
+
+def summary_stats() -> Dict[str, object]:
+    """Configured mode and per-mode summary latency in this process."""
+    with _latency_lock:
+        modes = {
+            mode: {
+                "count": entry["count"],
+                "failures": entry["failures"],
+                "avg_seconds": round(entry["total_seconds"] / entry["count"], 2),
+                "max_seconds": round(entry["max_seconds"], 2),
+                "last_seconds": entry["last_seconds"],
+            }
+            for mode, entry in _latency.items()
+        }
+    return {"mode": SUMMARY_MODE, "modes": modes}
@@ -0,0 +1,173 @@
+"""
+Per-recording aggregate shared by the processing stages of one recording.
+
+Video analysis and transcription finish independently and in any order.
+Instead of each stage looking up (or polling for) the MemoryNode and writing
+its own version of the metadata, both report into the recording's
+`RecordingAggregate`, which:
+
+- creates the node exactly once (the camera loop does it when the recording
+  stops; a stage that reports earlier, like streaming transcription, or runs
+  after a restart finds it in the database or creates the placeholder
+  itself, and the camera loop's metadata is then merged into it)
+- merges each stage's fields with one atomic json_set update
+- decides the title: a transcript-based title wins over a summary-based one,
+  and a title that would be discarded is never generated
+
+Aggregates live in a small in-memory registry keyed by video path; the
+database is the fallback when a recording is not in memory.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from db.database import create_memory_node, get_memory_node_by_file_path, get_memory_node_fields, update_memory_node_fields
+
+PLACEHOLDER_SUMMARY = "Loading Summary..."
+PLACEHOLDER_DESCRIPTION = "Motion detected - processing..."
+# Higher wins; an existing title of unknown origin ranks like a summary title.
+TITLE_PRIORITY = {"summary": 1, "existing": 1, "transcript": 2}
+MAX_TRACKED_RECORDINGS = 256
+
+
+def placeholder_metadata(video_path: str, audio_path: Optional[str] = None) -> Dict[str, object]:
+    """Metadata of a recording whose stages have not reported yet."""
+    return {
+        "video_path": video_path,
+        "audio_path": audio_path,
+        "transcript_path": None,
+        "summary": PLACEHOLDER_SUMMARY,
+        "transcript": None,
+        "title": None,
+        "objects_detected": [],
+        "description": PLACEHOLDER_DESCRIPTION,
+    }
+
+
+def _is_unset(value) -> bool:
+    """Whether a metadata value is empty or still the placeholder (no stage has written it)."""
+    return value in (None, "", [], PLACEHOLDER_SUMMARY, PLACEHOLDER_DESCRIPTION)
+
+
+class RecordingAggregate:
+    """Merges the results of every processing stage into one recording's MemoryNode"""
+
+    def __init__(self, video_path: str):
+        self.video_path = video_path
+        self.node_id: Optional[int] = None
+        self.title_source: Optional[str] = None
+        self.stages: Dict[str, str] = {}
+        self.stage_fields: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def create_node(self, metadata: Dict[str, object], timestamp: Optional[str] = None) -> int:
+        """Create the recording's MemoryNode (called once, when the recording stops).
+
+        If the node already exists (a stage created it, possibly in an earlier
+        run), only the fields no stage has written are merged into it, so
+        stage results already in the database are never overwritten.
+        """
+        with self.lock:
+            node = None
+            if self.node_id is None:
+                node = get_memory_node_by_file_path(self.video_path)
+                if node is None:
+                    self.node_id = create_memory_node(
+                        file_path=self.video_path,
+                        file_type="recording",
+                        timestamp=timestamp or datetime.utcnow().isoformat(),
+                        metadata=json.dumps(metadata),
+                    )
+                    self.title_source = "existing" if metadata.get("title") else None
+                    return self.node_id
+            node_id = self._resolve_node(metadata.get("audio_path"))
+            if node is None:
+                node = get_memory_node_by_file_path(self.video_path)
+            try:
+                current = json.loads(node["metadata"] or "{}") if node else {}
+            except (TypeError, ValueError):
+                current = {}
+            if not isinstance(current, dict):
+                current = {}
+            fields = {key: value for key, value in metadata.items()
+                      if key not in self.stage_fields and _is_unset(current.get(key))}
+            if fields:
+                update_memory_node_fields(node_id, **fields)
+            return node_id
+
+    def wants_title(self, source: str) -> bool:
+        """Whether a title generated from `source` would be kept (avoids generating discarded titles)."""
+        with self.lock:
+            self._resolve_node(None)
+            return TITLE_PRIORITY[source] > TITLE_PRIORITY.get(self.title_source, 0)
+
+    def merge(self, stage: str, fields: Dict[str, object], title: Optional[str] = None,
+              title_source: Optional[str] = None, audio_path: Optional[str] = None) -> Optional[int]:
+        """Write one stage's results to the node in a single update.
+
+        Args:
+            stage: Stage name recorded in `stages` (e.g. "analysis", "transcription")
+            fields: Metadata fields to set
+            title: Optional title, kept only if `title_source` outranks the current title
+            title_source: "summary" or "transcript"
+            audio_path: Used for the placeholder if the node has to be created here
+
+        Returns:
+            The node id, or None if the update failed
+        """
+        fields = dict(fields)
+        with self.lock:
+            node_id = self._resolve_node(audio_path)
+            if title and TITLE_PRIORITY[title_source] > TITLE_PRIORITY.get(self.title_source, 0):
+                fields["title"] = title
+                self.title_source = title_source
+            if not update_memory_node_fields(node_id, **fields):
+                logging.error(f"✗ Failed to merge {stage} results into MemoryNode {node_id}")
+                return None
+            self.stages[stage] = datetime.utcnow().isoformat()
+            self.stage_fields.update(fields)
+        logging.info(f"✓ Merged {stage} results into MemoryNode {node_id} ({', '.join(fields)})")
+        return node_id
+
+    def _resolve_node(self, audio_path: Optional[str]) -> int:
+        """Return the node id, from memory, the database, or by creating the placeholder."""
+        if self.node_id is not None:
+            return self.node_id
+        node = get_memory_node_by_file_path(self.video_path)
+        if node:
+            self.node_id = node["id"]
+            existing = get_memory_node_fields(self.node_id, "title") or {}
+            self.title_source = "existing" if existing.get("title") else None
+        else:
+            self.node_id = create_memory_node(
+                file_path=self.video_path,
+                file_type="recording",
+                timestamp=datetime.utcnow().isoformat(),
+                metadata=json.dumps(placeholder_metadata(self.video_path, audio_path)),
+            )
+            logging.info(f"Created MemoryNode {self.node_id} for {self.video_path} (no node was recorded)")
+        return self.node_id
+
+
+_recordings: "OrderedDict[str, RecordingAggregate]" = OrderedDict()
+_recordings_lock = threading.Lock()
+
+
+def get_recording(video_path: str) -> RecordingAggregate:
+    """Return the aggregate for `video_path`, creating it if needed (least recently used are dropped)."""
+    with _recordings_lock:
+        recording = _recordings.get(video_path)
+        if recording is None:
+            recording = RecordingAggregate(video_path)
+            _recordings[video_path] = recording
+            while len(_recordings) > MAX_TRACKED_RECORDINGS:
+                _recordings.popitem(last=False)
+        else:
+            _recordings.move_to_end(video_path)
+        return recording
@@ -0,0 +1,122 @@
+"""
+Streaming transcription of a recording's audio while it is being recorded.
+
+In batch mode the whole WAV is transcribed in one request after motion stops,
+so the transcript arrives long after the event. In streaming mode the
+SpeechRecorder hands out silence-delimited chunks (audio.AudioChunker) while
+recording continues; a `StreamingTranscription` transcribes them
+concurrently on a shared thread pool, stitches the results in chunk order and
+writes the growing transcript to the recording's MemoryNode (flagged
+``transcript_partial`` so the pipeline does not count it as finished). When
+the final chunk is done, `on_complete` stores the full transcript, so the
+transcript is ready roughly one chunk after the recording stops.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from camera.recording import get_recording
+
+TRANSCRIPTION_MODES = ("streaming", "batch")
+TRANSCRIPTION_MODE = os.getenv("TRANSCRIPTION_MODE", "streaming")
+TRANSCRIPTION_CHUNK_WORKERS = int(os.getenv("TRANSCRIPTION_CHUNK_WORKERS", "3"))
+
+_executor = ThreadPoolExecutor(max_workers=max(1, TRANSCRIPTION_CHUNK_WORKERS), thread_name_prefix="ChunkTranscriber")
+
+
+class StreamingTranscription:
+    """Transcribes one recording's audio chunks concurrently and stitches them in order"""
+
+    def __init__(
+        self,
+        video_path: str,
+        audio_path: str,
+        transcribe_chunk: Callable,
+        on_complete: Callable[["StreamingTranscription", str, List[str]], None],
+    ):
+        """
+        Args:
+            transcribe_chunk: Called with the chunk samples, returns its text
+            on_complete: Called as on_complete(self, transcript, errors) once the final chunk is done;
+                         `errors` lists chunks that could not be transcribed
+        """
+        self.video_path = video_path
+        self.audio_path = audio_path
+        self.transcribe_chunk = transcribe_chunk
+        self.on_complete = on_complete
+        self.started = time.monotonic()
+        self.recording_stopped: Optional[float] = None
+        self._texts: Dict[int, str] = {}
+        self._errors: Dict[int, str] = {}
+        self._final_index: Optional[int] = None
+        self._published = 0
+        self._completed = False
+        self._lock = threading.Lock()
+
+    def submit(self, index: int, start: float, samples, final: bool):
+        """SpeechRecorder `on_chunk` callback: queue a chunk for transcription."""
+        with self._lock:
+            if final:
+                self._final_index = index
+                self.recording_stopped = time.monotonic()
+        _executor.submit(self._transcribe, index, start, samples)
+
+    def _transcribe(self, index: int, start: float, samples):
+        try:
+            text = self.transcribe_chunk(samples) if len(samples) else ""
+            error = None
+        except Exception as e:
+            text, error = "", f"chunk {index} at {start:.1f}s: {type(e).__name__}: {e}"
+            logging.warning(f"Transcription of {self.audio_path} {error}")
+        with self._lock:
+            self._texts[index] = text
+            if error:
+                self._errors[index] = error
+            self._publish()
+            done = (self._final_index is not None and len(self._texts) == self._final_index + 1
+                    and not self._completed)
+            if done:
+                self._completed = True
+        if done:
+            self._complete()
+
+    def _stitched(self, upto: int) -> str:
+        return " ".join(self._texts[i] for i in range(upto) if self._texts[i])
+
+    def _publish(self):
+        """Write the transcript of the chunks finished in order so far (lock held)."""
+        ready = self._published
+        while ready in self._texts:
+            ready += 1
+        if ready == self._published:
+            return
+        previous = self._stitched(self._published)
+        self._published = ready
+        transcript = self._stitched(ready)
+        if (self._final_index is not None and ready == self._final_index + 1) or transcript == previous:
+            return  # the final transcript is stored by on_complete
+        try:
+            get_recording(self.video_path).merge(
+                "transcription_partial",
+                {"transcript": transcript, "transcript_partial": True, "audio_path": self.audio_path},
+                audio_path=self.audio_path,
+            )
+        except Exception as e:
+            logging.warning(f"Failed to store partial transcript for {self.video_path}: {e}")
+
+    def _complete(self):
+        transcript = self._stitched(self._final_index + 1)
+        errors = [self._errors[i] for i in sorted(self._errors)]
+        latency = time.monotonic() - (self.recording_stopped or self.started)
+        logging.info(f"Streaming transcription of {self.audio_path} finished {latency:.1f}s after recording stopped "
+                     f"({self._final_index + 1} chunks, {len(errors)} failed)")
+        try:
+            self.on_complete(self, transcript, errors)
+        except Exception as e:
+            logging.error(f"Failed to finish streaming transcription of {self.audio_path}: {e}", exc_info=True)
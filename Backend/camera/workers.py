@@ -0,0 +1,43 @@
+"""
+Resources shared by every camera loop in the process.
+
+Each camera used to load its own YOLO model. All cameras now share one
+lazily loaded model, so memory stays flat as cameras are added; recording
+analysis runs it through the batching service in camera.detection. Recording
+analysis and transcription run on the persistent job queue (jobs.queue).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Dict
+
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL", "yolov8n.pt")
+
+_yolo_model = None
+_yolo_loaded = False
+_yolo_load_lock = threading.Lock()
+# Ultralytics models are not safe to call from several threads at once.
+yolo_inference_lock = threading.Lock()
+
+
+def get_yolo_model():
+    """Return the shared YOLO model, loading it on first use (None if unavailable)."""
+    global _yolo_model, _yolo_loaded
+    with _yolo_load_lock:
+        if not _yolo_loaded:
+            try:
+                from ultralytics import YOLO
+                _yolo_model = YOLO(YOLO_MODEL_PATH)
+                logging.info("YOLOv8 model loaded successfully.")
+            except (ImportError, ModuleNotFoundError, Exception) as exc:
+                logging.warning("YOLO model unavailable: %s", exc)
+                _yolo_model = None
+            _yolo_loaded = True
+        return _yolo_model
+
+
+def stats() -> Dict[str, bool]:
+    return {"yolo_loaded": _yolo_model is not None}
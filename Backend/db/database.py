@@ -1,45 +1,323 @@
 import sqlite3
 import logging
 import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "data", "app.db")
 SCHEMA_PATH = os.path.join(BASE_DIR, "db", "schema.sql")
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "db", "migrations")
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Applied to every connection. WAL lets readers run concurrently with the
+# single writer; NORMAL sync is durable across app crashes in WAL mode.
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+    ("cache_size", -16000),
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+    ("foreign_keys", "ON"),
+)
+
+
+# Columns returned to API callers. The typed metadata columns (title, summary,
+# ...) are derived from `metadata` and are read explicitly where needed.
+NODE_COLUMNS = "id, file_path, file_type, timestamp, metadata, created_at"
+
+# Metadata fields promoted to generated columns by migration 0002.
+MEMORY_NODE_FIELDS = (
+    "title",
+    "summary",
+    "transcript",
+    "description",
+    "objects_detected",
+    "video_path",
+    "audio_path",
+    "transcript_path",
+    "thumbnail_path",
+)
+
+_FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# BM25 column weights for memory_nodes_fts, in column order:
+# title, summary, transcript, description, objects_detected
+FTS_COLUMN_WEIGHTS = (4.0, 2.0, 1.5, 0.5, 3.0)
+
+_FTS_STOPWORDS = frozenset("""
+    a an and are at be did do does for from had has have how i in is it me my
+    of on or show that the there this to was were what when where which who
+    why with you find get any anything video videos
+""".split())
+
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    """
+    Open a new, fully configured connection to the app database.
+
+    The caller owns the returned connection and must close it. Database helpers
+    in this module borrow pooled connections via connection()/transaction()
+    instead of calling this directly.
+    """
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT_MS / 1000.0,
+        isolation_level=None,
+    )
     conn.row_factory = sqlite3.Row
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
     return conn
 
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections shared by all threads."""
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, factory=get_connection):
+        self.size = size
+        self.timeout = timeout
+        self.factory = factory
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        """Borrow a connection, opening a new one while under the size limit."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self.factory()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn):
+        """Return a borrowed connection, rolling back anything left open."""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put_nowait(conn)
+
+    def close(self):
+        """Close every connection owned by the pool."""
+        with self._lock:
+            self._closed = True
+            connections, self._all = self._all, []
+        for conn in connections:
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error as e:
+                logging.warning(f"Error closing database connection: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "open": len(self._all), "idle": self._idle.qsize()}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Every write transaction in the process goes through one dedicated
+# connection, one at a time. SQLite only admits a single writer anyway;
+# queuing writers on this lock (instead of on busy_timeout retries) keeps
+# many camera loops writing concurrently cheap and fair.
+_writer = None
+_writer_lock = threading.Lock()
+_writer_stats = {"transactions": 0, "wait_ms": 0.0, "max_wait_ms": 0.0}
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def close_db():
+    """Close all pooled connections and the writer connection. Safe to call more than once."""
+    global _pool, _writer
+    with _pool_lock:
+        pool, _pool = _pool, None
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+    if pool is not None:
+        pool.close()
+        logging.info("Database connections closed")
+
+
+def get_writer_stats():
+    """Return how many write transactions ran and how long writers queued for the lock."""
+    stats = dict(_writer_stats)
+    stats["avg_wait_ms"] = round(stats["wait_ms"] / stats["transactions"], 3) if stats["transactions"] else 0.0
+    stats["wait_ms"] = round(stats["wait_ms"], 1)
+    stats["max_wait_ms"] = round(stats["max_wait_ms"], 1)
+    return stats
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for reads (autocommit, no transaction held)."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction():
+    """
+    Run a write transaction on the process-wide writer connection.
+
+    Writers in this process queue on a lock for the single writer connection.
+    BEGIN IMMEDIATE still takes SQLite's write lock up front, so writes from
+    other processes wait on busy_timeout instead of failing mid-transaction.
+    Commits on success and rolls back on any exception.
+    """
+    global _writer
+    started = time.perf_counter()
+    with _writer_lock:
+        waited_ms = (time.perf_counter() - started) * 1000
+        _writer_stats["transactions"] += 1
+        _writer_stats["wait_ms"] += waited_ms
+        _writer_stats["max_wait_ms"] = max(_writer_stats["max_wait_ms"], waited_ms)
+        if _writer is None:
+            _writer = get_connection()
+        conn = _writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def _load_migrations():
+    """
+    Return [(version, name, sql)] for every migrations/NNNN_name.sql file,
+    sorted by version.
+    """
+    migrations = []
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return migrations
+    for filename in os.listdir(MIGRATIONS_DIR):
+        if not filename.endswith(".sql"):
+            continue
+        prefix = filename.split("_", 1)[0]
+        if not prefix.isdigit():
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), "r") as f:
+            migrations.append((int(prefix), filename, f.read()))
+    migrations.sort()
+    return migrations
+
+
+def _split_statements(script):
+    """Split a SQL script into complete statements (trigger bodies stay intact)."""
+    statements = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    leftover = [l for l in buffer.splitlines() if l.strip() and not l.strip().startswith("--")]
+    if leftover:
+        raise ValueError(f"Incomplete SQL statement: {buffer.strip()[:80]}")
+    return statements
+
+
+def get_schema_version():
+    """Return the migration version recorded in PRAGMA user_version."""
+    with connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations():
+    """
+    Apply pending migrations in order, each in its own transaction.
+
+    The version is tracked with PRAGMA user_version, which is bumped in the
+    same transaction as the migration so a failed migration leaves no trace.
+
+    Returns:
+        The schema version after migrating
+    """
+    version = get_schema_version()
+    for target, name, sql in _load_migrations():
+        if target <= version:
+            continue
+        with transaction() as conn:
+            # Another process may have migrated while we waited for the lock.
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if target <= current:
+                version = current
+                continue
+            for statement in _split_statements(sql):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+        version = target
+        logging.info(f"Applied database migration {name}")
+    return version
+
+
 def init_db():
     data_dir = os.path.join(BASE_DIR, "data")
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
-    conn = get_connection()
     with open(SCHEMA_PATH, "r") as f:
-        conn.executescript(f.read())
-    conn.commit()
+        schema = f.read()
+    with connection() as conn:
+        conn.executescript(schema)
+    apply_migrations()
 
 def add_event(event_type, timestamp, description, image_path=None, audio_path=None):
-    conn = get_connection()
-    conn.execute("""
-        INSERT INTO events (type, timestamp, description, image_path, audio_path)
-        VALUES (?, ?, ?, ?, ?)
-    """, (event_type, timestamp, description, image_path, audio_path))
-    conn.commit()
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO events (type, timestamp, description, image_path, audio_path)
+            VALUES (?, ?, ?, ?, ?)
+        """, (event_type, timestamp, description, image_path, audio_path))
 
 def get_events():
-    conn = get_connection()
-    rows = conn.execute("SELECT * FROM events ORDER BY id DESC").fetchall()
+    with connection() as conn:
+        rows = conn.execute("SELECT * FROM events ORDER BY id DESC").fetchall()
     return [dict(row) for row in rows]
 
 def search_events(keyword):
-    conn = get_connection()
-    rows = conn.execute("""
-        SELECT * FROM events
-        WHERE description LIKE ?
-        ORDER BY id DESC
-    """, (f"%{keyword}%",)).fetchall()
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT * FROM events
+            WHERE description LIKE ?
+            ORDER BY id DESC
+        """, (f"%{keyword}%",)).fetchall()
     return [dict(row) for row in rows]
 
 def create_memory_node(file_path, file_type, timestamp, metadata=None):
@@ -53,15 +331,21 @@ def create_memory_node(file_path, file_type, timestamp, metadata=None):
         metadata: Optional JSON string containing additional metadata
     
     Returns:
-        The ID of the created MemoryNode
+        The ID of the created MemoryNode. file_path is unique, so creating a
+        node for a path that already has one replaces that node's type,
+        timestamp and metadata and returns the existing ID.
     """
-    conn = get_connection()
-    cursor = conn.execute("""
-        INSERT INTO memory_nodes (file_path, file_type, timestamp, metadata)
-        VALUES (?, ?, ?, ?)
-    """, (file_path, file_type, timestamp, metadata))
-    conn.commit()
-    return cursor.lastrowid
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO memory_nodes (file_path, file_type, timestamp, metadata)
+            VALUES (?, ?, ?, COALESCE(?, '{}'))
+            ON CONFLICT(file_path) DO UPDATE SET
+                file_type = excluded.file_type,
+                timestamp = excluded.timestamp,
+                metadata = excluded.metadata
+        """, (file_path, file_type, timestamp, metadata))
+        row = conn.execute("SELECT id FROM memory_nodes WHERE file_path = ?", (file_path,)).fetchone()
+    return row["id"]
 
 def get_memory_nodes(file_type=None, limit=None):
     """
@@ -74,18 +358,19 @@ def get_memory_nodes(file_type=None, limit=None):
     Returns:
         List of MemoryNode dictionaries
     """
-    conn = get_connection()
     if file_type:
-        query = "SELECT * FROM memory_nodes WHERE file_type = ? ORDER BY timestamp DESC"
+        query = f"SELECT {NODE_COLUMNS} FROM memory_nodes WHERE file_type = ? ORDER BY timestamp DESC"
         params = (file_type,)
     else:
-        query = "SELECT * FROM memory_nodes ORDER BY timestamp DESC"
+        query = f"SELECT {NODE_COLUMNS} FROM memory_nodes ORDER BY timestamp DESC"
         params = ()
     
     if limit:
-        query += f" LIMIT {limit}"
+        query += " LIMIT ?"
+        params += (int(limit),)
     
-    rows = conn.execute(query, params).fetchall()
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
     return [dict(row) for row in rows]
 
 def get_memory_node_by_id(node_id):
@@ -98,8 +383,8 @@ def get_memory_node_by_id(node_id):
     Returns:
         MemoryNode dictionary or None if not found
     """
-    conn = get_connection()
-    row = conn.execute("SELECT * FROM memory_nodes WHERE id = ?", (node_id,)).fetchone()
+    with connection() as conn:
+        row = conn.execute(f"SELECT {NODE_COLUMNS} FROM memory_nodes WHERE id = ?", (node_id,)).fetchone()
     return dict(row) if row else None
 
 def get_memory_nodes_by_timestamp_range(start_timestamp, end_timestamp):
@@ -113,12 +398,12 @@ def get_memory_nodes_by_timestamp_range(start_timestamp, end_timestamp):
     Returns:
         List of MemoryNode dictionaries
     """
-    conn = get_connection()
-    rows = conn.execute("""
-        SELECT * FROM memory_nodes
-        WHERE timestamp >= ? AND timestamp <= ?
-        ORDER BY timestamp DESC
-    """, (start_timestamp, end_timestamp)).fetchall()
+    with connection() as conn:
+        rows = conn.execute(f"""
+            SELECT {NODE_COLUMNS} FROM memory_nodes
+            WHERE timestamp >= ? AND timestamp <= ?
+            ORDER BY timestamp DESC
+        """, (start_timestamp, end_timestamp)).fetchall()
     return [dict(row) for row in rows]
 
 def get_all_memory_nodes_for_search():
@@ -126,12 +411,12 @@ def get_all_memory_nodes_for_search():
     Get all MemoryNodes formatted for Gemini search.
     Returns a list of dictionaries with id, file_path, file_type, timestamp, and metadata.
     """
-    conn = get_connection()
-    rows = conn.execute("""
-        SELECT id, file_path, file_type, timestamp, metadata
-        FROM memory_nodes
-        ORDER BY timestamp DESC
-    """).fetchall()
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT id, file_path, file_type, timestamp, metadata
+            FROM memory_nodes
+            ORDER BY timestamp DESC
+        """).fetchall()
     return [dict(row) for row in rows]
 
 def update_memory_node_metadata(node_id, metadata):
@@ -146,20 +431,284 @@ def update_memory_node_metadata(node_id, metadata):
         True if successful, False otherwise
     """
     import json
-    conn = get_connection()
     try:
         metadata_str = json.dumps(metadata) if not isinstance(metadata, str) else metadata
-        conn.execute("""
-            UPDATE memory_nodes
-            SET metadata = ?
-            WHERE id = ?
-        """, (metadata_str, node_id))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("""
+                UPDATE memory_nodes
+                SET metadata = ?
+                WHERE id = ?
+            """, (metadata_str, node_id))
         return True
     except Exception as e:
         logging.error(f"Failed to update MemoryNode metadata: {e}")
         return False
 
+def _fts_match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    
+    Every word becomes a quoted prefix term so user input can never be parsed
+    as FTS5 syntax, and terms are OR-ed so BM25 ranks partial matches instead
+    of dropping them. Returns None if the query has no searchable words.
+    """
+    words = re.findall(r"\w+", (query or "").lower())
+    terms = [w for w in words if w not in _FTS_STOPWORDS] or words
+    if not terms:
+        return None
+    unique_terms = list(dict.fromkeys(terms))
+    return " OR ".join(f'"{term}"*' for term in unique_terms)
+
+
+def search_memory_nodes_fts(query, limit=20, file_type=None, start_timestamp=None, end_timestamp=None,
+                            highlight_start="<mark>", highlight_end="</mark>"):
+    """
+    Full-text search over MemoryNode titles, summaries, transcripts,
+    descriptions and detected objects, ranked by BM25.
+    
+    Args:
+        query: Free-text search query
+        limit: Maximum number of results
+        file_type: Optional filter by file type
+        start_timestamp: Optional inclusive lower bound (ISO format string)
+        end_timestamp: Optional inclusive upper bound (ISO format string)
+        highlight_start: Marker inserted before matched terms in the snippet
+        highlight_end: Marker inserted after matched terms in the snippet
+    
+    Returns:
+        List of MemoryNode dictionaries, best match first, each with an added
+        `score` (higher is better) and a highlighted `snippet`
+    """
+    match = _fts_match_expression(query)
+    if not match:
+        return []
+    
+    weights = ", ".join(str(w) for w in FTS_COLUMN_WEIGHTS)
+    sql = f"""
+        SELECT m.id, m.file_path, m.file_type, m.timestamp, m.metadata, m.created_at,
+               -bm25(memory_nodes_fts, {weights}) AS score,
+               snippet(memory_nodes_fts, -1, ?, ?, '...', 16) AS snippet
+        FROM memory_nodes_fts
+        JOIN memory_nodes m ON m.id = memory_nodes_fts.rowid
+        WHERE memory_nodes_fts MATCH ?
+    """
+    params = [highlight_start, highlight_end, match]
+    if file_type:
+        sql += " AND m.file_type = ?"
+        params.append(file_type)
+    if start_timestamp:
+        sql += " AND m.timestamp >= ?"
+        params.append(start_timestamp)
+    if end_timestamp:
+        sql += " AND m.timestamp <= ?"
+        params.append(end_timestamp)
+    sql += " ORDER BY bm25(memory_nodes_fts, " + weights + ") LIMIT ?"
+    params.append(int(limit))
+    
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def update_memory_node_fields(node_id, **fields):
+    """
+    Set individual metadata fields of a MemoryNode in one atomic UPDATE.
+    
+    The JSON blob is edited in place with json_set(), so concurrent stages
+    writing different fields (e.g. summary vs. transcript) never overwrite
+    each other, and the generated columns are refreshed in the same statement.
+    
+    Args:
+        node_id: The ID of the MemoryNode to update
+        **fields: Metadata keys to set, e.g. summary="...", objects_detected=[...]
+    
+    Returns:
+        True if a node was updated, False otherwise
+    """
+    import json
+    if not fields:
+        return False
+    
+    assignments = []
+    params = []
+    for name, value in fields.items():
+        if not _FIELD_NAME_RE.match(name):
+            raise ValueError(f"Invalid metadata field name: {name!r}")
+        if isinstance(value, (list, tuple, dict)):
+            assignments.append(f"'$.{name}', json(?)")
+            params.append(json.dumps(value))
+        else:
+            assignments.append(f"'$.{name}', ?")
+            params.append(value)
+    
+    try:
+        with transaction() as conn:
+            cursor = conn.execute(f"""
+                UPDATE memory_nodes
+                SET metadata = json_set(metadata, {", ".join(assignments)})
+                WHERE id = ?
+            """, (*params, node_id))
+        return cursor.rowcount > 0
+    except Exception as e:
+        logging.error(f"Failed to update MemoryNode {node_id} fields {list(fields)}: {e}")
+        return False
+
+
+def get_memory_node_fields(node_id, *fields):
+    """
+    Read selected typed metadata columns of a MemoryNode without parsing JSON.
+    
+    Args:
+        node_id: The ID of the MemoryNode
+        *fields: Column names from MEMORY_NODE_FIELDS (all of them if omitted)
+    
+    Returns:
+        Dictionary of the requested fields, or None if the node does not exist
+    """
+    fields = fields or MEMORY_NODE_FIELDS
+    unknown = [f for f in fields if f not in MEMORY_NODE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown MemoryNode fields: {unknown}")
+    with connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(fields)} FROM memory_nodes WHERE id = ?", (node_id,)
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def get_memory_nodes_by_ids(node_ids):
+    """
+    Get MemoryNodes by ID, preserving the order of node_ids.
+    
+    Args:
+        node_ids: Iterable of MemoryNode IDs
+    
+    Returns:
+        List of MemoryNode dictionaries (IDs that no longer exist are skipped)
+    """
+    node_ids = [int(i) for i in node_ids]
+    if not node_ids:
+        return []
+    placeholders = ", ".join("?" for _ in node_ids)
+    with connection() as conn:
+        rows = conn.execute(
+            f"SELECT {NODE_COLUMNS} FROM memory_nodes WHERE id IN ({placeholders})", node_ids
+        ).fetchall()
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[i] for i in node_ids if i in by_id]
+
+
+def get_memory_node_ids_in_range(start_timestamp=None, end_timestamp=None, file_type=None, limit=None):
+    """
+    Get the IDs of MemoryNodes in a timestamp range, newest first.
+    
+    Args:
+        start_timestamp: Optional inclusive lower bound (ISO format string)
+        end_timestamp: Optional inclusive upper bound (ISO format string)
+        file_type: Optional filter by file type
+        limit: Optional limit on number of results
+    
+    Returns:
+        List of MemoryNode IDs
+    """
+    query = "SELECT id FROM memory_nodes WHERE 1 = 1"
+    params = []
+    if file_type:
+        query += " AND file_type = ?"
+        params.append(file_type)
+    if start_timestamp:
+        query += " AND timestamp >= ?"
+        params.append(start_timestamp)
+    if end_timestamp:
+        query += " AND timestamp <= ?"
+        params.append(end_timestamp)
+    query += " ORDER BY timestamp DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_memory_node_search_fields(node_ids):
+    """
+    Get the typed fields used to describe MemoryNodes in search prompts,
+    preserving the order of node_ids. Reads generated columns only, so no
+    metadata JSON is parsed.
+    
+    Args:
+        node_ids: Iterable of MemoryNode IDs
+    
+    Returns:
+        List of dictionaries with id, file_type, timestamp, revision, title,
+        summary, transcript and objects_detected
+    """
+    node_ids = [int(i) for i in node_ids]
+    if not node_ids:
+        return []
+    placeholders = ", ".join("?" for _ in node_ids)
+    with connection() as conn:
+        rows = conn.execute(f"""
+            SELECT id, file_type, timestamp, revision, title, summary, transcript, objects_detected
+            FROM memory_nodes
+            WHERE id IN ({placeholders})
+        """, node_ids).fetchall()
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[i] for i in node_ids if i in by_id]
+
+
+def get_archive_version():
+    """Return the current MemoryNode archive version.
+
+    The version lives in the database (bumped by triggers on every insert,
+    metadata update and delete of a MemoryNode), so caches keyed on it are
+    invalidated by writes from any process, not just this one.
+
+    Returns:
+        int: Monotonically increasing archive version.
+    """
+    with connection() as conn:
+        row = conn.execute("SELECT version FROM archive_state WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def get_memory_node_revision():
+    """Return the latest revision stamped on any MemoryNode (0 if empty)."""
+    with connection() as conn:
+        row = conn.execute("SELECT COALESCE(MAX(revision), 0) FROM memory_nodes").fetchone()
+    return row[0]
+
+
+def get_memory_nodes_changed_since(revision, limit=500):
+    """
+    Get the searchable fields of MemoryNodes written after a revision.
+    
+    Args:
+        revision: Only nodes with a higher revision are returned
+        limit: Maximum number of nodes per call
+    
+    Returns:
+        List of dictionaries with id, revision and the text fields, ordered by revision
+    """
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT id, revision, timestamp, title, summary, transcript, description, objects_detected
+            FROM memory_nodes
+            WHERE revision > ?
+            ORDER BY revision
+            LIMIT ?
+        """, (revision, int(limit))).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_memory_node_ids():
+    """Return the IDs of all MemoryNodes."""
+    with connection() as conn:
+        rows = conn.execute("SELECT id FROM memory_nodes").fetchall()
+    return [row[0] for row in rows]
+
+
 def get_memory_node_by_file_path(file_path):
     """
     Get a MemoryNode by its file_path.
@@ -170,8 +719,8 @@ def get_memory_node_by_file_path(file_path):
     Returns:
         MemoryNode dictionary or None if not found
     """
-    conn = get_connection()
-    row = conn.execute("SELECT * FROM memory_nodes WHERE file_path = ?", (file_path,)).fetchone()
+    with connection() as conn:
+        row = conn.execute(f"SELECT {NODE_COLUMNS} FROM memory_nodes WHERE file_path = ?", (file_path,)).fetchone()
     return dict(row) if row else None
 
 
@@ -183,31 +732,23 @@ def cleanup_orphaned_memory_nodes():
     Returns:
         Tuple of (deleted_count, list of deleted node IDs)
     """
-    import json
-    conn = get_connection()
     deleted_ids = []
     
     try:
-        rows = conn.execute("SELECT * FROM memory_nodes").fetchall()
+        with connection() as conn:
+            rows = conn.execute("""
+                SELECT id, file_path, video_path, audio_path, transcript_path
+                FROM memory_nodes
+            """).fetchall()
         
+        # File checks happen outside the write transaction so the camera
+        # pipeline is never blocked on filesystem I/O.
         for row in rows:
-            node = dict(row)
-            node_id = node['id']
-            file_path = node.get('file_path', '')
-            
-            metadata = {}
-            try:
-                metadata_str = node.get('metadata', '{}') or '{}'
-                metadata = json.loads(metadata_str) if isinstance(metadata_str, str) else metadata_str
-            except:
-                pass
-            
-            primary_exists = os.path.exists(file_path) if file_path else False
-            
-            video_path = metadata.get('video_path')
-            audio_path = metadata.get('audio_path')
-            transcript_path = metadata.get('transcript_path')
-            thumbnail_path = metadata.get('thumbnail_path')
+            node_id = row['id']
+            file_path = row['file_path'] or ''
+            video_path = row['video_path']
+            audio_path = row['audio_path']
+            transcript_path = row['transcript_path']
             
             primary_path = video_path or file_path
             
@@ -227,15 +768,379 @@ def cleanup_orphaned_memory_nodes():
                     should_delete = True
             
             if should_delete:
-                conn.execute("DELETE FROM memory_nodes WHERE id = ?", (node_id,))
                 deleted_ids.append(node_id)
-                logging.info(f"Deleted orphaned MemoryNode {node_id} (files missing: primary={primary_path}, video={video_path}, audio={audio_path}, transcript={transcript_path})")
+                logging.info(f"Deleting orphaned MemoryNode {node_id} (files missing: primary={primary_path}, video={video_path}, audio={audio_path}, transcript={transcript_path})")
         
-        conn.commit()
+        if deleted_ids:
+            with transaction() as conn:
+                conn.executemany("DELETE FROM memory_nodes WHERE id = ?", [(node_id,) for node_id in deleted_ids])
         return len(deleted_ids), deleted_ids
         
     except Exception as e:
         logging.error(f"Error cleaning up orphaned memory nodes: {e}", exc_info=True)
-        conn.rollback()
         return 0, []
 
+
+def enqueue_job(job_type, payload=None, dedup_key=None, priority=0, max_attempts=3, delay=0.0):
+    """
+    Add a job to the persistent job queue.
+    
+    Args:
+        job_type: Name of the registered handler that runs the job
+        payload: JSON-serializable dict passed to the handler
+        dedup_key: Optional key (e.g. a video path); while a job with the same
+            type and key is queued or running, no second one is added
+        priority: Higher runs first
+        max_attempts: Attempts before the job is marked failed
+        delay: Seconds before the job becomes due
+    
+    Returns:
+        Tuple of (job_id, created). For a duplicate, job_id is the pending job
+        and created is False; its priority is raised if the new one is higher,
+        and a queued job is brought forward if the new one is due sooner (so a
+        job queued with a deadline delay can be run early by queueing it again).
+    """
+    import json
+    now = time.time()
+    with transaction() as conn:
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO jobs (job_type, dedup_key, payload, priority, max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (job_type, dedup_key, json.dumps(payload or {}), int(priority), int(max_attempts), now + delay, now))
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+        row = conn.execute("""
+            SELECT id FROM jobs
+            WHERE job_type = ? AND dedup_key = ? AND status IN ('queued', 'running')
+        """, (job_type, dedup_key)).fetchone()
+        conn.execute("""
+            UPDATE jobs SET priority = MAX(priority, ?),
+                run_after = CASE WHEN status = 'queued' THEN MIN(run_after, ?) ELSE run_after END
+            WHERE id = ?
+        """, (int(priority), now + delay, row["id"]))
+        return row["id"], False
+
+
+def claim_job(job_type, claimed_by=None, lease_seconds=60.0):
+    """
+    Atomically take the highest-priority due job of `job_type` and mark it running.
+    
+    Args:
+        job_type: Job type to claim
+        claimed_by: Identifier of the claiming queue, recorded with the lease
+        lease_seconds: How long the job stays claimed without a heartbeat
+            (see renew_job_leases)
+    
+    Returns:
+        The job as a dictionary (payload still JSON-encoded, attempts already
+        incremented), or None if nothing is due
+    """
+    now = time.time()
+    with transaction() as conn:
+        row = conn.execute("""
+            SELECT id FROM jobs
+            WHERE job_type = ? AND status = 'queued' AND run_after <= ?
+            ORDER BY priority DESC, run_after, id
+            LIMIT 1
+        """, (job_type, now)).fetchone()
+        if row is None:
+            return None
+        conn.execute("""
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?,
+                claimed_by = ?, lease_expires = ?
+            WHERE id = ?
+        """, (now, claimed_by, now + lease_seconds, row["id"]))
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+    return dict(job)
+
+
+def complete_job(job_id, claimed_by=None):
+    """
+    Mark a running job as done.
+    
+    With `claimed_by`, only a job still claimed by that owner is updated; a
+    job whose lease expired and was re-queued or claimed elsewhere is left
+    alone.
+    
+    Returns:
+        True if the job was marked done
+    """
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE jobs SET status = 'done', finished_at = ?, last_error = NULL, lease_expires = NULL
+            WHERE id = ? AND (? IS NULL OR (status = 'running' AND claimed_by = ?))
+        """, (time.time(), job_id, claimed_by, claimed_by))
+    return cursor.rowcount > 0
+
+
+def fail_job(job_id, error, retry_delay, claimed_by=None):
+    """
+    Record a failed attempt. The job is re-queued to run after `retry_delay`
+    seconds unless it has used all its attempts.
+    
+    With `claimed_by`, nothing is recorded for a job no longer claimed by
+    that owner (its lease expired and it was re-queued or claimed elsewhere).
+    
+    Returns:
+        'queued' if the job will be retried, 'failed' otherwise, or 'lost'
+        if the job is no longer claimed by `claimed_by`
+    """
+    now = time.time()
+    with transaction() as conn:
+        row = conn.execute("SELECT status, claimed_by, attempts, max_attempts FROM jobs WHERE id = ?",
+                           (job_id,)).fetchone()
+        if claimed_by is not None and (row is None or row["status"] != "running" or row["claimed_by"] != claimed_by):
+            return "lost"
+        if row is not None and row["attempts"] < row["max_attempts"]:
+            status = "queued"
+            conn.execute("""
+                UPDATE jobs SET status = 'queued', run_after = ?, last_error = ?, lease_expires = NULL
+                WHERE id = ?
+            """, (now + retry_delay, str(error)[:2000], job_id))
+        else:
+            status = "failed"
+            conn.execute("""
+                UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ?, lease_expires = NULL
+                WHERE id = ?
+            """, (now, str(error)[:2000], job_id))
+    return status
+
+
+def renew_job_leases(claimed_by, lease_seconds):
+    """
+    Extend the lease of every job running under `claimed_by` (the heartbeat).
+    
+    Returns:
+        Number of leases renewed
+    """
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE jobs SET lease_expires = ?
+            WHERE status = 'running' AND claimed_by = ?
+        """, (time.time() + lease_seconds, claimed_by))
+    return cursor.rowcount
+
+
+def requeue_interrupted_jobs():
+    """
+    Put 'running' jobs whose lease has expired back in the queue.
+    
+    An expired lease means the owning process died (or hung without
+    heartbeating); jobs still leased by a live process are left alone.
+    Running jobs without a lease (claimed before leases existed) count as
+    expired. Jobs that already used all their attempts are marked failed
+    instead, so a job that keeps crashing the process is not retried forever.
+    
+    Returns:
+        Number of jobs re-queued
+    """
+    now = time.time()
+    expired = "status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)"
+    with transaction() as conn:
+        conn.execute(f"""
+            UPDATE jobs SET status = 'failed', finished_at = ?, last_error = 'Interrupted on final attempt',
+                lease_expires = NULL
+            WHERE {expired} AND attempts >= max_attempts
+        """, (now, now))
+        cursor = conn.execute(f"""
+            UPDATE jobs SET status = 'queued', run_after = ?, lease_expires = NULL
+            WHERE {expired}
+        """, (now, now))
+    return cursor.rowcount
+
+
+def purge_finished_jobs(older_than_seconds):
+    """Delete done and failed jobs that finished more than `older_than_seconds` ago."""
+    with transaction() as conn:
+        cursor = conn.execute("""
+            DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?
+        """, (time.time() - older_than_seconds,))
+    return cursor.rowcount
+
+
+def get_job_stats(window_seconds=3600):
+    """
+    Summarize the job queue per job type.
+    
+    Returns:
+        {job_type: {"queued", "running", "done", "failed", "oldest_queued_seconds",
+        "avg_wait_seconds", "avg_run_seconds"}}. Wait is time from enqueue to the
+        last start and run is start to finish, averaged over jobs finished in
+        the last `window_seconds`.
+    """
+    now = time.time()
+    stats = {}
+    with connection() as conn:
+        rows = conn.execute("""
+            SELECT job_type, status, COUNT(*) AS count, MIN(created_at) AS oldest
+            FROM jobs GROUP BY job_type, status
+        """).fetchall()
+        for row in rows:
+            entry = stats.setdefault(row["job_type"], {
+                "queued": 0, "running": 0, "done": 0, "failed": 0, "oldest_queued_seconds": None,
+                "avg_wait_seconds": None, "avg_run_seconds": None,
+            })
+            entry[row["status"]] = row["count"]
+            if row["status"] == "queued":
+                entry["oldest_queued_seconds"] = round(now - row["oldest"], 1)
+        rows = conn.execute("""
+            SELECT job_type, AVG(started_at - created_at) AS wait, AVG(finished_at - started_at) AS run
+            FROM jobs
+            WHERE status = 'done' AND finished_at >= ?
+            GROUP BY job_type
+        """, (now - window_seconds,)).fetchall()
+    for row in rows:
+        if row["job_type"] in stats:
+            stats[row["job_type"]]["avg_wait_seconds"] = round(row["wait"], 2)
+            stats[row["job_type"]]["avg_run_seconds"] = round(row["run"], 2)
+    return stats
+
+
+def get_jobs(status=None, job_type=None, limit=50):
+    """Return the most recent jobs, optionally filtered by status and type."""
+    sql = "SELECT * FROM jobs WHERE 1=1"
+    params = []
+    if status:
+        sql += " AND status = ?"
+        params.append(status)
+    if job_type:
+        sql += " AND job_type = ?"
+        params.append(job_type)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(int(limit))
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+
+PIPELINE_STAGES = ("recorded", "transcribed", "summarized", "titled", "indexed")
+PIPELINE_STATES = ("pending", "done", "skipped", "failed")
+
+
+def set_pipeline_stages(node_id, error=None, **stages):
+    """
+    Explicitly set pipeline stages of a recording, e.g. summarized='failed'.
+    
+    Stages that complete by writing content (a transcript, summary or title)
+    are advanced by triggers; this is for outcomes that write no content.
+    
+    Args:
+        node_id: The ID of the MemoryNode
+        error: Optional error message stored as last_error
+        **stages: Stage name (PIPELINE_STAGES) to state (PIPELINE_STATES)
+    
+    Returns:
+        True if the node has pipeline state, False otherwise
+    """
+    for stage, state in stages.items():
+        if stage not in PIPELINE_STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage!r}")
+        if state not in PIPELINE_STATES:
+            raise ValueError(f"Unknown pipeline state: {state!r}")
+    assignments = [f"{stage} = ?" for stage in stages] + ["updated_at = ?"]
+    params = list(stages.values()) + [time.time()]
+    if error is not None:
+        assignments.append("last_error = ?")
+        params.append(str(error)[:2000])
+    with transaction() as conn:
+        cursor = conn.execute(
+            f"UPDATE pipeline_state SET {', '.join(assignments)} WHERE node_id = ?", (*params, node_id)
+        )
+    return cursor.rowcount > 0
+
+
+def get_pipeline_state(node_id):
+    """
+    Return the pipeline stages of a recording.
+    
+    Returns:
+        Dictionary of stage states plus last_error and updated_at, or None if
+        the node has no pipeline state
+    """
+    with connection() as conn:
+        row = conn.execute(f"""
+            SELECT {', '.join(PIPELINE_STAGES)}, last_error, updated_at
+            FROM pipeline_state WHERE node_id = ?
+        """, (node_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def mark_pipeline_indexed(max_revision):
+    """Mark recordings whose current content (revision <= max_revision) has been embedded."""
+    with transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE pipeline_state SET indexed = 'done'
+            WHERE indexed = 'pending'
+              AND node_id IN (SELECT id FROM memory_nodes WHERE revision <= ?)
+        """, (max_revision,))
+    return cursor.rowcount
+
+
+def get_incomplete_pipeline_nodes(include_failed=False, limit=None):
+    """
+    Return recordings with unfinished pipeline stages, oldest first.
+    
+    Args:
+        include_failed: Also return stages marked 'failed' (for a manual retry)
+        limit: Optional maximum number of rows
+    
+    Returns:
+        List of dictionaries with the stage states, the node's file paths and
+        its `summary_waiting` marker (JSON text, or None)
+    """
+    retry = ("pending", "failed") if include_failed else ("pending",)
+    marks = ", ".join("?" for _ in retry)
+    sql = f"""
+        SELECT p.node_id, p.transcribed, p.summarized, p.titled, p.indexed, p.updated_at,
+               m.file_path, m.video_path, m.audio_path, m.transcript_path,
+               json_extract(m.metadata, '$.summary_waiting') AS summary_waiting
+        FROM pipeline_state p
+        JOIN memory_nodes m ON m.id = p.node_id
+        WHERE p.transcribed IN ({marks})
+           OR p.summarized IN ({marks})
+           OR p.titled = 'pending'
+           OR p.indexed = 'pending'
+        ORDER BY p.node_id
+    """
+    params = list(retry) * 2
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_pipeline_stats(stuck_after_seconds=600, stuck_limit=20):
+    """
+    Summarize recording pipeline progress.
+    
+    Returns:
+        Dictionary with per-stage state counts, the number of incomplete
+        recordings, and up to `stuck_limit` recordings that have not advanced
+        for `stuck_after_seconds`
+    """
+    stages = {stage: {state: 0 for state in PIPELINE_STATES} for stage in PIPELINE_STAGES}
+    incomplete_where = """
+        transcribed IN ('pending', 'failed') OR summarized IN ('pending', 'failed')
+        OR titled = 'pending' OR indexed = 'pending'
+    """
+    with connection() as conn:
+        for stage in PIPELINE_STAGES:
+            for row in conn.execute(f"SELECT {stage} AS state, COUNT(*) AS count FROM pipeline_state GROUP BY {stage}"):
+                stages[stage][row["state"]] = row["count"]
+        total = conn.execute("SELECT COUNT(*) FROM pipeline_state").fetchone()[0]
+        incomplete = conn.execute(f"SELECT COUNT(*) FROM pipeline_state WHERE {incomplete_where}").fetchone()[0]
+        stuck = conn.execute(f"""
+            SELECT node_id, transcribed, summarized, titled, indexed, updated_at, last_error
+            FROM pipeline_state
+            WHERE ({incomplete_where}) AND updated_at < ?
+            ORDER BY updated_at
+            LIMIT ?
+        """, (time.time() - stuck_after_seconds, int(stuck_limit))).fetchall()
+    return {
+        "recordings": total,
+        "incomplete": incomplete,
+        "stages": stages,
+        "stuck": [dict(row) for row in stuck],
+    }
@@ -0,0 +1,19 @@
+-- Indexes for the hot lookup paths: file_path lookups from the camera
+-- pipeline, file_type/timestamp listing for the UI and time range queries.
+
+-- Older builds could insert the same recording twice (transcription racing
+-- video analysis). Keep the first node per file so the unique index applies.
+DELETE FROM memory_nodes
+WHERE id NOT IN (SELECT MIN(id) FROM memory_nodes GROUP BY file_path);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_memory_nodes_file_path
+    ON memory_nodes(file_path);
+
+CREATE INDEX IF NOT EXISTS idx_memory_nodes_file_type_timestamp
+    ON memory_nodes(file_type, timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_memory_nodes_timestamp
+    ON memory_nodes(timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_events_timestamp
+    ON events(timestamp);
@@ -0,0 +1,42 @@
+-- Expose the frequently read metadata fields as typed columns. They are
+-- STORED generated columns over the metadata JSON, so reads never parse the
+-- blob and field updates via json_set() keep them in sync atomically.
+-- SQLite cannot add STORED columns with ALTER TABLE, so the table is rebuilt.
+
+-- Backfill: every row must hold a JSON object for json_extract() to work.
+UPDATE memory_nodes SET metadata = '{}' WHERE metadata IS NULL OR metadata = '';
+UPDATE memory_nodes SET metadata = json_object('description', metadata)
+WHERE NOT json_valid(metadata);
+
+CREATE TABLE memory_nodes_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_path TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    title TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.title')) STORED,
+    summary TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.summary')) STORED,
+    transcript TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.transcript')) STORED,
+    description TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.description')) STORED,
+    objects_detected TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.objects_detected')) STORED,
+    video_path TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.video_path')) STORED,
+    audio_path TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.audio_path')) STORED,
+    transcript_path TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.transcript_path')) STORED,
+    thumbnail_path TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.thumbnail_path')) STORED
+);
+
+INSERT INTO memory_nodes_new (id, file_path, file_type, timestamp, metadata, created_at)
+SELECT id, file_path, file_type, timestamp, metadata, created_at FROM memory_nodes;
+
+DROP TABLE memory_nodes;
+ALTER TABLE memory_nodes_new RENAME TO memory_nodes;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_memory_nodes_file_path
+    ON memory_nodes(file_path);
+
+CREATE INDEX IF NOT EXISTS idx_memory_nodes_file_type_timestamp
+    ON memory_nodes(file_type, timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_memory_nodes_timestamp
+    ON memory_nodes(timestamp);
@@ -0,0 +1,33 @@
+-- Full-text index over the searchable MemoryNode fields. It is an external
+-- content table backed by the generated columns of memory_nodes, so the text
+-- is not stored twice; triggers keep the index in sync with every write.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_nodes_fts USING fts5(
+    title,
+    summary,
+    transcript,
+    description,
+    objects_detected,
+    content = 'memory_nodes',
+    content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_fts_insert AFTER INSERT ON memory_nodes BEGIN
+    INSERT INTO memory_nodes_fts (rowid, title, summary, transcript, description, objects_detected)
+    VALUES (new.id, new.title, new.summary, new.transcript, new.description, new.objects_detected);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_fts_delete AFTER DELETE ON memory_nodes BEGIN
+    INSERT INTO memory_nodes_fts (memory_nodes_fts, rowid, title, summary, transcript, description, objects_detected)
+    VALUES ('delete', old.id, old.title, old.summary, old.transcript, old.description, old.objects_detected);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_fts_update AFTER UPDATE ON memory_nodes BEGIN
+    INSERT INTO memory_nodes_fts (memory_nodes_fts, rowid, title, summary, transcript, description, objects_detected)
+    VALUES ('delete', old.id, old.title, old.summary, old.transcript, old.description, old.objects_detected);
+    INSERT INTO memory_nodes_fts (rowid, title, summary, transcript, description, objects_detected)
+    VALUES (new.id, new.title, new.summary, new.transcript, new.description, new.objects_detected);
+END;
+
+INSERT INTO memory_nodes_fts (memory_nodes_fts) VALUES ('rebuild');
@@ -0,0 +1,34 @@
+-- Monotonic change sequence for memory_nodes. Every insert and metadata
+-- update stamps the row with MAX(revision) + 1, so derived indexes (e.g. the
+-- semantic embedding index) can sync incrementally with
+-- "WHERE revision > last_seen" instead of rescanning the archive.
+
+ALTER TABLE memory_nodes ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;
+
+UPDATE memory_nodes SET revision = id;
+
+CREATE INDEX IF NOT EXISTS idx_memory_nodes_revision
+    ON memory_nodes(revision);
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_revision_insert AFTER INSERT ON memory_nodes BEGIN
+    UPDATE memory_nodes
+    SET revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM memory_nodes)
+    WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_revision_update AFTER UPDATE OF metadata ON memory_nodes BEGIN
+    UPDATE memory_nodes
+    SET revision = (SELECT COALESCE(MAX(revision), 0) + 1 FROM memory_nodes)
+    WHERE id = new.id;
+END;
+
+-- Only metadata changes affect the indexed text; restrict the FTS trigger so
+-- revision bumps do not re-index rows.
+DROP TRIGGER IF EXISTS memory_nodes_fts_update;
+
+CREATE TRIGGER IF NOT EXISTS memory_nodes_fts_update AFTER UPDATE OF metadata ON memory_nodes BEGIN
+    INSERT INTO memory_nodes_fts (memory_nodes_fts, rowid, title, summary, transcript, description, objects_detected)
+    VALUES ('delete', old.id, old.title, old.summary, old.transcript, old.description, old.objects_detected);
+    INSERT INTO memory_nodes_fts (rowid, title, summary, transcript, description, objects_detected)
+    VALUES (new.id, new.title, new.summary, new.transcript, new.description, new.objects_detected);
+END;
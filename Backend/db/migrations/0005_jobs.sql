@@ -0,0 +1,31 @@
+-- Persistent background job queue (see jobs/queue.py). Recording analysis and
+-- transcription are queued here instead of running on ad-hoc threads, so work
+-- pending when the process dies is picked up again on the next start.
+--
+-- status: queued -> running -> done | failed (failed jobs may be re-queued
+-- with a later run_after until attempts reaches max_attempts).
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    dedup_key TEXT,
+    payload TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    last_error TEXT
+);
+
+-- Workers claim the highest-priority due job of their type.
+CREATE INDEX IF NOT EXISTS idx_jobs_claim
+    ON jobs(job_type, status, priority DESC, run_after, id);
+
+-- At most one pending job per (type, key), e.g. one analysis per video file.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup
+    ON jobs(job_type, dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running');
@@ -0,0 +1,85 @@
+-- Per-recording processing state. Each stage is 'pending', 'done', 'skipped'
+-- (nothing to do, e.g. no audio or no video) or 'failed' (gave up after retries):
+--
+--   recorded -> transcribed, summarized -> titled -> indexed
+--
+-- Rows are created and advanced by triggers from the node's own metadata, so
+-- every code path that writes a recording keeps the state current. The
+-- startup recovery scanner (camera_module.recover_recording_pipeline)
+-- re-queues jobs for stages still pending after a crash or deploy.
+
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    node_id INTEGER PRIMARY KEY REFERENCES memory_nodes(id) ON DELETE CASCADE,
+    recorded TEXT NOT NULL DEFAULT 'done',
+    transcribed TEXT NOT NULL DEFAULT 'pending',
+    summarized TEXT NOT NULL DEFAULT 'pending',
+    titled TEXT NOT NULL DEFAULT 'pending',
+    indexed TEXT NOT NULL DEFAULT 'pending',
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+
+-- The recovery scan only touches unfinished rows.
+CREATE INDEX IF NOT EXISTS idx_pipeline_state_incomplete
+    ON pipeline_state(node_id)
+    WHERE transcribed IN ('pending', 'failed')
+       OR summarized IN ('pending', 'failed')
+       OR titled = 'pending'
+       OR indexed = 'pending';
+
+CREATE TRIGGER IF NOT EXISTS pipeline_state_insert AFTER INSERT ON memory_nodes
+WHEN new.file_type = 'recording' BEGIN
+    INSERT OR IGNORE INTO pipeline_state (node_id, transcribed, summarized, titled, indexed, updated_at)
+    VALUES (
+        new.id,
+        CASE WHEN COALESCE(new.transcript, '') != '' THEN 'done'
+             WHEN COALESCE(new.audio_path, '') = '' THEN 'skipped'
+             ELSE 'pending' END,
+        CASE WHEN COALESCE(new.summary, '') NOT IN ('', 'Loading Summary...') THEN 'done'
+             WHEN COALESCE(new.video_path, '') = '' THEN 'skipped'
+             ELSE 'pending' END,
+        CASE WHEN COALESCE(new.title, '') = '' THEN 'pending' ELSE 'done' END,
+        'pending',
+        (julianday('now') - 2440587.5) * 86400.0
+    );
+END;
+
+-- Content written to a node completes its stage; any change needs re-indexing.
+-- Stages the code marked 'failed' or 'skipped' are left alone unless content arrives.
+CREATE TRIGGER IF NOT EXISTS pipeline_state_update AFTER UPDATE OF metadata ON memory_nodes BEGIN
+    UPDATE pipeline_state SET
+        transcribed = CASE WHEN COALESCE(new.transcript, '') != '' THEN 'done' ELSE transcribed END,
+        summarized = CASE WHEN COALESCE(new.summary, '') NOT IN ('', 'Loading Summary...') THEN 'done' ELSE summarized END,
+        titled = CASE WHEN COALESCE(new.title, '') != '' THEN 'done' ELSE titled END,
+        indexed = 'pending',
+        updated_at = (julianday('now') - 2440587.5) * 86400.0
+    WHERE node_id = new.id;
+END;
+
+-- Existing recordings: finished content counts as done, and nodes written
+-- before this migration were already embedded by the semantic index catch-up.
+-- The old camera loop transcribed every recording right after it stopped and
+-- only wrote non-empty transcripts to the node, so an empty transcript on a
+-- processed node is a finished attempt (no speech, or it failed): 'skipped'.
+-- Only nodes whose processing never ran (summary still the placeholder) are
+-- left pending, instead of re-queueing transcription across the archive.
+-- Titles likewise: a processed node without one is not re-titled.
+-- Recordings without a video (transcript-only nodes from the /transcribe
+-- endpoints) have nothing to summarize: 'skipped'.
+INSERT OR IGNORE INTO pipeline_state (node_id, transcribed, summarized, titled, indexed, updated_at)
+SELECT
+    id,
+    CASE WHEN COALESCE(transcript, '') != '' THEN 'done'
+         WHEN COALESCE(audio_path, '') = '' THEN 'skipped'
+         WHEN COALESCE(summary, '') IN ('', 'Loading Summary...') AND COALESCE(transcript_path, '') = '' THEN 'pending'
+         ELSE 'skipped' END,
+    CASE WHEN COALESCE(summary, '') NOT IN ('', 'Loading Summary...') THEN 'done'
+         WHEN COALESCE(video_path, '') = '' THEN 'skipped'
+         ELSE 'pending' END,
+    CASE WHEN COALESCE(title, '') != '' THEN 'done'
+         WHEN COALESCE(summary, '') IN ('', 'Loading Summary...') THEN 'pending'
+         ELSE 'skipped' END,
+    'done',
+    (julianday('now') - 2440587.5) * 86400.0
+FROM memory_nodes
+WHERE file_type = 'recording';
@@ -0,0 +1,37 @@
+-- Streaming transcription writes the transcript to a recording while it is
+-- still being recorded, flagged with "transcript_partial": true in the
+-- metadata. A partial transcript must not complete the 'transcribed' stage,
+-- or recordings interrupted mid-stream would never be transcribed in full.
+
+DROP TRIGGER IF EXISTS pipeline_state_insert;
+DROP TRIGGER IF EXISTS pipeline_state_update;
+
+CREATE TRIGGER pipeline_state_insert AFTER INSERT ON memory_nodes
+WHEN new.file_type = 'recording' BEGIN
+    INSERT OR IGNORE INTO pipeline_state (node_id, transcribed, summarized, titled, indexed, updated_at)
+    VALUES (
+        new.id,
+        CASE WHEN COALESCE(new.transcript, '') != ''
+                  AND COALESCE(json_extract(new.metadata, '$.transcript_partial'), 0) = 0 THEN 'done'
+             WHEN COALESCE(new.audio_path, '') = '' THEN 'skipped'
+             ELSE 'pending' END,
+        CASE WHEN COALESCE(new.summary, '') NOT IN ('', 'Loading Summary...') THEN 'done'
+             WHEN COALESCE(new.video_path, '') = '' THEN 'skipped'
+             ELSE 'pending' END,
+        CASE WHEN COALESCE(new.title, '') = '' THEN 'pending' ELSE 'done' END,
+        'pending',
+        (julianday('now') - 2440587.5) * 86400.0
+    );
+END;
+
+CREATE TRIGGER pipeline_state_update AFTER UPDATE OF metadata ON memory_nodes BEGIN
+    UPDATE pipeline_state SET
+        transcribed = CASE WHEN COALESCE(new.transcript, '') != ''
+                                AND COALESCE(json_extract(new.metadata, '$.transcript_partial'), 0) = 0 THEN 'done'
+                           ELSE transcribed END,
+        summarized = CASE WHEN COALESCE(new.summary, '') NOT IN ('', 'Loading Summary...') THEN 'done' ELSE summarized END,
+        titled = CASE WHEN COALESCE(new.title, '') != '' THEN 'done' ELSE titled END,
+        indexed = 'pending',
+        updated_at = (julianday('now') - 2440587.5) * 86400.0
+    WHERE node_id = new.id;
+END;
@@ -0,0 +1,24 @@
+-- Archive version shared by every process using the database. Caches of
+-- derived results (e.g. search) key on it, so a node written or deleted by
+-- the standalone camera CLI invalidates the server's caches as well.
+-- MAX(revision) alone is not enough: deletes do not change it, and deleting
+-- the newest node lets the next insert reuse its revision.
+
+CREATE TABLE IF NOT EXISTS archive_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO archive_state (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS archive_version_insert AFTER INSERT ON memory_nodes BEGIN
+    UPDATE archive_state SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS archive_version_update AFTER UPDATE OF metadata ON memory_nodes BEGIN
+    UPDATE archive_state SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS archive_version_delete AFTER DELETE ON memory_nodes BEGIN
+    UPDATE archive_state SET version = version + 1 WHERE id = 1;
+END;
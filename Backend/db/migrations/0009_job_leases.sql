@@ -0,0 +1,15 @@
+-- Leases for running jobs. A worker claims a job for JOB_LEASE_SECONDS and
+-- its process heartbeats the lease while the job runs. Only jobs whose lease
+-- has expired are treated as interrupted, so a second process (the camera
+-- CLI next to the API server) starting up no longer re-queues jobs another
+-- live process is still working on.
+--
+-- claimed_by identifies the owning queue (host:pid:token); running rows from
+-- before this migration have no lease and count as expired.
+
+ALTER TABLE jobs ADD COLUMN claimed_by TEXT;
+
+ALTER TABLE jobs ADD COLUMN lease_expires REAL;
+
+CREATE INDEX IF NOT EXISTS idx_jobs_lease
+    ON jobs(status, lease_expires);
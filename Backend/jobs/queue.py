@@ -0,0 +1,281 @@
+"""
+Persistent background job queue.
+
+Jobs live in the `jobs` table (db/migrations/0005_jobs.sql), so work that is
+queued or running when the process dies is resumed on the next start. Each
+job type has its own handler and a fixed number of worker threads, so a
+burst of recordings queues up instead of starting dozens of concurrent
+uploads and YOLO runs.
+
+Handlers are called as ``handler(payload, job)``; raising marks the attempt
+as failed and the job is retried with exponential backoff until it has used
+`max_attempts`. Jobs carrying a `dedup_key` (e.g. a video path) are not
+queued twice while one is still pending.
+
+Running jobs are leased to the queue that claimed them: a heartbeat renews
+the leases every JOB_HEARTBEAT_INTERVAL, and only jobs whose lease has
+expired (their process died) are re-queued, so several processes can share
+the table without taking each other's running work.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from db.database import (
+    claim_job,
+    complete_job,
+    enqueue_job,
+    fail_job,
+    get_job_stats,
+    purge_finished_jobs,
+    renew_job_leases,
+    requeue_interrupted_jobs,
+)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Finished jobs are kept this long for the status endpoint, then deleted.
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# A running job whose lease is not renewed for this long counts as interrupted.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", str(JOB_LEASE_SECONDS / 3)))
+
+
+class JobQueue:
+    """Runs registered job types on bounded worker pools backed by SQLite"""
+
+    def __init__(self, poll_interval: float = JOB_POLL_INTERVAL, lease_seconds: float = JOB_LEASE_SECONDS,
+                 heartbeat_interval: float = JOB_HEARTBEAT_INTERVAL):
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        # Recorded as claimed_by on every job this queue runs.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._specs: Dict[str, dict] = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop_event = threading.Event()
+        self._started = False
+
+    def register(
+        self,
+        job_type: str,
+        handler: Callable[[dict, dict], object],
+        workers: int = 1,
+        priority: int = 0,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+    ):
+        """Register the handler for `job_type`. Registering a type again is a no-op.
+
+        Args:
+            handler: Called as handler(payload, job) on a worker thread
+            workers: Maximum number of jobs of this type running at once
+            priority: Default priority for enqueued jobs (higher runs first)
+            max_attempts: Attempts before a job is marked failed
+            retry_delay: Delay before the first retry; doubles per attempt up to `max_retry_delay`
+        """
+        with self._lock:
+            if job_type in self._specs:
+                return
+            self._specs[job_type] = {
+                "handler": handler,
+                "workers": max(1, int(workers)),
+                "priority": priority,
+                "max_attempts": max_attempts,
+                "retry_delay": retry_delay,
+                "max_retry_delay": max_retry_delay,
+                "busy": 0,
+                "succeeded": 0,
+                "retried": 0,
+                "failed": 0,
+            }
+            if self._started:
+                self._start_workers(job_type)
+
+    def start(self):
+        """Recover jobs with expired leases, start the workers and the lease heartbeat. Idempotent."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stop_event.clear()
+            try:
+                self._recover()
+                purge_finished_jobs(JOB_RETENTION_SECONDS)
+            except Exception as e:
+                logging.error(f"Job queue recovery failed: {e}", exc_info=True)
+            for job_type in self._specs:
+                self._start_workers(job_type)
+            heartbeat = threading.Thread(target=self._heartbeat, daemon=True, name="JobLeaseHeartbeat")
+            heartbeat.start()
+            self._threads.append(heartbeat)
+
+    def _recover(self):
+        recovered = requeue_interrupted_jobs()
+        if recovered:
+            logging.info(f"Re-queued {recovered} job(s) whose lease expired")
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _heartbeat(self):
+        """Renew the leases of this queue's running jobs and pick up jobs abandoned by dead processes."""
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                renew_job_leases(self.owner, self.lease_seconds)
+                self._recover()
+            except Exception as e:
+                logging.error(f"Job lease heartbeat failed: {e}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers after their current job. Pending jobs stay in the database."""
+        with self._lock:
+            self._started = False
+            threads, self._threads = self._threads, []
+        self._stop_event.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def enqueue(self, job_type: str, payload: Optional[dict] = None, dedup_key: Optional[str] = None,
+                priority: Optional[int] = None, delay: float = 0.0) -> int:
+        """Queue a job and wake a worker.
+
+        Returns:
+            The job id (the already pending job's id for a duplicate)
+        """
+        spec = self._specs.get(job_type)
+        if spec is None:
+            raise ValueError(f"Unknown job type '{job_type}'")
+        job_id, created = enqueue_job(
+            job_type,
+            payload,
+            dedup_key=dedup_key,
+            priority=spec["priority"] if priority is None else priority,
+            max_attempts=spec["max_attempts"],
+            delay=delay,
+        )
+        if created:
+            logging.info(f"Queued {job_type} job {job_id}" + (f" for {dedup_key}" if dedup_key else ""))
+            with self._wakeup:
+                self._wakeup.notify_all()
+        else:
+            logging.info(f"{job_type} job {job_id} for {dedup_key} is already pending; not queued again")
+        return job_id
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait until no registered job is queued or running. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stats = get_job_stats()
+            pending = sum(stats.get(t, {}).get("queued", 0) + stats.get(t, {}).get("running", 0) for t in self._specs)
+            if not pending:
+                return True
+            time.sleep(self.poll_interval)
+        return False
+
+    def stats(self) -> Dict[str, dict]:
+        """Queue depth and latency per job type, plus this process's worker counters."""
+        try:
+            stats = get_job_stats()
+        except Exception as e:
+            logging.warning(f"Failed to read job stats: {e}")
+            stats = {}
+        with self._lock:
+            for job_type, spec in self._specs.items():
+                entry = stats.setdefault(job_type, {
+                    "queued": 0, "running": 0, "done": 0, "failed": 0, "oldest_queued_seconds": None,
+                    "avg_wait_seconds": None, "avg_run_seconds": None,
+                })
+                entry["workers"] = spec["workers"]
+                entry["busy_workers"] = spec["busy"]
+                entry["session"] = {key: spec[key] for key in ("succeeded", "retried", "failed")}
+        return stats
+
+    def _start_workers(self, job_type: str):
+        for index in range(self._specs[job_type]["workers"]):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(job_type,),
+                daemon=True,
+                name=f"JobWorker-{job_type}-{index}",
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self, job_type: str):
+        spec = self._specs[job_type]
+        while not self._stop_event.is_set():
+            try:
+                job = claim_job(job_type, claimed_by=self.owner, lease_seconds=self.lease_seconds)
+            except Exception as e:
+                logging.error(f"Failed to claim {job_type} job: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(spec, job)
+
+    def _run(self, spec: dict, job: dict):
+        job_id, job_type = job["id"], job["job_type"]
+        with self._lock:
+            spec["busy"] += 1
+        started = time.monotonic()
+        try:
+            spec["handler"](json.loads(job["payload"] or "{}"), job)
+        except Exception as e:
+            delay = min(spec["max_retry_delay"], spec["retry_delay"] * 2 ** (job["attempts"] - 1))
+            try:
+                status = fail_job(job_id, f"{type(e).__name__}: {e}", delay, claimed_by=self.owner)
+            except Exception as db_error:
+                logging.error(f"Failed to record failure of {job_type} job {job_id}: {db_error}")
+                status = "failed"
+            if status == "lost":
+                logging.warning(f"{job_type} job {job_id} failed after its lease expired; "
+                                f"leaving it to its new owner: {e}")
+                return
+            with self._lock:
+                spec["retried" if status == "queued" else "failed"] += 1
+            if status == "queued":
+                logging.warning(f"{job_type} job {job_id} failed (attempt {job['attempts']}/{job['max_attempts']}), "
+                                f"retrying in {delay:.0f}s: {e}")
+            else:
+                logging.error(f"{job_type} job {job_id} failed after {job['attempts']} attempt(s): {e}", exc_info=True)
+        else:
+            try:
+                if not complete_job(job_id, claimed_by=self.owner):
+                    logging.warning(f"{job_type} job {job_id} finished after its lease expired; "
+                                    f"it was re-queued and may run again")
+            except Exception as e:
+                logging.error(f"Failed to mark {job_type} job {job_id} done: {e}")
+            with self._lock:
+                spec["succeeded"] += 1
+            logging.info(f"{job_type} job {job_id} finished in {time.monotonic() - started:.1f}s")
+        finally:
+            with self._lock:
+                spec["busy"] -= 1
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create the process-wide job queue"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,27 @@
+"""Shared fixtures: run tests from Backend/ imports against a temporary database."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Point db.database at an empty database file (not created yet)."""
+    path = tmp_path / "app.db"
+    database.close_db()
+    monkeypatch.setattr(database, "DB_PATH", str(path))
+    yield path
+    database.close_db()
+
+
+@pytest.fixture
+def db(db_path):
+    """A migrated temporary database."""
+    database.init_db()
+    return database
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from ai import embeddings
+from ai.embeddings import HashingEmbedder, VectorIndex
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dim=256)
+
+
+@pytest.fixture
+def index(tmp_path, embedder):
+    return VectorIndex(tmp_path / "index", embedder.dim, embedder.name)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized(embedder):
+    first = embedder.embed(["a dog runs in the kitchen", ""])
+    second = HashingEmbedder(dim=256).embed(["a dog runs in the kitchen", ""])
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+
+
+def test_hashing_embedder_ranks_related_text_higher(embedder):
+    query = embedder.embed_query("person cooking")
+    related, unrelated = embedder.embed(["someone is cooking dinner", "car parked outside"])
+    assert query @ related > query @ unrelated
+
+
+def test_upsert_and_search(index, embedder):
+    texts = ["dog in the garden", "person cooking pasta", "car in the driveway"]
+    index.upsert([1, 2, 3], [1, 2, 3], embedder.embed(texts))
+    hits = index.search(embedder.embed_query("cooking"), k=2)
+    assert len(hits) == 2
+    assert hits[0][0] == 2
+    assert hits[0][1] >= hits[1][1]
+    assert index.search(embedder.embed_query("cooking"), k=5, candidate_ids=[1, 3])[0][0] in (1, 3)
+
+
+def test_upsert_replaces_older_vector(index, embedder):
+    index.upsert([1], [1], embedder.embed(["dog in the garden"]))
+    index.upsert([1], [2], embedder.embed(["person cooking pasta"]))
+    assert len(index) == 1
+    hits = index.search(embedder.embed_query("cooking"), k=5)
+    assert hits[0][0] == 1 and hits[0][1] > 0.3
+
+
+def test_delete_hides_node(index, embedder):
+    index.upsert([1, 2], [1, 2], embedder.embed(["dog in the garden", "person cooking"]))
+    index.delete([2])
+    assert index.ids().tolist() == [1]
+    assert all(node_id != 2 for node_id, _ in index.search(embedder.embed_query("cooking"), k=5))
+
+
+def test_compact_keeps_live_rows(index, embedder):
+    for revision in range(1, 4):
+        index.upsert([1, 2], [revision, revision], embedder.embed(["dog in the garden", "person cooking"]))
+    index.delete([2])
+    assert index.compact()
+    assert index.keys_path.stat().st_size == index.key_dtype.itemsize
+    assert index.ids().tolist() == [1]
+    assert index.search(embedder.embed_query("dog garden"), k=1)[0][0] == 1
+    # Reopening reads the compacted files.
+    reopened = VectorIndex(index.directory, embedder.dim, embedder.name)
+    assert reopened.ids().tolist() == [1]
+
+
+def test_changed_configuration_rebuilds_index(index, embedder, tmp_path):
+    index.upsert([1], [1], embedder.embed(["dog"]))
+    rebuilt = VectorIndex(index.directory, 128, embedder.name)
+    assert len(rebuilt) == 0
+
+
+@pytest.fixture
+def shared_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "INDEX_DIR", tmp_path / "shared")
+    monkeypatch.setattr(embeddings, "_index", None)
+    monkeypatch.setattr(embeddings, "_embedder", None)
+    monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", "hashing")
+    return embeddings.get_index()
+
+
+def test_semantic_search_drops_non_positive_scores(shared_index):
+    index, embedder = shared_index
+    index.upsert([1, 2], [1, 2], embedder.embed(["person cooking pasta", ""]))
+    hits = embeddings.semantic_search("cooking", k=5)
+    assert [node_id for node_id, _ in hits] == [1]
+    assert all(score > 0 for _, score in hits)
+
+
+def test_remove_deleted(shared_index):
+    index, embedder = shared_index
+    index.upsert([1, 2, 3], [1, 2, 3], embedder.embed(["a", "b", "c"]))
+    assert embeddings.remove_deleted([1, 3]) == 1
+    assert index.ids().tolist() == [1, 3]
+
+
+def test_remove_deleted_reads_ids_from_database(db, shared_index):
+    index, embedder = shared_index
+    node_id = db.create_memory_node("/tmp/a.mp4", "recording", "2025-01-01T00:00:00", "{}")
+    index.upsert([node_id, node_id + 1], [1, 2], embedder.embed(["a", "b"]))
+    assert embeddings.remove_deleted() == 1
+    assert index.ids().tolist() == [node_id]
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from jobs.queue import JobQueue
+
+
+@pytest.fixture
+def queue(db):
+    queue = JobQueue(poll_interval=0.02, lease_seconds=5.0, heartbeat_interval=0.05)
+    yield queue
+    queue.stop()
+
+
+def _job(db, job_id):
+    (job,) = [job for job in db.get_jobs(limit=100) if job["id"] == job_id]
+    return job
+
+
+def test_failed_job_retried_until_it_succeeds(db, queue):
+    calls = []
+
+    def flaky(payload, job):
+        calls.append((payload["n"], job["attempts"]))
+        if len(calls) < 3:
+            raise RuntimeError("try again")
+
+    queue.register("flaky", flaky, max_attempts=3, retry_delay=0.0)
+    queue.start()
+    job_id = queue.enqueue("flaky", {"n": 7})
+    assert queue.wait_idle(5.0)
+    assert calls == [(7, 1), (7, 2), (7, 3)]
+    job = _job(db, job_id)
+    assert job["status"] == "done" and job["last_error"] is None
+    assert queue.stats()["flaky"]["session"] == {"succeeded": 1, "retried": 2, "failed": 0}
+
+
+def test_job_failed_after_max_attempts(db, queue):
+    def broken(payload, job):
+        raise ValueError("nope")
+
+    queue.register("broken", broken, max_attempts=2, retry_delay=0.0)
+    queue.start()
+    job_id = queue.enqueue("broken")
+    assert queue.wait_idle(5.0)
+    job = _job(db, job_id)
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert job["last_error"] == "ValueError: nope"
+
+
+def test_duplicate_pending_job_not_queued_twice(db, queue):
+    release = threading.Event()
+    queue.register("slow", lambda payload, job: release.wait(5.0))
+    first = queue.enqueue("slow", dedup_key="/v/a.mp4")
+    assert queue.enqueue("slow", dedup_key="/v/a.mp4", priority=5) == first
+    assert _job(db, first)["priority"] == 5
+    other = queue.enqueue("slow", dedup_key="/v/b.mp4")
+    assert other != first
+
+    queue.start()
+    release.set()
+    assert queue.wait_idle(5.0)
+    # Once done, the same key can be queued again.
+    assert queue.enqueue("slow", dedup_key="/v/a.mp4") not in (first, other)
+
+
+def test_duplicate_brings_queued_job_forward(db, queue):
+    queue.register("later", lambda payload, job: None)
+    first = queue.enqueue("later", dedup_key="/v/a.mp4", delay=60.0)
+    assert _job(db, first)["run_after"] > time.time() + 50
+    assert queue.enqueue("later", dedup_key="/v/a.mp4", delay=120.0) == first
+    assert _job(db, first)["run_after"] > time.time() + 50
+    assert queue.enqueue("later", dedup_key="/v/a.mp4") == first
+    assert _job(db, first)["run_after"] <= time.time()
+
+
+def test_unknown_job_type_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue("missing")
+
+
+def test_running_job_with_live_lease_is_not_recovered(db):
+    job_id, _ = db.enqueue_job("work")
+    assert db.claim_job("work", claimed_by="other-process", lease_seconds=60)["id"] == job_id
+    assert db.requeue_interrupted_jobs() == 0
+    assert _job(db, job_id)["status"] == "running"
+
+
+def test_expired_lease_recovered_on_start(db, queue):
+    job_id, _ = db.enqueue_job("work")
+    db.claim_job("work", claimed_by="dead-process", lease_seconds=-1)
+    ran = []
+    queue.register("work", lambda payload, job: ran.append(job["claimed_by"]))
+    queue.start()
+    assert queue.wait_idle(5.0)
+    assert ran == [queue.owner]
+    job = _job(db, job_id)
+    assert job["status"] == "done" and job["attempts"] == 2
+
+
+def test_expired_lease_on_final_attempt_fails(db):
+    job_id, _ = db.enqueue_job("work", max_attempts=1)
+    db.claim_job("work", claimed_by="dead-process", lease_seconds=-1)
+    assert db.requeue_interrupted_jobs() == 0
+    job = _job(db, job_id)
+    assert job["status"] == "failed" and job["last_error"] == "Interrupted on final attempt"
+
+
+def test_heartbeat_keeps_long_job_leased(db):
+    queue = JobQueue(poll_interval=0.02, lease_seconds=0.3, heartbeat_interval=0.05)
+    release = threading.Event()
+    queue.register("long", lambda payload, job: release.wait(5.0))
+    queue.start()
+    try:
+        job_id = queue.enqueue("long")
+        time.sleep(1.0)
+        # Well past the original lease, but renewed, so nothing is recovered.
+        assert db.requeue_interrupted_jobs() == 0
+        assert _job(db, job_id)["attempts"] == 1
+        release.set()
+        assert queue.wait_idle(5.0)
+    finally:
+        queue.stop()
+
+
+def test_completion_ignored_after_lease_lost(db):
+    job_id, _ = db.enqueue_job("work")
+    db.claim_job("work", claimed_by="a", lease_seconds=-1)
+    db.requeue_interrupted_jobs()
+    db.claim_job("work", claimed_by="b", lease_seconds=60)
+    assert not db.complete_job(job_id, claimed_by="a")
+    assert db.fail_job(job_id, "late", 0.0, claimed_by="a") == "lost"
+    assert db.complete_job(job_id, claimed_by="b")
+    assert _job(db, job_id)["status"] == "done"
@@ -0,0 +1,145 @@
+import json
+import sqlite3
+
+import pytest
+
+from db import database
+
+
+def _legacy_db(path, nodes):
+    """Create a database as the baseline app left it: schema.sql only, user_version 0."""
+    conn = sqlite3.connect(path)
+    with open(database.SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.executemany(
+        "INSERT INTO memory_nodes (file_path, file_type, timestamp, metadata) VALUES (?, ?, ?, ?)",
+        nodes,
+    )
+    conn.commit()
+    conn.close()
+
+
+def _recording(path, **metadata):
+    return (path, "recording", "2025-01-16T12:00:00", json.dumps(metadata))
+
+
+@pytest.fixture
+def legacy(db_path):
+    _legacy_db(db_path, [
+        _recording("/v/a.mp4", video_path="/v/a.mp4", summary="A dog in the garden", title="Dog",
+                   transcript="good boy", audio_path="/a/a.wav", objects_detected=["dog"]),
+        _recording("/v/a.mp4", video_path="/v/a.mp4", summary="duplicate from a transcription race"),
+        ("/notes/n.txt", "note", "2025-01-16T13:00:00", None),
+        ("/notes/bad.txt", "note", "2025-01-16T14:00:00", "not json"),
+    ])
+    database.init_db()
+    with database.connection() as conn:
+        yield conn
+
+
+def test_migrates_legacy_database_to_latest_version(legacy):
+    latest = max(version for version, _, _ in database._load_migrations())
+    assert latest >= 9
+    assert database.get_schema_version() == latest
+
+
+def test_duplicates_removed_and_file_path_unique(legacy):
+    rows = legacy.execute("SELECT id, summary FROM memory_nodes WHERE file_path = '/v/a.mp4'").fetchall()
+    assert [row["summary"] for row in rows] == ["A dog in the garden"]
+    with pytest.raises(sqlite3.IntegrityError):
+        legacy.execute("INSERT INTO memory_nodes (file_path, file_type, timestamp) VALUES ('/v/a.mp4', 'recording', 'x')")
+
+
+def test_metadata_backfilled_and_exposed_as_columns(legacy):
+    rows = {row["file_path"]: row for row in legacy.execute(
+        "SELECT file_path, metadata, title, transcript, objects_detected, description FROM memory_nodes")}
+    assert rows["/v/a.mp4"]["title"] == "Dog"
+    assert rows["/v/a.mp4"]["transcript"] == "good boy"
+    assert json.loads(rows["/v/a.mp4"]["objects_detected"]) == ["dog"]
+    assert rows["/notes/n.txt"]["metadata"] == "{}"
+    assert rows["/notes/bad.txt"]["description"] == "not json"
+
+
+def test_fts_index_built_and_kept_in_sync(legacy):
+    assert [n["file_path"] for n in database.search_memory_nodes_fts("garden dog")] == ["/v/a.mp4"]
+    node_id = legacy.execute("SELECT id FROM memory_nodes WHERE file_path = '/v/a.mp4'").fetchone()[0]
+    database.update_memory_node_fields(node_id, summary="A cat on the sofa")
+    assert database.search_memory_nodes_fts("garden") == []
+    assert [n["id"] for n in database.search_memory_nodes_fts("sofa")] == [node_id]
+
+
+def test_revisions_increase_on_every_write(legacy):
+    before = database.get_memory_node_revision()
+    node_id = database.create_memory_node("/v/b.mp4", "recording", "2025-01-17T00:00:00", "{}")
+    created = database.get_memory_node_revision()
+    database.update_memory_node_fields(node_id, summary="later")
+    assert before < created < database.get_memory_node_revision()
+    changed = database.get_memory_nodes_changed_since(before)
+    assert [node["id"] for node in changed] == [node_id]
+
+
+def test_migrations_are_idempotent(legacy):
+    version = database.get_schema_version()
+    assert database.apply_migrations() == version
+    database.init_db()
+    assert legacy.execute("SELECT COUNT(*) FROM memory_nodes").fetchone()[0] == 3
+
+
+def test_jobs_table_exists(legacy):
+    assert legacy.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+
+def test_archive_version_sees_writes_from_other_processes(legacy, db_path):
+    """Writes through an unrelated connection (e.g. the camera CLI) bump the version."""
+    versions = [database.get_archive_version()]
+    other = sqlite3.connect(db_path)
+    other.execute("INSERT INTO memory_nodes (file_path, file_type, timestamp) VALUES ('/v/c.mp4', 'recording', 'x')")
+    other.commit()
+    versions.append(database.get_archive_version())
+    other.execute("UPDATE memory_nodes SET metadata = json_set(metadata, '$.summary', 'cat') WHERE file_path = '/v/c.mp4'")
+    other.commit()
+    versions.append(database.get_archive_version())
+    other.execute("DELETE FROM memory_nodes WHERE file_path = '/v/c.mp4'")
+    other.commit()
+    other.close()
+    versions.append(database.get_archive_version())
+    assert versions == sorted(set(versions))
+
+
+def test_pipeline_state_backfill_does_not_requeue_processed_recordings(db_path):
+    _legacy_db(db_path, [
+        _recording("/v/said.mp4", video_path="/v/said.mp4", audio_path="/a/said.wav", summary="People talking",
+                   transcript="hello", title=""),
+        _recording("/v/quiet.mp4", video_path="/v/quiet.mp4", audio_path="/a/quiet.wav", summary="An empty room",
+                   transcript=None),
+        _recording("/v/mute.mp4", video_path="/v/mute.mp4", audio_path=None, summary="A cat", transcript=None),
+        _recording("/v/saved.mp4", video_path="/v/saved.mp4", audio_path="/a/saved.wav",
+                   summary="Loading Summary...", transcript="", transcript_path="/t/saved.txt"),
+        _recording("/v/crashed.mp4", video_path="/v/crashed.mp4", audio_path="/a/crashed.wav",
+                   summary="Loading Summary...", transcript=None),
+        _recording("/t/spoken.txt", video_path=None, audio_path="/a/spoken.wav", summary=None,
+                   transcript="just audio", title="Spoken"),
+    ])
+    database.init_db()
+    with database.connection() as conn:
+        states = {row["file_path"]: (row["transcribed"], row["summarized"], row["titled"], row["indexed"])
+                  for row in conn.execute("""
+            SELECT n.file_path, p.transcribed, p.summarized, p.titled, p.indexed
+            FROM memory_nodes n JOIN pipeline_state p ON p.node_id = n.id
+        """)}
+    assert states == {
+        "/v/said.mp4": ("done", "done", "skipped", "done"),
+        "/v/quiet.mp4": ("skipped", "done", "skipped", "done"),
+        "/v/mute.mp4": ("skipped", "done", "skipped", "done"),
+        "/v/saved.mp4": ("skipped", "pending", "pending", "done"),
+        "/v/crashed.mp4": ("pending", "pending", "pending", "done"),
+        "/t/spoken.txt": ("done", "skipped", "done", "done"),
+    }
+    incomplete = {node["node_id"] for node in database.get_incomplete_pipeline_nodes()}
+    assert len(incomplete) == 2
+
+
+def test_transcript_only_recording_has_nothing_to_summarize(db):
+    metadata = {"video_path": None, "audio_path": "/a/a.wav", "summary": None, "transcript": "hello"}
+    node_id = db.create_memory_node("/t/a.txt", "recording", "2025-01-16T12:00:00", json.dumps(metadata))
+    assert db.get_pipeline_state(node_id)["summarized"] == "skipped"
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from camera.motion import FULL_FRAME_ZONE, MOTION_ENGINES, MotionDetector, parse_zones, rasterize_zones
+
+LEFT = {"name": "left", "polygon": [[0, 0], [0.5, 0], [0.5, 1], [0, 1]]}
+RIGHT_EXCLUDED = {"name": "window", "polygon": [[0.5, 0], [1, 0], [1, 1], [0.5, 1]], "exclude": True}
+
+
+def _frame(box=None, size=(480, 640)):
+    """Grey BGR frame, optionally with a white box given as (x0, y0, x1, y1) fractions."""
+    frame = np.full(size + (3,), 40, dtype=np.uint8)
+    if box:
+        h, w = size
+        x0, y0, x1, y1 = box
+        frame[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)] = 255
+    return frame
+
+
+def _score(detector, box, static_frames=20):
+    """Feed static frames until the engine is primed/warmed up, then one with `box`."""
+    for _ in range(static_frames):
+        assert detector.process(_frame()) == 0.0
+    return detector.process(_frame(box))
+
+
+@pytest.mark.parametrize("engine", MOTION_ENGINES)
+def test_engines_report_no_motion_on_static_scene(engine):
+    detector = MotionDetector(engine=engine, width=160, height=120)
+    assert _score(detector, None) == 0.0
+
+
+@pytest.mark.parametrize("engine", MOTION_ENGINES)
+def test_engines_detect_moving_object(engine):
+    detector = MotionDetector(engine=engine, width=160, height=120)
+    score = _score(detector, (0.25, 0.25, 0.5, 0.5))
+    # The box covers 1/16 of the frame: 19200 reference pixels, give or take blur/dilation.
+    assert 5000 < score < 60000
+    assert detector.zone_levels() == {FULL_FRAME_ZONE: round(score, 1)}
+
+
+@pytest.mark.parametrize("engine", ["frame_diff", "grid"])
+def test_score_independent_of_analysis_resolution(engine):
+    box = (0.25, 0.25, 0.5, 0.5)
+    small = _score(MotionDetector(engine=engine, width=160, height=120), box)
+    large = _score(MotionDetector(engine=engine, width=640, height=480), box)
+    assert small == pytest.approx(large, rel=0.35)
+
+
+def test_still_valid_rejects_frame():
+    detector = MotionDetector(width=160, height=120)
+    detector.process(_frame())
+    assert detector.process(_frame((0, 0, 1, 1)), still_valid=lambda: False) is None
+    # The rejected frame did not replace the previous one.
+    assert detector.process(_frame()) == 0.0
+
+
+def test_reset_forgets_previous_frame():
+    detector = MotionDetector(width=160, height=120)
+    detector.process(_frame())
+    detector.reset()
+    assert detector.process(_frame((0, 0, 1, 1))) == 0.0
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        MotionDetector(engine="optical_flow")
+
+
+@pytest.mark.parametrize("engine", MOTION_ENGINES)
+def test_motion_in_excluded_zone_is_ignored(engine):
+    detector = MotionDetector(engine=engine, width=160, height=120, zones=[LEFT, RIGHT_EXCLUDED])
+    assert _score(detector, (0.65, 0.25, 0.9, 0.75)) == 0.0
+    assert detector.zone_levels() == {"left": 0.0}
+
+
+@pytest.mark.parametrize("engine", MOTION_ENGINES)
+def test_motion_scored_per_include_zone(engine):
+    right = {"name": "right", "polygon": [[0.5, 0], [1, 0], [1, 1], [0.5, 1]]}
+    detector = MotionDetector(engine=engine, width=160, height=120, zones=[LEFT, right])
+    score = _score(detector, (0.1, 0.25, 0.35, 0.75))
+    levels = detector.zone_levels()
+    assert score > 0
+    assert levels["left"] > 0
+    assert levels["right"] == 0.0
+
+
+def test_rasterize_zones_labels():
+    labels, names = rasterize_zones(parse_zones([LEFT, RIGHT_EXCLUDED]), 8, 4)
+    assert names == ["left"]
+    assert (labels[:, :3] == 1).all()
+    assert (labels[:, 5:] == 0).all()
+
+    labels, names = rasterize_zones([], 8, 4)
+    assert names == [FULL_FRAME_ZONE]
+    assert (labels == 1).all()
+
+
+@pytest.mark.parametrize("zone", [
+    "not a dict",
+    {"name": "tiny", "polygon": [[0, 0], [1, 1]]},
+    {"name": "outside", "polygon": [[0, 0], [2, 0], [0, 1]]},
+    {"name": "bad", "polygon": [[0, 0], ["x"], [0, 1]]},
+])
+def test_parse_zones_rejects_malformed(zone):
+    with pytest.raises(ValueError):
+        parse_zones([zone])
+
+
+def test_parse_zones_defaults():
+    (zone,) = parse_zones([{"polygon": [[0, 0], [1, 0], [0, 1]], "min_area": "250"}])
+    assert zone == {"name": "zone_1", "polygon": [(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)],
+                    "exclude": False, "min_area": 250.0}
@@ -0,0 +1,165 @@
+import json
+import time
+from collections import OrderedDict
+
+import pytest
+
+from camera.recording import PLACEHOLDER_SUMMARY, RecordingAggregate, placeholder_metadata
+from jobs.queue import JobQueue
+
+
+def _metadata(db, node_id):
+    (node,) = db.get_memory_nodes_by_ids([node_id])
+    metadata = node["metadata"]
+    return json.loads(metadata) if isinstance(metadata, str) else metadata
+
+
+def _camera_metadata():
+    metadata = placeholder_metadata("/v/a.mp4", "/a/a.wav")
+    metadata["camera_id"] = "garage"
+    return metadata
+
+
+def test_create_node_creates_placeholder(db):
+    node_id = RecordingAggregate("/v/a.mp4").create_node(_camera_metadata())
+    metadata = _metadata(db, node_id)
+    assert metadata["summary"] == PLACEHOLDER_SUMMARY
+    assert metadata["camera_id"] == "garage"
+
+
+def test_create_node_keeps_stage_results_from_this_run(db):
+    recording = RecordingAggregate("/v/a.mp4")
+    node_id = recording.merge("transcription", {"transcript": "hello there"}, audio_path="/a/a.wav")
+    assert recording.create_node(_camera_metadata()) == node_id
+    metadata = _metadata(db, node_id)
+    assert metadata["transcript"] == "hello there"
+    assert metadata["camera_id"] == "garage"
+
+
+def test_create_node_keeps_stage_results_from_an_earlier_run(db):
+    """A node written before a restart: the new aggregate knows nothing about its stages."""
+    node_id = RecordingAggregate("/v/a.mp4").merge(
+        "analysis", {"summary": "A dog in the garden", "objects_detected": ["dog"]}, audio_path="/a/a.wav")
+    assert RecordingAggregate("/v/a.mp4").create_node(_camera_metadata()) == node_id
+    metadata = _metadata(db, node_id)
+    assert metadata["summary"] == "A dog in the garden"
+    assert metadata["objects_detected"] == ["dog"]
+    assert metadata["camera_id"] == "garage"
+    assert len(db.get_memory_nodes()) == 1
+
+
+@pytest.fixture
+def job_queue(db, monkeypatch):
+    """A job queue that is not started, used by the camera module's recording jobs."""
+    from camera import camera_module, recording
+
+    queue = JobQueue()
+    monkeypatch.setattr(recording, "_recordings", OrderedDict())
+    monkeypatch.setattr(camera_module, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(camera_module, "_refresh_semantic_index", lambda: None)
+    return queue
+
+
+def _keyframe_summary_jobs(db):
+    return [job for job in db.get_jobs(limit=100) if job["job_type"] == "keyframe_summary"]
+
+
+def _waiting_recording(audio_path="/a/a.wav"):
+    """A recording whose analysis deferred its keyframe summary until transcription finishes."""
+    from camera.camera_module import _queue_keyframe_summary
+
+    recording = RecordingAggregate("/v/a.mp4")
+    node_id = recording.create_node(placeholder_metadata("/v/a.mp4", audio_path))
+    recording.merge("analysis", {"objects_detected": ["dog"],
+                                 "summary_waiting": {"since": time.time(), "mode": "keyframes"}})
+    _queue_keyframe_summary("/v/a.mp4", "keyframes", delay=60.0)
+    return recording, node_id
+
+
+def test_final_transcript_is_never_partial(db):
+    from camera.camera_module import _final_transcript
+
+    recording = RecordingAggregate("/v/a.mp4")
+    recording.create_node(_camera_metadata())
+    recording.merge("streaming transcription", {"transcript": "hel", "transcript_partial": True})
+    assert _final_transcript("/v/a.mp4") is None
+    recording.merge("transcription", {"transcript": "hello there", "transcript_partial": False})
+    assert _final_transcript("/v/a.mp4") == "hello there"
+
+
+def test_keyframe_summary_runs_when_transcript_is_stored(db, job_queue):
+    from camera.camera_module import _store_transcript
+
+    _waiting_recording()
+    (job,) = _keyframe_summary_jobs(db)
+    assert job["run_after"] > time.time() + 50
+    _store_transcript("/v/a.mp4", "/a/a.wav", "/t/a.txt", "late words", "now", lambda *args: True, None)
+    (job,) = _keyframe_summary_jobs(db)
+    assert job["run_after"] <= time.time()
+
+
+def test_keyframe_summary_runs_when_transcription_is_skipped(db, job_queue):
+    from camera.camera_module import _mark_pipeline
+
+    _waiting_recording()
+    _mark_pipeline("/v/a.mp4", transcribed="skipped")
+    (job,) = _keyframe_summary_jobs(db)
+    assert job["run_after"] <= time.time()
+
+
+def test_keyframe_summary_waits_while_transcription_is_pending(db, job_queue):
+    from camera.camera_module import _transcription_finished
+
+    recording, _ = _waiting_recording()
+    recording.merge("streaming transcription", {"transcript": "hel", "transcript_partial": True})
+    _transcription_finished("/v/a.mp4")
+    (job,) = _keyframe_summary_jobs(db)
+    assert job["run_after"] > time.time() + 50
+
+
+def test_transcription_does_not_queue_summary_that_is_not_waiting(db, job_queue):
+    from camera.camera_module import _mark_pipeline
+
+    RecordingAggregate("/v/a.mp4").create_node(_camera_metadata())
+    _mark_pipeline("/v/a.mp4", transcribed="failed")
+    assert _keyframe_summary_jobs(db) == []
+
+
+def test_keyframe_summary_latency_includes_the_wait(db, job_queue, monkeypatch):
+    from camera import camera_module
+
+    monkeypatch.setattr(camera_module, "add_event", None)
+    monkeypatch.setattr(camera_module, "_import_gemini_helpers",
+                        lambda: (None, lambda video_path: "A dog in the garden", None))
+    recording, node_id = _waiting_recording()
+    recording.merge("analysis", {"summary_waiting": {"since": time.time() - 5.0, "mode": "keyframes"}})
+    camera_module._keyframe_summary_job({"video_path": "/v/a.mp4"}, {"attempts": 1, "max_attempts": 3})
+    metadata = _metadata(db, node_id)
+    assert metadata["summary"] == "A dog in the garden"
+    assert metadata["description"] == "Objects detected: dog | AI Summary: A dog in the garden"
+    assert metadata["summary_waiting"] is None
+    assert metadata["summary_seconds"] >= 5.0
+    assert metadata["summary_wait_seconds"] >= 5.0
+
+
+def test_recovery_does_not_analyze_transcript_only_recordings(db, job_queue):
+    from camera.camera_module import VIDEO_ANALYSIS_JOB, recover_recording_pipeline
+
+    metadata = {"video_path": None, "audio_path": None, "summary": None, "transcript": "hello"}
+    node_id = db.create_memory_node("/t/a.txt", "recording", "2025-01-16T12:00:00", json.dumps(metadata))
+    db.set_pipeline_stages(node_id, summarized="pending")
+    counts = recover_recording_pipeline(job_queue)
+    assert counts[VIDEO_ANALYSIS_JOB] == 0
+    assert db.get_pipeline_state(node_id)["summarized"] == "skipped"
+    assert not [job for job in db.get_jobs(limit=100) if job["job_type"] == VIDEO_ANALYSIS_JOB]
+
+
+def test_unreadable_video_fails_summary_on_final_attempt(db, tmp_path):
+    from camera.camera_module import analyze_and_log_video
+
+    node_id = RecordingAggregate("/v/a.mp4").create_node(_camera_metadata())
+    with pytest.raises(RuntimeError):
+        analyze_and_log_video("/v/a.mp4", None, None, None, tmp_path, strict=True)
+    assert db.get_pipeline_state(node_id)["summarized"] == "pending"
+    analyze_and_log_video("/v/a.mp4", None, None, None, tmp_path)
+    assert db.get_pipeline_state(node_id)["summarized"] == "failed"
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from camera.recording import RecordingAggregate, placeholder_metadata
+from camera.transcription import StreamingTranscription
+
+
+class _Chunks:
+    """transcribe_chunk stand-in: chunk i's samples are filled with i; by default later chunks answer first."""
+
+    def __init__(self, count, fail=(), delays=None):
+        self.delays = delays or [0.02 * (count - index) for index in range(count)]
+        self.fail = set(fail)
+
+    def __call__(self, samples):
+        index = int(samples[0])
+        time.sleep(self.delays[index])
+        if index in self.fail:
+            raise RuntimeError("quota")
+        return f"part{index}"
+
+
+def _run(chunks, count, final_empty=True):
+    done = threading.Event()
+    results = []
+
+    def on_complete(stream, transcript, errors):
+        results.append((transcript, errors))
+        done.set()
+
+    stream = StreamingTranscription("/v/a.mp4", "/a/a.wav", chunks, on_complete)
+    for index in range(count):
+        stream.submit(index, index * 5.0, np.full(10, index, dtype=np.float32), False)
+    if final_empty:
+        stream.submit(count, count * 5.0, np.zeros(0, dtype=np.float32), True)
+    assert done.wait(5.0)
+    time.sleep(0.05)
+    return results
+
+
+def test_chunks_stitched_in_order_and_completed_once(db):
+    RecordingAggregate("/v/a.mp4").create_node(placeholder_metadata("/v/a.mp4", "/a/a.wav"))
+    results = _run(_Chunks(4), 4)
+    assert results == [("part0 part1 part2 part3", [])]
+
+
+def test_partial_transcripts_are_ordered_prefixes(db, monkeypatch):
+    import camera.recording
+
+    RecordingAggregate("/v/a.mp4").create_node(placeholder_metadata("/v/a.mp4", "/a/a.wav"))
+    seen = []
+    original = camera.recording.update_memory_node_fields
+
+    def record(node_id, **fields):
+        if fields.get("transcript_partial"):
+            seen.append(fields["transcript"])
+        return original(node_id, **fields)
+
+    monkeypatch.setattr(camera.recording, "update_memory_node_fields", record)
+    # Chunk 1 finishes before chunk 0 and chunk 2 last: nothing is published
+    # until chunk 0 is done, then chunks 0-1 together.
+    ((transcript, _),) = _run(_Chunks(3, delays=[0.05, 0.0, 0.15]), 3)
+    assert seen == ["part0 part1"]
+    assert transcript == "part0 part1 part2"
+    (node,) = db.get_memory_nodes()
+    metadata = json.loads(node["metadata"]) if isinstance(node["metadata"], str) else node["metadata"]
+    # The final transcript is left to on_complete; the stored one is still partial.
+    assert metadata["transcript_partial"]
+
+
+def test_failed_chunk_reported_and_skipped(db):
+    RecordingAggregate("/v/a.mp4").create_node(placeholder_metadata("/v/a.mp4", "/a/a.wav"))
+    ((transcript, errors),) = _run(_Chunks(3, fail={1}), 3)
+    assert transcript == "part0 part2"
+    assert len(errors) == 1 and errors[0].startswith("chunk 1 at 5.0s: RuntimeError")
+
+
+def test_final_chunk_with_audio(db):
+    chunks = _Chunks(2)
+    done = threading.Event()
+    results = []
+    stream = StreamingTranscription("/v/a.mp4", "/a/a.wav", chunks,
+                                    lambda s, t, e: (results.append(t), done.set()))
+    stream.submit(1, 5.0, np.full(10, 1, dtype=np.float32), True)
+    stream.submit(0, 0.0, np.full(10, 0, dtype=np.float32), False)
+    assert done.wait(5.0)
+    assert results == ["part0 part1"]
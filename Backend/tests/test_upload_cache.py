@@ -0,0 +1,58 @@
+import time
+
+from ai.upload_cache import UploadCache
+
+
+def _cache():
+    evicted = []
+    return UploadCache(max_files=2, on_evict=evicted.append), evicted
+
+
+def test_hit_miss_and_lru_eviction():
+    cache, evicted = _cache()
+    assert cache.acquire("a") is None
+    for key in ("a", "b"):
+        assert cache.put(key, f"remote-{key}", 10, ttl=60)
+        cache.release(key)
+    assert cache.acquire("a") == "remote-a"
+    cache.release("a")
+    assert cache.put("c", "remote-c", 10, ttl=60)
+    assert evicted == ["remote-b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["files"]) == (1, 1, 1, 2)
+
+
+def test_entry_in_use_is_not_evicted():
+    cache, evicted = _cache()
+    cache.put("a", "remote-a", 10, ttl=60)
+    assert cache.clear() == 0
+    cache.release("a")
+    assert cache.clear() == 1
+    assert evicted == ["remote-a"]
+
+
+def test_expired_entries_swept_on_acquire_and_stats():
+    cache, evicted = _cache()
+    cache.put("old", "remote-old", 10, ttl=0.01)
+    cache.release("old")
+    time.sleep(0.02)
+    stats = cache.stats()
+    assert evicted == ["remote-old"]
+    assert (stats["files"], stats["bytes"], stats["expired"]) == (0, 0, 1)
+
+    cache.put("old", "remote-old-2", 10, ttl=0.01)
+    cache.release("old")
+    time.sleep(0.02)
+    # Looking up an unrelated key still deletes the expired upload.
+    assert cache.acquire("other") is None
+    assert evicted == ["remote-old", "remote-old-2"]
+
+
+def test_expired_entry_in_use_evicted_on_release():
+    cache, evicted = _cache()
+    cache.put("a", "remote-a", 10, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.stats()["files"] == 1
+    assert cache.acquire("a") is None
+    cache.release("a")
+    assert evicted == ["remote-a"]
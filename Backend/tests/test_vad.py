@@ -0,0 +1,147 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+try:
+    from audio import audio_module
+except OSError as exc:  # sounddevice needs the PortAudio library
+    pytest.skip(f"audio module unavailable: {exc}", allow_module_level=True)
+
+RATE = audio_module.SAMPLE_RATE
+
+
+def _clip(seconds=3.0, speech=((1.0, 2.0),), noise=0.0, seed=0):
+    """Silence (or faint hiss) with voiced-like 180 Hz tone bursts at the given (start, end) seconds."""
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(0.0, noise, int(seconds * RATE)).astype(np.float32) if noise else \
+        np.zeros(int(seconds * RATE), dtype=np.float32)
+    for start, end in speech:
+        t = np.arange(int(start * RATE), int(end * RATE))
+        samples[t] += 0.2 * np.sin(2 * np.pi * 180 * t / RATE).astype(np.float32)
+    return samples
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_bytes(self, data, model, mime_type="audio/wav", prompt=None):
+        samples, rate = sf.read(io.BytesIO(data))
+        self.calls.append(("bytes", len(samples) / rate, mime_type, prompt))
+        return "words"
+
+    def transcribe_file(self, path, model, mime_type="audio/wav", prompt=None):
+        self.calls.append(("file", path, mime_type, prompt))
+        return "words"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = _Client()
+    monkeypatch.setattr(audio_module, "get_transcription_client", lambda: client)
+    return client
+
+
+def test_silence_has_no_speech():
+    speech = audio_module.detect_speech(np.zeros(RATE * 2, dtype=np.float32))
+    assert speech == {"duration": 2.0, "speech_seconds": 0.0, "segments": []}
+    assert not audio_module.has_speech(speech)
+
+
+def test_voiced_segment_found():
+    speech = audio_module.detect_speech(_clip())
+    ((start, end),) = speech["segments"]
+    assert start == pytest.approx(1.0, abs=0.05) and end == pytest.approx(2.0, abs=0.05)
+    assert audio_module.has_speech(speech)
+    assert audio_module.speech_range(speech) == pytest.approx(
+        (start - audio_module.VAD_PADDING, end + audio_module.VAD_PADDING))
+
+
+def test_hiss_is_not_speech():
+    speech = audio_module.detect_speech(_clip(speech=(), noise=0.02))
+    assert not audio_module.has_speech(speech)
+
+
+def test_close_segments_merged_and_blips_dropped():
+    speech = audio_module.detect_speech(_clip(speech=((0.5, 1.0), (1.1, 1.5), (2.5, 2.55))))
+    assert len(speech["segments"]) == 1
+    assert speech["segments"][0][0] == pytest.approx(0.5, abs=0.05)
+    assert speech["segments"][0][1] == pytest.approx(1.5, abs=0.05)
+
+
+def test_block_by_block_matches_whole_clip():
+    samples = _clip(speech=((0.4, 1.3), (2.0, 2.7)), noise=0.001)
+    vad = audio_module.VoiceActivityDetector()
+    for offset in range(0, len(samples), 1000):
+        vad.feed(samples[offset:offset + 1000])
+    assert vad.result() == audio_module.detect_speech(samples)
+
+
+def test_silent_chunk_skips_request(client):
+    assert audio_module.transcribe_samples(np.zeros(RATE, dtype=np.float32)) == ""
+    assert audio_module.transcribe_samples(np.zeros(0, dtype=np.float32)) == ""
+    assert client.calls == []
+
+
+def test_chunk_trimmed_and_sent_with_chunk_prompt(client):
+    assert audio_module.transcribe_samples(_clip()) == "words"
+    ((kind, seconds, mime_type, prompt),) = client.calls
+    assert (kind, mime_type, prompt) == ("bytes", "audio/flac", audio_module.CHUNK_TRANSCRIPTION_PROMPT)
+    assert seconds == pytest.approx(1.0 + 2 * audio_module.VAD_PADDING, abs=0.1)
+
+
+def test_silent_file_skips_request(client, tmp_path):
+    path = tmp_path / "quiet.wav"
+    sf.write(path, np.zeros(RATE * 2, dtype=np.float32), RATE)
+    transcript, _ = audio_module.transcribe_audio(str(path))
+    assert transcript == ""
+    assert client.calls == []
+    # The VAD result is kept next to the file for later runs.
+    assert (tmp_path / "quiet.speech.json").exists()
+
+
+def test_file_trimmed_to_speech_uses_whole_file_prompt(client, tmp_path):
+    path = tmp_path / "talk.wav"
+    sf.write(path, _clip(seconds=6.0, speech=((2.0, 3.0),)), RATE)
+    transcript, _ = audio_module.transcribe_audio(str(path))
+    assert transcript == "words"
+    ((kind, seconds, _, prompt),) = client.calls
+    assert (kind, prompt) == ("bytes", audio_module.TRANSCRIPTION_PROMPT)
+    assert seconds < 2.0
+
+
+def test_file_that_is_all_speech_sent_whole(client, tmp_path):
+    path = tmp_path / "busy.wav"
+    sf.write(path, _clip(seconds=2.0, speech=((0.0, 2.0),)), RATE)
+    audio_module.transcribe_audio(str(path))
+    ((kind, sent, mime_type, _),) = client.calls
+    assert (kind, sent, mime_type) == ("file", str(path), "audio/wav")
+
+
+def test_failing_chunk_consumer_does_not_stop_the_writer(tmp_path, monkeypatch):
+    import queue
+    import threading
+
+    chunker = audio_module.AudioChunker
+    monkeypatch.setattr(audio_module, "AudioChunker", lambda: chunker(min_seconds=0.5, max_seconds=0.5))
+    calls = []
+
+    def on_chunk(index, start, samples, final):
+        calls.append((index, final))
+        if not final:
+            raise RuntimeError("consumer broke")
+
+    recorder = audio_module.SpeechRecorder()
+    recorder.on_chunk = on_chunk
+    recorder.output_path = str(tmp_path / "a.wav")
+    blocks = queue.Queue()
+    for block in np.array_split(_clip(), 30):
+        blocks.put(block)
+    stop = threading.Event()
+    stop.set()
+    recorder._write_audio_data(blocks, sf.SoundFile(recorder.output_path, "w", RATE, 1), stop)
+    assert len(sf.read(recorder.output_path)[0]) == len(_clip())
+    assert calls[0] == (0, False) and calls[-1][1] is True
+    assert [index for index, _ in calls] == list(range(len(calls)))
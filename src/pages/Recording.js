@@ -198,7 +198,8 @@ function Recording() {
           camera_index: 0,
           fps: 10.0,
           min_area: 2000,
-          inactivity_timeout: 5.0,
+          pre_roll: 3.0,
+          post_roll: 5.0,
         }),
         signal: controller.signal,
       });